@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""End-to-end generator throughput over a synthetic monorepo.
+
+Writes a service.yaml tree of the requested size, then times each service end
+to end: reading service.yaml plus generate_lambda_tf + generate_eventbridge_tf
+for Lambda services, and generate_worker_terraform (manifest, --force) for
+workers. Reports services/sec, p50/p99 per service and peak RSS. --json writes
+the same numbers, plus the git commit, to a file so runs can be compared
+across commits.
+
+    python3 scripts/benchmarks/bench_generators.py --services 200 --routes 100 --json bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+
+import yaml
+
+from infragen import loader
+from infragen.discovery import find_services, service_kind
+from infragen.generators import service_generator, worker_generator
+from infragen.synthetic import synthetic_lambda_service, synthetic_worker_service
+
+
+def write_monorepo(root, args):
+    """Alternate Lambda services and workers under root/services"""
+    for i in range(args.services):
+        if i % 2:
+            config = synthetic_worker_service(f"worker-{i}", env_vars=args.env_vars, secrets=args.secrets,
+                                              metrics=args.metrics)
+        else:
+            config = synthetic_lambda_service(f"api-{i}", routes=args.routes, env_vars=args.env_vars,
+                                              secrets=args.secrets, events=args.events,
+                                              targets_per_event=args.targets)
+        service_dir = os.path.join(root, 'services', config['name'])
+        os.makedirs(service_dir)
+        with open(os.path.join(service_dir, 'service.yaml'), 'w') as f:
+            yaml.safe_dump(config, f, sort_keys=False)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mib():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=SCRIPTS_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(timings, elapsed):
+    timings = sorted(timings)
+    return {
+        'services': len(timings),
+        'services_per_sec': len(timings) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(timings, 50) * 1000,
+        'p99_ms': percentile(timings, 99) * 1000,
+        'max_ms': (timings[-1] if timings else 0.0) * 1000,
+    }
+
+
+def run(paths, environment, use_cache):
+    """Generate every service once; returns ({kind: [seconds]}, wall seconds)"""
+    lambda_gen = service_generator()
+    worker_gen = worker_generator()
+    timings = {'lambda': [], 'worker': []}
+    out_root = tempfile.mkdtemp(prefix='bench-out-')
+    started = time.perf_counter()
+    try:
+        for path in paths:
+            service_started = time.perf_counter()
+            config = loader.load_service_config(path, use_cache=use_cache)
+            kind = service_kind(config)
+            if kind == 'lambda':
+                lambda_gen.generate_lambda_tf(config, environment)
+                lambda_gen.generate_eventbridge_tf(config, environment)
+            else:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    worker_gen.generate_worker_terraform(path, environment, os.path.join(out_root, config['name']),
+                                                         force=True)
+            timings[kind].append(time.perf_counter() - service_started)
+        return timings, time.perf_counter() - started
+    finally:
+        shutil.rmtree(out_root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--services', type=int, default=200)
+    parser.add_argument('--routes', type=int, default=100)
+    parser.add_argument('--env-vars', type=int, default=20)
+    parser.add_argument('--secrets', type=int, default=5)
+    parser.add_argument('--events', type=int, default=5)
+    parser.add_argument('--targets', type=int, default=2, help="event_routing targets per event")
+    parser.add_argument('--metrics', type=int, default=3, help="scaling metrics per worker")
+    parser.add_argument('--environment', default='dev')
+    parser.add_argument('--repeat', type=int, default=3, help="report the fastest of this many passes")
+    parser.add_argument('--cache', action='store_true', help="use the service.yaml parse cache")
+    parser.add_argument('--json', metavar='FILE', help="also write the results as JSON")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='generator-bench-')
+    try:
+        write_monorepo(root, args)
+        paths = find_services(root)
+        best = None
+        for _ in range(max(1, args.repeat)):
+            timings, elapsed = run(paths, args.environment, args.cache)
+            if best is None or elapsed < best[1]:
+                best = (timings, elapsed)
+    finally:
+        shutil.rmtree(root)
+
+    timings, elapsed = best
+    results = {
+        'all': summarize(timings['lambda'] + timings['worker'], elapsed),
+        'lambda': summarize(timings['lambda'], sum(timings['lambda'])),
+        'worker': summarize(timings['worker'], sum(timings['worker'])),
+    }
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'libyaml': loader.LIBYAML,
+        'parameters': {k: v for k, v in vars(args).items() if k != 'json'},
+        'peak_rss_mib': peak_rss_mib(),
+        'results': results,
+    }
+
+    print(f"services={args.services} routes={args.routes} env_vars={args.env_vars} secrets={args.secrets} "
+          f"events={args.events}x{args.targets} metrics={args.metrics} cache={args.cache}")
+    print(f"{'KIND':<8} {'SERVICES':>8} {'SVC/S':>10} {'P50 ms':>10} {'P99 ms':>10} {'MAX ms':>10}")
+    for kind, r in results.items():
+        print(f"{kind:<8} {r['services']:>8} {r['services_per_sec']:>10.1f} {r['p50_ms']:>10.2f} "
+              f"{r['p99_ms']:>10.2f} {r['max_ms']:>10.2f}")
+    print(f"peak RSS {report['peak_rss_mib']:.1f} MiB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == "__main__":
+    main()
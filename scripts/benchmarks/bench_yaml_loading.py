@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Parse cost of service.yaml across a large synthetic monorepo: cold vs warm.
+
+Writes N synthetic service.yaml files to a temp directory and times loading all
+of them with the pure-Python SafeLoader, with libyaml's CSafeLoader (if PyYAML
+was built with it), and through infragen.loader with a cold and a warm parse
+cache. It also times a fresh interpreter doing the warm load, which is what a
+CI step pays.
+
+    python3 scripts/benchmarks/bench_yaml_loading.py --services 500 --routes 200
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+
+import yaml
+
+from infragen import loader
+from infragen.discovery import find_services
+from infragen.synthetic import synthetic_lambda_service, synthetic_worker_service
+
+
+def write_monorepo(root, services, routes, env_vars):
+    for i in range(services):
+        if i % 2:
+            config = synthetic_worker_service(f"worker-{i}", env_vars=env_vars)
+        else:
+            config = synthetic_lambda_service(f"api-{i}", routes=routes, env_vars=env_vars)
+        service_dir = os.path.join(root, 'services', config['name'])
+        os.makedirs(service_dir)
+        with open(os.path.join(service_dir, 'service.yaml'), 'w') as f:
+            yaml.safe_dump(config, f, sort_keys=False)
+
+
+def timed(label, fn, total_bytes):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<36} {elapsed * 1000:>10.1f} ms {total_bytes / 1024 / 1024 / elapsed:>9.1f} MiB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--services', type=int, default=500)
+    parser.add_argument('--routes', type=int, default=200)
+    parser.add_argument('--env-vars', type=int, default=50)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='yaml-bench-')
+    try:
+        write_monorepo(root, args.services, args.routes, args.env_vars)
+        paths = find_services(root)
+        blobs = []
+        for path in paths:
+            with open(os.path.join(path, 'service.yaml'), 'rb') as f:
+                blobs.append(f.read())
+        total_bytes = sum(len(b) for b in blobs)
+        print(f"{len(paths)} services, {total_bytes / 1024 / 1024:.1f} MiB of YAML, libyaml={loader.LIBYAML}")
+        print(f"{'CASE':<36} {'TIME':>13} {'THROUGHPUT':>15}")
+
+        timed('SafeLoader (pure Python)', lambda: [yaml.load(b, Loader=yaml.SafeLoader) for b in blobs], total_bytes)
+        if loader.LIBYAML:
+            timed('CSafeLoader (libyaml)', lambda: [yaml.load(b, Loader=yaml.CSafeLoader) for b in blobs],
+                  total_bytes)
+        timed('load_service_config, cold cache', lambda: [loader.load_service_config(p) for p in paths],
+              total_bytes)
+        timed('load_service_config, warm cache', lambda: [loader.load_service_config(p) for p in paths],
+              total_bytes)
+
+        # A fresh interpreter: import cost plus a warm-cache load of every service
+        child = ("import sys; sys.path.insert(0, sys.argv[1]); "
+                 "from infragen.discovery import find_services; from infragen.loader import load_service_config; "
+                 "[load_service_config(p) for p in find_services(sys.argv[2])]")
+        timed('new process, warm cache',
+              lambda: subprocess.run([sys.executable, '-c', child, SCRIPTS_DIR, root], check=True), total_bytes)
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Plan or apply core and every generated service stack, in dependency order.
+
+Core goes first; workers go before the Lambda services whose event rules
+deliver to their queues; independent stacks run in parallel. All stacks share
+one provider plugin cache, output is streamed with a [stack] prefix, and a
+per-stack timing table is printed at the end. Stacks whose plan shows no
+changes are not applied. Stacks generated with --core-outputs get their core
+outputs snapshot refreshed from one state pull once core has run.
+
+    python3 scripts/deploy-stacks.py <monorepo-root> dev plan
+    python3 scripts/deploy-stacks.py <monorepo-root> prod apply --parallelism 8
+
+Environments run one after another, since they share terraform/core.
+"""
+import argparse
+import os
+import sys
+import time
+
+from infragen.discovery import parse_environments
+from infragen.orchestrate import (FAILED, SKIPPED, CycleError, Runner, discover_stacks, run_environment,
+                                  topological_order)
+
+
+def print_summary(environment, results, wall_seconds):
+    """Per-stack timing table, slowest first"""
+    print()
+    print(f"{'STACK (' + environment + ')':<40} {'STATUS':<11} {'INIT s':>7} {'PLAN s':>7} {'APPLY s':>8}")
+    for name, result in sorted(results.items(), key=lambda item: sum(item[1].timings.values()), reverse=True):
+        timings = [f"{result.timings[step]:.1f}" if step in result.timings else '-'
+                   for step in ('init', 'plan', 'apply')]
+        print(f"{name:<40} {result.status:<11} {timings[0]:>7} {timings[1]:>7} {timings[2]:>8}"
+              + (f"  {result.error}" if result.error else ''))
+    busy = sum(sum(r.timings.values()) for r in results.values())
+    print(f"\n{len(results)} stacks, {busy:.1f}s of terraform time in {wall_seconds:.1f}s wall clock")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('root', help="monorepo root to scan for service.yaml files")
+    parser.add_argument('environments', help="comma-separated environments, e.g. dev,stg,prod, or all")
+    parser.add_argument('action', choices=('plan', 'apply'))
+    parser.add_argument('--parallelism', type=int, default=4, help="stacks to run at the same time")
+    parser.add_argument('--plugin-cache', default=os.environ.get('TF_PLUGIN_CACHE_DIR',
+                                                                 os.path.expanduser('~/.terraform.d/plugin-cache')),
+                        help="provider plugin cache shared by all stacks")
+    parser.add_argument('--terraform', default=os.environ.get('TERRAFORM', 'terraform'),
+                        help="terraform executable (default: $TERRAFORM or terraform on PATH)")
+    parser.add_argument('--skip-core', action='store_true', help="only run the service stacks")
+    args = parser.parse_args()
+
+    environments = parse_environments([args.environments])
+    if not environments:
+        parser.error("no environments given (and none found under terraform/environments)")
+
+    runner = Runner(args.terraform, args.plugin_cache)
+    failed = False
+    for environment in environments:
+        stacks = discover_stacks(args.root, environment, include_core=not args.skip_core)
+        try:
+            order = topological_order(stacks)
+        except CycleError as e:
+            print(f"❌ {environment}: {e}")
+            sys.exit(1)
+        print(f"🚀 {environment}: {args.action} {len(stacks)} stacks: {', '.join(order)}")
+        started = time.perf_counter()
+        results = run_environment(stacks, runner, environment, args.parallelism, apply=args.action == 'apply')
+        print_summary(environment, results, time.perf_counter() - started)
+        if any(r.status in (FAILED, SKIPPED) for r in results.values()):
+            failed = True
+            break
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Check how events flow between the services of a monorepo, and export the graph.
+
+Loads every service.yaml under the root for one environment into a graph of
+API routes, Lambdas, event buses, rules, queues and workers. It then reports
+targets that name no worker queue, queues nothing delivers to, cycles, fan-out
+hot spots and message amplification. Exits 1 when there are errors.
+
+    python3 scripts/event-topology.py <monorepo-root> prod --dot events.dot --json events.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from infragen.discovery import find_services
+from infragen.loader import load_service_config
+from infragen.topology import analyse, build_graph, load_services, to_json, write_dot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('root', help="monorepo root to scan for service.yaml files")
+    parser.add_argument('environment')
+    parser.add_argument('--json', metavar='FILE', help="write nodes, edges and findings as JSON")
+    parser.add_argument('--dot', metavar='FILE', help="write the graph in Graphviz DOT format")
+    parser.add_argument('--fanout-threshold', type=int, default=5,
+                        help="warn when one event type reaches this many queues")
+    parser.add_argument('--amplification-threshold', type=int, default=10,
+                        help="warn when one published event produces this many SQS messages")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    sources = [(os.path.join(path, 'service.yaml'), load_service_config(path)) for path in find_services(args.root)]
+    loaded = time.perf_counter()
+    services = load_services(sources, args.environment)
+    validated = time.perf_counter()
+    graph, missing = build_graph(services)
+    findings, messages = analyse(graph, missing, args.fanout_threshold, args.amplification_threshold)
+    analysed = time.perf_counter()
+
+    for finding in sorted(findings, key=lambda f: (f.severity != 'error', f.kind, f.message)):
+        print(f"{'❌' if finding.severity == 'error' else '⚠️ '} {finding.kind}: {finding.message}")
+    errors = sum(f.severity == 'error' for f in findings)
+    print(f"{len(sources)} services, {len(graph.nodes)} nodes, {len(graph.edges)} edges, "
+          f"{errors} errors, {len(findings) - errors} warnings "
+          f"(load {(loaded - started) * 1000:.0f} ms, validate {(validated - loaded) * 1000:.0f} ms, "
+          f"graph + analysis {(analysed - validated) * 1000:.0f} ms)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(to_json(graph, findings, messages), f, indent=2)
+            f.write('\n')
+    if args.dot:
+        with open(args.dot, 'w') as f:
+            write_dot(graph, findings, f)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
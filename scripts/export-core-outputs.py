@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Export core outputs for one or more environments as local snapshots for the generated stacks.
+
+Run once per pipeline, after core is applied. For each environment, the core
+state is pulled once and <out>/<env>.tfstate keeps only its serial, lineage and
+non-sensitive outputs. Generating with --core-outputs <out> makes every stack
+read that snapshot instead of downloading the whole core state on each plan.
+
+    python3 scripts/export-core-outputs.py dev,prod --out build/core-outputs
+    python3 scripts/generate-all-infra.py <monorepo-root> dev,prod --core-outputs build/core-outputs
+
+--state reads an already pulled state file instead (one environment only).
+"""
+import argparse
+import json
+import os
+import sys
+
+from infragen.discovery import parse_environments
+from infragen.orchestrate import Runner, pull_core_snapshot
+from infragen.snapshot import SnapshotError, snapshot_from_state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('environments', help="comma-separated environments, e.g. dev,stg,prod, or all")
+    parser.add_argument('--out', default='core-outputs', help="directory for the <env>.tfstate snapshots")
+    parser.add_argument('--state', metavar='FILE', help="read this pulled core state instead of running terraform")
+    parser.add_argument('--terraform', default=os.environ.get('TERRAFORM', 'terraform'),
+                        help="terraform executable (default: $TERRAFORM or terraform on PATH)")
+    args = parser.parse_args()
+
+    environments = parse_environments([args.environments])
+    if not environments:
+        parser.error("no environments given (and none found under terraform/environments)")
+    if args.state and len(environments) != 1:
+        parser.error("--state takes exactly one environment")
+
+    os.makedirs(args.out, exist_ok=True)
+    runner = Runner(args.terraform, log=lambda line: print(line, file=sys.stderr))
+    for environment in environments:
+        try:
+            if args.state:
+                with open(args.state, 'r') as f:
+                    snapshot = snapshot_from_state(json.load(f), environment, source=args.state)
+            else:
+                snapshot = pull_core_snapshot(runner, environment)
+        except (SnapshotError, ValueError, KeyError) as e:
+            print(f"❌ {environment}: {e}")
+            sys.exit(1)
+        path = os.path.join(args.out, f"{environment}.tfstate")
+        with open(path, 'w') as f:
+            f.write(snapshot.text)
+        print(f"✅ {environment}: core outputs {snapshot.version} -> {path}")
+
+
+if __name__ == "__main__":
+    main()
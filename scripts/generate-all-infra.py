@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Generate Terraform for every service.yaml in a monorepo in a single run.
+
+Lambda services get generate_lambda_tf + generate_eventbridge_tf, workers get
+generate_worker_terraform. Each service is parsed once and rendered for all
+requested environments inside one worker process; per-environment manifests
+let unchanged services skip parsing and rendering entirely.
+"""
+import argparse
+import functools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from infragen.affected import affected_services, print_report
+from infragen.config import ConfigError, parse_duration
+from infragen.discovery import find_services, parse_environments, service_kind, shared_route_paths, terraform_dir
+from infragen.generators import service_generator, worker_generator
+from infragen.manifest import SKIPPED, WRITTEN, ServiceSource, generator_version, regenerate, status_message
+from infragen.snapshot import DEFAULT_MAX_AGE, SnapshotError, load_snapshots, sync_snapshot
+
+
+def render_any(service_config, environment, out, external_paths=(), core_snapshot=False, referenced_paths=()):
+    """Dispatch to the Lambda or worker generator based on the service kind"""
+    if service_kind(service_config) == 'lambda':
+        service_generator().render_service_tf(service_config, environment, out, external_paths, core_snapshot,
+                                              referenced_paths)
+    else:
+        worker_generator().write_worker_terraform(service_config, environment, out, core_snapshot)
+
+
+def generate_service(service_path, environments, version, force=False, snapshots=None, shared_paths=None):
+    """Pool task: bring main.tf up to date for each environment of one service.
+
+    service.yaml is read and parsed at most once; with intact manifests it is
+    not parsed at all. shared_paths maps environments to (API route prefixes
+    owned by another service, this service's paths that other services look
+    up), see --share-route-prefixes. snapshots maps environments to the core
+    outputs Snapshot to read instead of the S3 state (see --core-outputs).
+    """
+    started = time.perf_counter()
+    result = {'path': service_path, 'outputs': [], 'statuses': [], 'error': None}
+    try:
+        source = ServiceSource(service_path)
+        for environment in environments:
+            snapshot = (snapshots or {}).get(environment)
+            external_paths, referenced_paths = (shared_paths or {}).get(environment, ((), ()))
+            render = functools.partial(render_any, external_paths=external_paths, core_snapshot=snapshot is not None,
+                                       referenced_paths=referenced_paths)
+            options = {}
+            if external_paths:
+                options['external_paths'] = list(external_paths)
+            if referenced_paths:
+                options['referenced_paths'] = list(referenced_paths)
+            if snapshot:
+                options['core_snapshot'] = True
+            output_dir = terraform_dir(service_path, environment)
+            status = regenerate(source, environment, output_dir, render, version, options=options or None,
+                                force=force)
+            sync_snapshot(output_dir, snapshot)
+            result['outputs'].append(os.path.join(output_dir, 'main.tf'))
+            result['statuses'].append(status)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['total_seconds'] = time.perf_counter() - started
+    return result
+
+
+def shared_route_prefixes(root, environments):
+    """{service path: {environment: (prefixes owned by another service, own paths others reference)}}"""
+    shared = {}
+    for environment in environments:
+        for path, paths in shared_route_paths(root, environment).items():
+            shared.setdefault(path, {})[environment] = paths
+    return shared
+
+
+def print_summary(results, wall_seconds):
+    """Per-service timing table, slowest first"""
+    print()
+    print(f"{'SERVICE':<48} {'WRITTEN':>8} {'SKIPPED':>8} {'TOTAL ms':>9}")
+    for result in sorted(results, key=lambda r: r['total_seconds'], reverse=True):
+        print(f"{result['path']:<48} "
+              f"{result['statuses'].count(WRITTEN):>8} {result['statuses'].count(SKIPPED):>8} "
+              f"{result['total_seconds'] * 1000:>9.1f}")
+    busy = sum(r['total_seconds'] for r in results)
+    written = sum(r['statuses'].count(WRITTEN) for r in results)
+    print(f"\n{len(results)} services, {written} files written, "
+          f"{busy:.2f}s of generator time in {wall_seconds:.2f}s wall clock")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate Terraform for every service.yaml under a monorepo root")
+    parser.add_argument('root', help="monorepo root to scan for service.yaml files")
+    parser.add_argument('environments', help="comma-separated environments, e.g. dev,stg,prod, or all")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="size of the process pool")
+    parser.add_argument('--force', action='store_true', help="ignore manifests and re-render everything")
+    parser.add_argument('--share-route-prefixes', action='store_true',
+                        help="detect API paths used by several Lambda services and create each only once")
+    parser.add_argument('--changed', metavar='REV_RANGE',
+                        help="only generate services (and environments) whose service.yaml changed in this git range")
+    parser.add_argument('--core-outputs', metavar='DIR',
+                        help="read core outputs from DIR/<env>.tfstate snapshots instead of the S3 state")
+    parser.add_argument('--core-outputs-max-age', metavar='AGE', default=DEFAULT_MAX_AGE,
+                        help=f"refuse --core-outputs snapshots exported longer ago than this "
+                             f"(default {DEFAULT_MAX_AGE}, 0 = no limit)")
+    args = parser.parse_args()
+
+    environments = parse_environments([args.environments])
+    if not environments:
+        parser.error("no environments given (and none found under terraform/environments)")
+    try:
+        snapshots = load_snapshots(args.core_outputs, environments,
+                                   parse_duration(args.core_outputs_max_age, '--core-outputs-max-age'))
+    except (SnapshotError, ConfigError) as e:
+        parser.error(str(e))
+    if args.changed:
+        affected = affected_services(args.root, args.changed, environments)
+        print_report(affected, args.changed)
+        jobs = [(a.service_path, [e for e in environments if e in a.environments]) for a in affected
+                if a.environments]
+        if not jobs:
+            return
+    else:
+        jobs = [(path, environments) for path in find_services(args.root)]
+        if not jobs:
+            print(f"No service.yaml found under {args.root}")
+            sys.exit(1)
+
+    started = time.perf_counter()
+    version = generator_version()
+    shared = shared_route_prefixes(args.root, environments) if args.share_route_prefixes else {}
+    results = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(generate_service, path, envs, version, args.force, snapshots, shared.get(path))
+                   for path, envs in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result['error']:
+                print(f"❌ {result['path']}: {result['error']}")
+            else:
+                for output_file, status in zip(result['outputs'], result['statuses']):
+                    if status != SKIPPED:
+                        print(status_message(status, output_file))
+
+    print_summary(results, time.perf_counter() - started)
+    if any(r['error'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,23 @@
 #!/usr/bin/env python3
-import yaml
+import argparse
+import json
 import os
-import sys
-
-def generate_lambda_tf(service_config, environment):
-    """Generate Terraform for Lambda API service using existing API Gateway from core"""
-    name = service_config['name']
-    
-    # Get environment-specific config
-    env_config = service_config.get('environments', {}).get(environment, {})
-    base_resources = service_config.get('resources', {})
-    env_resources = env_config.get('resources', {})
-    
-    # Merge resources
-    memory = env_resources.get('memory', base_resources.get('memory', 512))
-    timeout_str = str(env_resources.get('timeout', base_resources.get('timeout', '30s')))
-    timeout = int(timeout_str.replace('s', ''))
-    
-    tf_content = f'''# Generated Terraform for {name}
+import subprocess
+
+from infragen.affected import affected_services, git, print_report
+from infragen.config import ConfigError, ServiceConfig, parse_duration
+from infragen.dashboard import api_widgets, event_widgets, lambda_widgets, write_dashboard
+from infragen.discovery import parse_environments, service_kind, shared_route_paths, terraform_dir
+from infragen.events import input_transformer, plan_event_rules
+from infragen.manifest import ServiceSource, generator_version, regenerate, status_message
+from infragen.providers import REQUIRED_PROVIDERS
+from infragen.render import Template, render_to_string, write_joined
+from infragen.routes import build_route_trie, collapse_to_proxy, normalize_path
+from infragen.snapshot import DEFAULT_MAX_AGE, SnapshotError, core_state, load_snapshots, sync_snapshot
+from infragen.tfvars import environment_tfvars
+
+# Terraform templates, compiled once per process
+LAMBDA_HEADER = Template('''# Generated Terraform for {name}
 terraform {{
   backend "s3" {{
     bucket = "terraform-state-647272350116"
@@ -25,6 +25,8 @@ terraform {{
     region = "us-east-1"
     encrypt = true
   }}
+
+{required_providers}
 }}
 
 provider "aws" {{
@@ -33,62 +35,94 @@ provider "aws" {{
 
 # Data source from core infrastructure
 data "terraform_remote_state" "core" {{
-  backend = "s3"
-  config = {{
-    bucket = "terraform-state-647272350116"
-    key    = "{environment}/core/terraform.tfstate"
-    region = "us-east-1"
-  }}
-}}
+{core_state}}}
 
 # Lambda function with Web Adapter
-resource "aws_lambda_function" "{name.replace('-', '_')}" {{
+resource "aws_lambda_function" "{ident}" {{
   function_name = "{environment}-{name}"
   role         = aws_iam_role.lambda_role.arn
-  handler      = "bootstrap"
-  runtime      = "provided.al2"
+  handler      = "{handler}"
+  runtime      = "{runtime}"
   filename     = "./{name}.zip"
   source_code_hash = filebase64sha256("./{name}.zip")
   description  = "Deployed on ${{formatdate("YYYY-MM-DD hh:mm:ss", timestamp())}}"
-  
+
   memory_size  = {memory}
   timeout      = {timeout}
-  architectures = ["{service_config.get('resources', {}).get('architecture', 'arm64')}"]
-  
-  # Enable Application Signals tracing
-  tracing_config {{
-    mode = "Active"
-  }}
-  
-  # Web Adapter Layer + Application Signals Layer
-  layers = [
-    "arn:aws:lambda:us-east-1:753240598075:layer:LambdaAdapterLayerArm64:25",
-    "arn:aws:lambda:us-east-1:901920570463:layer:aws-otel-collector-arm64-ver-0-102-1:1"
-  ]
-  
+  architectures = ["{architecture}"]
+
+{telemetry}
   # Publish version for API Gateway integration
   publish = true
-  
+{snap_start}
   environment {{
     variables = {{
+''')
+
+WEB_ADAPTER_LAYER = "arn:aws:lambda:us-east-1:753240598075:layer:LambdaAdapterLayerArm64:25"
+ADOT_LAYER = "arn:aws:lambda:us-east-1:901920570463:layer:aws-otel-collector-arm64-ver-0-102-1:1"
+
+# Tracing and layers per lambda.telemetry: the ADOT collector layer adds to every
+# cold start, X-Ray active tracing alone is handled by the Lambda service itself
+TELEMETRY = {
+    'adot': '''  # Enable Application Signals tracing
+  tracing_config {
+    mode = "Active"
+  }
+
+  # Web Adapter Layer + Application Signals Layer
+  layers = [
+    "%s",
+    "%s"
+  ]
+''' % (WEB_ADAPTER_LAYER, ADOT_LAYER),
+    'xray': '''  # X-Ray active tracing without the ADOT collector layer
+  tracing_config {
+    mode = "Active"
+  }
+
+  # Web Adapter Layer
+  layers = [
+    "%s"
+  ]
+''' % WEB_ADAPTER_LAYER,
+    'none': '''  tracing_config {
+    mode = "PassThrough"
+  }
+
+  # Web Adapter Layer
+  layers = [
+    "%s"
+  ]
+''' % WEB_ADAPTER_LAYER,
+}
+
+TELEMETRY_ENV = {
+    'adot': '''      # Application Signals
+      OTEL_PROPAGATORS = "tracecontext,baggage,xray"
+''',
+    'xray': '',
+    'none': '',
+}
+
+SNAP_START = '''
+  snap_start {
+    apply_on = "PublishedVersions"
+  }
 '''
-    
-    # Add environment variables
-    env_vars = env_config.get('environment_variables', {})
-    for key, value in env_vars.items():
-        tf_content += f'      {key} = "{value}"\n'
-    
-    tf_content += f'''      ENVIRONMENT = "{environment}"
+
+LAMBDA_ENV_VAR = Template('''      {key} = "{value}"
+''')
+
+LAMBDA_BODY = Template('''      ENVIRONMENT = "{environment}"
       SERVICE_NAME = "{name}"
       PORT = "8080"
       AWS_LAMBDA_EXEC_WRAPPER = "/opt/bootstrap"
-      AWS_LWA_ASYNC_INIT = "true"
-      AWS_LWA_READINESS_CHECK_PATH = "/health"
-      # Application Signals
-      OTEL_PROPAGATORS = "tracecontext,baggage,xray"
-    }}
+      AWS_LWA_ASYNC_INIT = "{async_init}"
+      AWS_LWA_READINESS_CHECK_PATH = "{readiness_check_path}"
+{web_adapter_env}{telemetry_env}    }}
   }}
-  
+
   # Application Signals service tags
   tags = {{
     Environment = "{environment}"
@@ -99,11 +133,11 @@ resource "aws_lambda_function" "{name.replace('-', '_')}" {{
 }}
 
 # Lambda Alias for stage management
-resource "aws_lambda_alias" "{name.replace('-', '_')}_alias" {{
-  name             = "{service_config.get('stage', 'latest')}"
+resource "aws_lambda_alias" "{ident}_alias" {{
+  name             = "{stage}"
   description      = "Alias for {name} pointing to latest version"
-  function_name    = aws_lambda_function.{name.replace('-', '_')}.function_name
-  function_version = aws_lambda_function.{name.replace('-', '_')}.version
+  function_name    = aws_lambda_function.{ident}.function_name
+  function_version = aws_lambda_function.{ident}.version
 }}
 
 # IAM role
@@ -143,7 +177,7 @@ resource "aws_iam_role_policy" "lambda_app_signals" {{
           "application-signals:*",
           "cloudwatch:PutMetricData",
           "logs:CreateLogGroup",
-          "logs:CreateLogStream", 
+          "logs:CreateLogStream",
           "logs:PutLogEvents"
         ]
         Resource = "*"
@@ -152,91 +186,159 @@ resource "aws_iam_role_policy" "lambda_app_signals" {{
   }})
 }}
 
+''')
+
+PROVISIONED_CONCURRENCY = Template('''# Provisioned concurrency on the {stage} alias
+resource "aws_lambda_provisioned_concurrency_config" "{ident}" {{
+  function_name                     = aws_lambda_alias.{ident}_alias.function_name
+  qualifier                         = aws_lambda_alias.{ident}_alias.name
+  provisioned_concurrent_executions = {units}
+{ignore_changes}}}
+
+''')
+
+# Application Auto Scaling owns the unit count once it is scaled
+PROVISIONED_CONCURRENCY_IGNORE = '''
+  lifecycle {
+    ignore_changes = [provisioned_concurrent_executions]
+  }
 '''
-    
-    # Generate API Gateway resources using existing API Gateway
-    created_resources = {}  # Track created resources to avoid duplicates
-    
-    for i, route in enumerate(service_config.get('routing', [])):
-        method = route.get('method', 'GET')
-        path = route.get('path', '/').lstrip('/')
-        
-        if not path:
-            continue
-            
-        # Split path into segments and create nested resources
-        path_segments = path.split('/')
-        parent_id = "data.terraform_remote_state.core.outputs.api_gateway_root_resource_id"
-        current_path = ""
-        
-        for segment in path_segments:
-            current_path = f"{current_path}/{segment}" if current_path else segment
-            resource_name = f"{name}_{current_path}".replace('/', '_').replace('-', '_')
-            
-            # Only create resource if not already created
-            if resource_name not in created_resources:
-                tf_content += f'''# API Gateway Resource - /{current_path} for {name}
+
+CONCURRENCY_AUTOSCALING = Template('''# Provisioned concurrency auto scaling
+resource "aws_appautoscaling_target" "{ident}_concurrency" {{
+  min_capacity       = {min_capacity}
+  max_capacity       = {max_capacity}
+  resource_id        = "function:${{aws_lambda_alias.{ident}_alias.function_name}}:${{aws_lambda_alias.{ident}_alias.name}}"
+  scalable_dimension = "lambda:function:ProvisionedConcurrency"
+  service_namespace  = "lambda"
+
+  depends_on = [aws_lambda_provisioned_concurrency_config.{ident}]
+}}
+
+resource "aws_appautoscaling_policy" "{ident}_concurrency_utilization" {{
+  name               = "{environment}-{name}-provisioned-concurrency"
+  policy_type        = "TargetTrackingScaling"
+  resource_id        = aws_appautoscaling_target.{ident}_concurrency.resource_id
+  scalable_dimension = aws_appautoscaling_target.{ident}_concurrency.scalable_dimension
+  service_namespace  = aws_appautoscaling_target.{ident}_concurrency.service_namespace
+
+  target_tracking_scaling_policy_configuration {{
+    target_value       = {target_utilization}
+    scale_in_cooldown  = {scale_in_cooldown}
+    scale_out_cooldown = {scale_out_cooldown}
+
+    predefined_metric_specification {{
+      predefined_metric_type = "LambdaProvisionedConcurrencyUtilization"
+    }}
+  }}
+}}
+
+''')
+
+CONCURRENCY_SCHEDULE = Template('''# Provisioned concurrency floor: {schedule_name}
+resource "aws_appautoscaling_scheduled_action" "{ident}_concurrency_{schedule_ident}" {{
+  name               = "{environment}-{name}-{schedule_name}"
+  service_namespace  = aws_appautoscaling_target.{ident}_concurrency.service_namespace
+  resource_id        = aws_appautoscaling_target.{ident}_concurrency.resource_id
+  scalable_dimension = aws_appautoscaling_target.{ident}_concurrency.scalable_dimension
+  schedule           = "{schedule}"
+  timezone           = "{timezone}"
+
+  scalable_target_action {{
+    min_capacity = {min_capacity}
+    max_capacity = {max_capacity}
+  }}
+}}
+
+''')
+
+ROUTE_COLLAPSE_NOTE = Template('''# Route collapsing for {name}: {paths} served by {{proxy+}}
+# API Gateway resources: {before} -> {after} ({saved} saved)
+
+''')
+
+API_RESOURCE = Template('''# API Gateway Resource - /{current_path} for {name}
 resource "aws_api_gateway_resource" "{resource_name}" {{
   rest_api_id = data.terraform_remote_state.core.outputs.api_gateway_id
   parent_id   = {parent_id}
   path_part   = "{segment}"
 }}
 
-'''
-                created_resources[resource_name] = f"aws_api_gateway_resource.{resource_name}.id"
-            
-            parent_id = created_resources[resource_name]
-        
-        # Method and Integration for the final resource
-        final_resource_name = f"{name}_{path}".replace('/', '_').replace('-', '_')
-        method_name = f"{final_resource_name}_{method.lower()}"
-        
-        tf_content += f'''# {method} Method for /{path} -> {name}
+''')
+
+API_RESOURCE_LOOKUP = Template('''# API Gateway Resource - /{path} is shared, created by another stack
+data "aws_api_gateway_resource" "{resource_name}" {{
+  rest_api_id = data.terraform_remote_state.core.outputs.api_gateway_id
+  path        = "/{path}"
+}}
+
+''')
+
+API_METHOD = Template('''# {method} Method for /{path} -> {name}
 resource "aws_api_gateway_method" "{method_name}" {{
   rest_api_id   = data.terraform_remote_state.core.outputs.api_gateway_id
   resource_id   = {parent_id}
   http_method   = "{method}"
   authorization = "NONE"
-}}
+{request_parameters}}}
 
 resource "aws_api_gateway_integration" "{method_name}" {{
   rest_api_id = data.terraform_remote_state.core.outputs.api_gateway_id
   resource_id = {parent_id}
   http_method = aws_api_gateway_method.{method_name}.http_method
-  
+
   integration_http_method = "POST"
   type                   = "AWS_PROXY"
-  uri                    = aws_lambda_alias.{name.replace('-', '_')}_alias.invoke_arn
-}}
+{integration}{cache_key_parameters}}}
+
+''')
 
+INVOKE_INTEGRATION = '''  uri                    = aws_lambda_alias.{ident}_alias.invoke_arn
 '''
-    
-    # Lambda Permission for API Gateway
-    tf_content += f'''# Lambda Permission for API Gateway
+
+# Lets API Gateway pass the Web Adapter's AWS_LWA_INVOKE_MODE=response_stream output through
+STREAMING_INTEGRATION = '''  uri                    = "arn:aws:apigateway:us-east-1:lambda:path/2021-11-15/functions/${{aws_lambda_alias.{ident}_alias.arn}}/response-streaming-invocations"
+  response_transfer_mode = "STREAM"
+'''
+
+METHOD_SETTINGS = Template('''# Stage cache and throttling for {method} /{path}
+resource "aws_api_gateway_method_settings" "{method_name}" {{
+  rest_api_id = data.terraform_remote_state.core.outputs.api_gateway_id
+  stage_name  = data.terraform_remote_state.core.outputs.api_gateway_stage_name
+  method_path = "{path}/{method}"
+
+  settings {{
+{settings}  }}
+
+  depends_on = [aws_api_gateway_method.{method_name}]
+}}
+
+''')
+
+CACHE_CLUSTER_NOTE = Template('''# Note: api_cache_cluster is not enabled in {environment}.tfvars, so the cache
+# settings below have no effect until the core stage has a cache cluster.
+
+''')
+
+LAMBDA_PERMISSION = Template('''# Lambda Permission for API Gateway
 resource "aws_lambda_permission" "api_gateway" {{
   statement_id  = "AllowExecutionFromAPIGateway"
   action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_alias.{name.replace('-', '_')}_alias.function_name
-  qualifier     = aws_lambda_alias.{name.replace('-', '_')}_alias.name
+  function_name = aws_lambda_alias.{ident}_alias.function_name
+  qualifier     = aws_lambda_alias.{ident}_alias.name
   principal     = "apigateway.amazonaws.com"
   source_arn    = "${{data.terraform_remote_state.core.outputs.api_gateway_execution_arn}}/*/*"
 }}
 
-'''
-    
-    # Generate secrets from service.yaml
-    secrets = service_config.get('secrets', [])
-    if secrets:
-        tf_content += f'''# Secrets Manager for {name}
-'''
-        for secret in secrets:
-            secret_name = f"{environment}/{name}/{secret}"
-            resource_name = f"{name}_{secret}".replace('-', '_')
-            
-            tf_content += f'''resource "aws_secretsmanager_secret" "{resource_name}" {{
+''')
+
+SECRETS_HEADER = Template('''# Secrets Manager for {name}
+''')
+
+SECRET = Template('''resource "aws_secretsmanager_secret" "{resource_name}" {{
   name = "{secret_name}"
   description = "Secret {secret} for {name} service in {environment}"
-  
+
   tags = {{
     Service = "{name}"
     Environment = "{environment}"
@@ -246,17 +348,15 @@ resource "aws_lambda_permission" "api_gateway" {{
 resource "aws_secretsmanager_secret_version" "{resource_name}_version" {{
   secret_id     = aws_secretsmanager_secret.{resource_name}.id
   secret_string = "n/a"
-  
+
   lifecycle {{
     ignore_changes = [secret_string]
   }}
 }}
 
-'''
-    
-    # Lambda IAM policy for secrets access
-    if secrets:
-        tf_content += f'''# IAM policy for secrets access
+''')
+
+SECRETS_POLICY_HEADER = Template('''# IAM policy for secrets access
 resource "aws_iam_role_policy" "secrets_policy" {{
   name = "{environment}-{name}-secrets-policy"
   role = aws_iam_role.lambda_role.id
@@ -270,23 +370,20 @@ resource "aws_iam_role_policy" "secrets_policy" {{
           "secretsmanager:GetSecretValue"
         ]
         Resource = [
-'''
-        for secret in secrets:
-            resource_name = f"{name}_{secret}".replace('-', '_')
-            tf_content += f'          aws_secretsmanager_secret.{resource_name}.arn,\n'
-        
-        tf_content = tf_content.rstrip(',\n') + '\n'  # Remove last comma
-        tf_content += '''        ]
-      }
+''')
+
+SECRET_ARN = '          aws_secretsmanager_secret.{resource_name}.arn'
+
+SECRETS_POLICY_FOOTER = Template('''
+        ]
+      }}
     ]
-  })
-}
+  }})
+}}
 
-'''
+''')
 
-    # EventBridge permissions if events are configured
-    if service_config.get('event_routing'):
-        tf_content += f'''# IAM policy for EventBridge access
+EVENTBRIDGE_POLICY = Template('''# IAM policy for EventBridge access
 resource "aws_iam_role_policy" "eventbridge_policy" {{
   name = "{environment}-{name}-eventbridge-policy"
   role = aws_iam_role.lambda_role.id
@@ -299,124 +396,537 @@ resource "aws_iam_role_policy" "eventbridge_policy" {{
         Action = [
           "events:PutEvents"
         ]
-        Resource = aws_cloudwatch_event_bus.{name.replace('-', '_')}_events.arn
+        Resource = aws_cloudwatch_event_bus.{ident}_events.arn
       }}
     ]
   }})
 }}
 
-'''
-    
-    # Generate endpoints output
-    endpoints_output = ""
-    for endpoint in service_config.get('routing', []):
-        base_url = "${replace(data.terraform_remote_state.core.outputs.api_gateway_invoke_url, \"/v1\", \"/" + service_config.get('stage', 'latest') + "\")}"
-        endpoints_output += f'    "{endpoint["method"]} {endpoint["path"]}" = "{base_url}{endpoint["path"]}"\n'
-    
-    tf_content += f'''# Outputs
+''')
+
+OUTPUTS_HEADER = Template('''# Outputs
 output "lambda_arn" {{
-  value = aws_lambda_function.{name.replace('-', '_')}.arn
+  value = aws_lambda_function.{ident}.arn
 }}
 
 output "api_gateway_url" {{
-  value = "${{replace(data.terraform_remote_state.core.outputs.api_gateway_invoke_url, "/v1", "/{service_config.get('stage', 'latest')}")}}"
+  value = "${{replace(data.terraform_remote_state.core.outputs.api_gateway_invoke_url, "/v1", "/{stage}")}}"
 }}
 
 output "api_gateway_stage" {{
-  value = "{service_config.get('stage', 'latest')}"
+  value = "{stage}"
 }}
 
 output "api_endpoints" {{
   value = {{
-{endpoints_output.rstrip()}
+''')
+
+ENDPOINT = Template('''    "{method} {path}" = "${{replace(data.terraform_remote_state.core.outputs.api_gateway_invoke_url, "/v1", "/{stage}")}}{path}"''')
+
+OUTPUTS_FOOTER = Template('''
   }}
 }}
-'''
-    
-    return tf_content
+''')
 
-def generate_eventbridge_tf(service_config, environment):
-    """Generate EventBridge resources with rules for each service"""
-    name = service_config['name']
-    
-    tf_content = f'''
+COLD_START_REPORT = Template('''
+output "cold_start_options" {{
+  value = {{
+{options}
+  }}
+}}
+''')
+
+EVENT_BUS = Template('''
 # EventBridge bus for {name}
-resource "aws_cloudwatch_event_bus" "{name.replace('-', '_')}_events" {{
+resource "aws_cloudwatch_event_bus" "{ident}_events" {{
   name = "{environment}-{name}-events"
 }}
 
-'''
-    
-    # Generate EventBridge rules from event_routing in service.yaml
-    for routing in service_config.get('event_routing', []):
-        event_type = routing.get('event', '')  # Use 'event' not 'event_type'
-        rule_name = f"{name}_{event_type}".replace('-', '_').replace('.', '_')
-        
-        tf_content += f'''# EventBridge rule for {event_type}
+''')
+
+EVENT_RULE = Template('''# EventBridge rule for {event_types}
 resource "aws_cloudwatch_event_rule" "{rule_name}" {{
-  name           = "{environment}-{name}-{event_type}"
-  event_bus_name = aws_cloudwatch_event_bus.{name.replace('-', '_')}_events.name
-  
+  name           = "{environment}-{rule}"
+  event_bus_name = aws_cloudwatch_event_bus.{ident}_events.name
+
   event_pattern = jsonencode({{
     source      = ["{name}"]
-    detail-type = ["{event_type}"]
+    detail-type = [{detail_types}]
   }})
 }}
 
-'''
-        
-        # Generate targets for each rule
-        for i, target in enumerate(routing.get('targets', [])):
-            target_name = f"{rule_name}_target_{i}"
-            queue_name = target.get('queue', target)
-            
-            tf_content += f'''# EventBridge target to {queue_name}
+''')
+
+EVENT_TARGET = Template('''# EventBridge target to {queue_name}
 resource "aws_cloudwatch_event_target" "{target_name}" {{
   rule           = aws_cloudwatch_event_rule.{rule_name}.name
-  event_bus_name = aws_cloudwatch_event_bus.{name.replace('-', '_')}_events.name
+  event_bus_name = aws_cloudwatch_event_bus.{ident}_events.name
   target_id      = "{queue_name}"
   arn            = "arn:aws:sqs:us-east-1:${{data.aws_caller_identity.current.account_id}}:{environment}-{queue_name}"
+{sqs_target}{delivery}}}
+
+''')
+
+INPUT_TRANSFORMER = '''
+  # Only the fields the consumer reads
+  input_transformer {{
+    input_paths = {{
+{paths}
+    }}
+    input_template = {template}
+  }}
+'''
+
+RETRY_POLICY = '''
+  retry_policy {{
+{settings}
+  }}
+'''
+
+DEAD_LETTER_CONFIG = '''
+  dead_letter_config {{
+    arn = aws_sqs_queue.{ident}_events_dlq.arn
+  }}
+'''
+
+EVENTS_DLQ = Template('''# Dead-letter queue for events EventBridge could not deliver
+resource "aws_sqs_queue" "{ident}_events_dlq" {{
+  name                      = "{environment}-{name}-events-dlq"
+  message_retention_seconds = 1209600
 }}
 
+resource "aws_sqs_queue_policy" "{ident}_events_dlq" {{
+  queue_url = aws_sqs_queue.{ident}_events_dlq.id
+
+  policy = jsonencode({{
+    Version = "2012-10-17"
+    Statement = [{{
+      Effect    = "Allow"
+      Principal = {{ Service = "events.amazonaws.com" }}
+      Action    = "sqs:SendMessage"
+      Resource  = aws_sqs_queue.{ident}_events_dlq.arn
+      Condition = {{
+        ArnEquals = {{
+          "aws:SourceArn" = [{rule_arns}]
+        }}
+      }}
+    }}]
+  }})
+}}
+
+''')
+
+# FIFO targets need a message group; events of one group are delivered in order
+SQS_FIFO_TARGET = '''
+  sqs_target {{
+    message_group_id = "{}"
+  }}
 '''
-    
+
+CALLER_IDENTITY = Template('''# Data source for account ID
+data "aws_caller_identity" "current" {{}}
+
+''')
+
+
+def plan_routes(config, external_paths=(), referenced_paths=()):
+    """Route trie for a ServiceConfig, plus the collapse report when collapse_routes is on"""
+    trie = build_route_trie(config, external_paths)
+    if config.collapse_routes:
+        return trie, collapse_to_proxy(trie, referenced_paths)
+    return trie, None
+
+
+def write_provisioned_concurrency(config, concurrency, out):
+    """Provisioned concurrency on the alias, plus target tracking and scheduled floors when autoscaled"""
+    common = {'name': config.name, 'ident': config.ident, 'environment': config.environment}
+    PROVISIONED_CONCURRENCY.render(out, common, stage=config.stage, units=concurrency.units,
+                                   ignore_changes=PROVISIONED_CONCURRENCY_IGNORE if concurrency.autoscaled else '')
+    if not concurrency.autoscaled:
+        return
+    CONCURRENCY_AUTOSCALING.render(out, common, min_capacity=concurrency.min_capacity,
+                                   max_capacity=concurrency.max_capacity,
+                                   target_utilization=concurrency.target_utilization,
+                                   scale_in_cooldown=concurrency.scale_in_cooldown,
+                                   scale_out_cooldown=concurrency.scale_out_cooldown)
+    for schedule in concurrency.schedules:
+        CONCURRENCY_SCHEDULE.render(out, common, schedule_name=schedule.name,
+                                    schedule_ident=schedule.name.replace('-', '_'), schedule=schedule.schedule,
+                                    timezone=schedule.timezone, min_capacity=schedule.min_capacity,
+                                    max_capacity=schedule.max_capacity)
+
+
+def web_adapter_env(settings):
+    """Optional Lambda Web Adapter variables as (name, value) pairs"""
+    env = []
+    if settings.readiness_check_port is not None:
+        env.append(('AWS_LWA_READINESS_CHECK_PORT', settings.readiness_check_port))
+    if settings.readiness_check_protocol:
+        env.append(('AWS_LWA_READINESS_CHECK_PROTOCOL', settings.readiness_check_protocol))
+    if settings.readiness_check_min_unhealthy_status is not None:
+        env.append(('AWS_LWA_READINESS_CHECK_MIN_UNHEALTHY_STATUS', settings.readiness_check_min_unhealthy_status))
+    if settings.streaming:
+        env.append(('AWS_LWA_INVOKE_MODE', settings.invoke_mode))
+    return env
+
+
+def cold_start_options(config):
+    """{option: value} for the init-related settings applied to the function"""
+    settings = config.lambda_settings
+    if settings.snapstart_applied:
+        snapstart = 'enabled'
+    elif settings.snapstart:
+        snapstart = f"unsupported by {settings.runtime}"
+    else:
+        snapstart = 'disabled'
+    return {
+        'runtime': settings.runtime,
+        'architecture': config.resources.architecture,
+        'memory': config.resources.memory,
+        'telemetry': settings.telemetry,
+        'layers': 2 if settings.telemetry == 'adot' else 1,
+        'async_init': str(settings.async_init).lower(),
+        'readiness_check': ' '.join(f"{key}={value}" for key, value in (
+            ('path', settings.readiness_check_path), ('port', settings.readiness_check_port),
+            ('protocol', settings.readiness_check_protocol),
+            ('min_unhealthy_status', settings.readiness_check_min_unhealthy_status)) if value is not None),
+        'invoke_mode': settings.invoke_mode,
+        'snapstart': snapstart,
+        'provisioned_concurrency': config.provisioned_concurrency.units if config.provisioned_concurrency else 0,
+    }
+
+
+def cache_key_parameters(route):
+    """method.request.* parameters that key a cached route: every path parameter plus the declared ones"""
+    parameters = [f"path.{name}" for name in route.path_parameters]
+    parameters += [parameter for parameter in route.cache_key_parameters if parameter not in parameters]
+    return [f"method.request.{parameter}" for parameter in parameters]
+
+
+def method_cache_settings(route):
+    """(request_parameters, cache_key_parameters) blocks for a method and its integration"""
+    if not route or not route.cached:
+        return '', ''
+    parameters = cache_key_parameters(route)
+    if not parameters:
+        return '', ''
+    request = ''.join(f'    "{parameter}" = {str(parameter.startswith("method.request.path.")).lower()}\n'
+                      for parameter in parameters)
+    keys = ', '.join(f'"{parameter}"' for parameter in parameters)
+    return f"\n  request_parameters = {{\n{request}  }}\n", f"\n  cache_key_parameters = [{keys}]\n"
+
+
+def method_settings(route):
+    """Body of the settings block for a route's stage method settings"""
+    # Method settings replace the stage defaults, so keep the detailed metrics the dashboards use
+    lines = ["    metrics_enabled        = true",
+             f"    caching_enabled        = {str(route.cached).lower()}"]
+    if route.cached:
+        lines.append(f"    cache_ttl_in_seconds   = {route.cache_ttl}")
+    if route.throttle_rate_limit is not None:
+        lines.append(f"    throttling_rate_limit  = {route.throttle_rate_limit}")
+    if route.throttle_burst_limit is not None:
+        lines.append(f"    throttling_burst_limit = {route.throttle_burst_limit}")
+    return ''.join(f"{line}\n" for line in lines)
+
+
+def write_lambda_tf(service_config, environment, out, external_paths=(), core_snapshot=False, referenced_paths=()):
+    """Stream Terraform for Lambda API service using existing API Gateway from core.
+
+    external_paths are route prefixes created by another service's stack, and
+    referenced_paths are this service's paths other stacks look up, which are
+    never collapsed. With core_snapshot, core outputs are read from a local
+    snapshot next to main.tf. Returns the collapse report of plan_routes().
+    """
+    return write_lambda_resources(ServiceConfig.from_yaml(service_config, environment), out, external_paths,
+                                  core_snapshot, referenced_paths)
+
+
+def write_lambda_resources(config, out, external_paths=(), core_snapshot=False, referenced_paths=()):
+    """write_lambda_tf for an already merged ServiceConfig"""
+    environment = config.environment
+    name, ident, stage = config.name, config.ident, config.stage
+    resources = config.resources
+
+    settings = config.lambda_settings
+    LAMBDA_HEADER.render(out, name=name, ident=ident, environment=environment, memory=resources.memory,
+                         timeout=resources.timeout, architecture=resources.architecture,
+                         handler=settings.handler, runtime=settings.runtime,
+                         telemetry=TELEMETRY[settings.telemetry],
+                         snap_start=SNAP_START if settings.snapstart_applied else '',
+                         required_providers=REQUIRED_PROVIDERS,
+                         core_state=core_state(environment, core_snapshot))
+
+    # Add environment variables
+    for key, value in config.environment_variables.items():
+        LAMBDA_ENV_VAR.render(out, key=key, value=value)
+
+    LAMBDA_BODY.render(out, name=name, ident=ident, environment=environment, stage=stage,
+                       async_init=str(settings.async_init).lower(),
+                       readiness_check_path=settings.readiness_check_path,
+                       web_adapter_env=''.join(f'      {key} = "{value}"\n'
+                                               for key, value in web_adapter_env(settings)),
+                       telemetry_env=TELEMETRY_ENV[settings.telemetry])
+
+    concurrency = config.provisioned_concurrency
+    if concurrency:
+        write_provisioned_concurrency(config, concurrency, out)
+
+    # Generate API Gateway resources using existing API Gateway, one per route trie node
+    integration = (STREAMING_INTEGRATION if settings.streaming else INVOKE_INTEGRATION).format(ident=ident)
+    trie, collapse_report = plan_routes(config, external_paths, referenced_paths)
+    if collapse_report and collapse_report[2]:
+        before, after, collapsed = collapse_report
+        ROUTE_COLLAPSE_NOTE.render(out, name=name, paths=', '.join(f"/{path}" for path in collapsed),
+                                   before=before, after=after, saved=before - after)
+    routes = {(route.method, normalize_path(route.path)): route for route in config.routing}
+    if any(route.cached for route in config.routing) and \
+            not environment_tfvars(environment).get('api_cache_cluster', {}).get('enabled'):
+        CACHE_CLUSTER_NOTE.render(out, environment=environment)
+    for node in trie.walk():
+        if node.external:
+            API_RESOURCE_LOOKUP.render(out, path=node.path, name=name, resource_name=node.resource_name)
+        else:
+            API_RESOURCE.render(out, current_path=node.path, name=name, resource_name=node.resource_name,
+                                parent_id=node.parent.reference(), segment=node.segment)
+
+        # Methods and Integrations grouped on their resource
+        for method in node.methods:
+            method_name = f"{node.resource_name}_{method.lower()}"
+            route = routes.get((method, node.path))
+            request_parameters, cache_keys = method_cache_settings(route)
+            API_METHOD.render(out, method=method, path=node.path, name=name, ident=ident,
+                              parent_id=node.reference(), method_name=method_name, integration=integration,
+                              request_parameters=request_parameters, cache_key_parameters=cache_keys)
+            if route and route.method_settings:
+                METHOD_SETTINGS.render(out, method=method, path=node.path, method_name=method_name,
+                                       settings=method_settings(route))
+
+    # Lambda Permission for API Gateway
+    LAMBDA_PERMISSION.render(out, ident=ident)
+
+    # Dashboard from the same routes, rules and function as the resources above
+    widgets = api_widgets([(method, f"/{node.path}") for node in trie.walk() for method in node.methods])
+    widgets += lambda_widgets(f"{environment}-{name}", provisioned_alias=stage if concurrency else None)
+    if config.event_routing:
+        widgets += event_widgets(f"{environment}-{name}-events",
+                                 [f"{environment}-{rule.name}" for rule in plan_event_rules(config)],
+                                 f"{environment}-{name}-events-dlq" if config.event_delivery.dead_letter_queue
+                                 else None)
+    write_dashboard(out, name, ident, environment, widgets)
+
+    # Generate secrets from service.yaml
+    secrets = config.secrets
+    if secrets:
+        SECRETS_HEADER.render(out, name=name)
+        for secret in secrets:
+            SECRET.render(out, resource_name=f"{name}_{secret}".replace('-', '_'), secret=secret, name=name,
+                          secret_name=f"{environment}/{name}/{secret}", environment=environment)
+
+        # Lambda IAM policy for secrets access
+        SECRETS_POLICY_HEADER.render(out, environment=environment, name=name)
+        write_joined(out, (SECRET_ARN.format(resource_name=f"{name}_{secret}".replace('-', '_'))
+                           for secret in secrets), ',\n')
+        SECRETS_POLICY_FOOTER.render(out)
+
+    # EventBridge permissions if events are configured
+    if config.event_routing:
+        EVENTBRIDGE_POLICY.render(out, environment=environment, name=name, ident=ident)
+
+    # Outputs, including one endpoint per route
+    OUTPUTS_HEADER.render(out, ident=ident, stage=stage)
+    for i, route in enumerate(config.routing):
+        if i:
+            out.write('\n')
+        ENDPOINT.render(out, method=route.method, path=route.path, stage=stage)
+    OUTPUTS_FOOTER.render(out)
+    COLD_START_REPORT.render(out, options='\n'.join(f'    {key} = "{value}"'
+                                                     for key, value in cold_start_options(config).items()))
+    return collapse_report
+
+
+def target_delivery(target, delivery, ident):
+    """input_transformer, retry_policy and dead_letter_config blocks for one event target"""
+    blocks = []
+    if target.fields:
+        paths, template = input_transformer(target)
+        blocks.append(INPUT_TRANSFORMER.format(
+            paths='\n'.join(f'      {key} = "{path}"' for key, path in paths.items()),
+            template=json.dumps(template)))
+    if delivery.retry:
+        settings = []
+        if delivery.max_event_age is not None:
+            settings.append(f"    maximum_event_age_in_seconds = {delivery.max_event_age}")
+        if delivery.retry_attempts is not None:
+            settings.append(f"    maximum_retry_attempts       = {delivery.retry_attempts}")
+        blocks.append(RETRY_POLICY.format(settings='\n'.join(settings)))
+    if delivery.dead_letter_queue:
+        blocks.append(DEAD_LETTER_CONFIG.format(ident=ident))
+    return ''.join(blocks)
+
+
+def write_eventbridge_tf(service_config, environment, out):
+    """Stream EventBridge resources with rules for each service"""
+    write_eventbridge_resources(ServiceConfig.from_yaml(service_config, environment), out)
+
+
+def write_eventbridge_resources(config, out):
+    """write_eventbridge_tf for an already merged ServiceConfig"""
+    environment = config.environment
+    name, ident = config.name, config.ident
+    delivery = config.event_delivery
+
+    EVENT_BUS.render(out, name=name, ident=ident, environment=environment)
+
+    # Generate EventBridge rules from event_routing in service.yaml
+    rules = plan_event_rules(config)
+    for rule in rules:
+        EVENT_RULE.render(out, event_types=', '.join(rule.event_types), rule_name=rule.resource_name,
+                          rule=rule.name, environment=environment, name=name, ident=ident,
+                          detail_types=', '.join(f'"{event_type}"' for event_type in rule.event_types))
+
+        # Generate targets for each rule
+        for i, target in enumerate(rule.targets):
+            group_id = rule.group_id(target)
+            EVENT_TARGET.render(out, queue_name=target.queue, target_name=f"{rule.resource_name}_target_{i}",
+                                rule_name=rule.resource_name, ident=ident, environment=environment,
+                                sqs_target=SQS_FIFO_TARGET.format(group_id) if group_id else '',
+                                delivery=target_delivery(target, delivery, ident))
+
+    if delivery.dead_letter_queue and rules:
+        EVENTS_DLQ.render(out, name=name, ident=ident, environment=environment,
+                          rule_arns=', '.join(f"aws_cloudwatch_event_rule.{rule.resource_name}.arn"
+                                              for rule in rules))
+
     # Add data source for account ID
-    if service_config.get('event_routing'):
-        tf_content += '''# Data source for account ID
-data "aws_caller_identity" "current" {}
+    if config.event_routing:
+        CALLER_IDENTITY.render(out)
+
+
+def generate_lambda_tf(service_config, environment, external_paths=()):
+    """Generate Terraform for Lambda API service using existing API Gateway from core"""
+    return render_to_string(lambda config, env, out: write_lambda_tf(config, env, out, external_paths),
+                            service_config, environment)
+
+
+def generate_eventbridge_tf(service_config, environment):
+    """Generate EventBridge resources with rules for each service"""
+    return render_to_string(write_eventbridge_tf, service_config, environment)
+
+
+def render_service_tf(service_config, environment, out, external_paths=(), core_snapshot=False, referenced_paths=()):
+    """Stream Lambda + EventBridge Terraform for one environment into out.
+
+    service.yaml is merged and validated once for both. Returns
+    (route collapse report, cold start options) for the caller to print.
+    """
+    config = ServiceConfig.from_yaml(service_config, environment)
+    collapse_report = write_lambda_resources(config, out, external_paths, core_snapshot, referenced_paths)
+    write_eventbridge_resources(config, out)
+    return collapse_report, cold_start_options(config)
+
+
+def collapses_routes(service_config):
+    """True when service.yaml sets collapse_routes at the top level or for any environment"""
+    overlays = (service_config.get('environments') or {}).values()
+    return bool(service_config.get('collapse_routes')) or any((overlay or {}).get('collapse_routes')
+                                                               for overlay in overlays)
+
+
+def monorepo_root(service_path):
+    """Top level of the git checkout holding service_path, or None outside one"""
+    try:
+        return git(service_path, 'rev-parse', '--show-toplevel').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
 
-'''
-    
-    return tf_content
 
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: python3 generate-service-infra.py <service-path> <environment>")
-        sys.exit(1)
-    
-    service_path = sys.argv[1]
-    environment = sys.argv[2]
-    
-    # Read service.yaml
-    with open(f"{service_path}/service.yaml", 'r') as f:
-        service_config = yaml.safe_load(f)
-    
-    service_name = service_config['name']
-    
-    # Create terraform directory in service/.terraform
-    terraform_dir = f"{service_path}/.terraform"
-    os.makedirs(terraform_dir, exist_ok=True)
-    
-    # Generate Terraform files
-    lambda_tf = generate_lambda_tf(service_config, environment)
-    eventbridge_tf = generate_eventbridge_tf(service_config, environment)
-    
-    # Write to service/.terraform directory
-    with open(f"{terraform_dir}/main.tf", 'w') as f:
-        f.write(lambda_tf)
-        f.write(eventbridge_tf)
-    
-    print(f"Generated Terraform in {terraform_dir}/main.tf")
+    parser = argparse.ArgumentParser(description="Generate Terraform for a Lambda API service")
+    parser.add_argument('service_path', help="service directory, or the monorepo root with --changed")
+    parser.add_argument('environments', nargs='+', help="environments (dev stg, dev,stg or all); each is written "
+                                                         "to <service>/.terraform/<environment>/main.tf")
+    parser.add_argument('--force', action='store_true', help="ignore the manifest and re-render")
+    parser.add_argument('--changed', metavar='REV_RANGE',
+                        help="only generate Lambda services whose service.yaml changed in this git range")
+    parser.add_argument('--core-outputs', metavar='DIR',
+                        help="read core outputs from DIR/<env>.tfstate snapshots instead of the S3 state")
+    parser.add_argument('--core-outputs-max-age', metavar='AGE', default=DEFAULT_MAX_AGE,
+                        help=f"refuse --core-outputs snapshots exported longer ago than this "
+                             f"(default {DEFAULT_MAX_AGE}, 0 = no limit)")
+    parser.add_argument('--root', help="monorepo root whose services may look up this service's routes "
+                                       "(default: the git top level; the positional path with --changed)")
+    args = parser.parse_args()
+
+    environments = parse_environments(args.environments)
+    if not environments:
+        parser.error("no environments given (and none found under terraform/environments)")
+    try:
+        snapshots = load_snapshots(args.core_outputs, environments,
+                                   parse_duration(args.core_outputs_max_age, '--core-outputs-max-age'))
+    except (SnapshotError, ConfigError) as e:
+        parser.error(str(e))
+
+    if args.changed:
+        affected = affected_services(args.service_path, args.changed, environments)
+        print_report(affected, args.changed)
+        jobs = [(a.service_path, [e for e in environments if e in a.environments]) for a in affected
+                if a.environments and service_kind(a.config) == 'lambda']
+    else:
+        jobs = [(args.service_path, environments)]
+
+    # Paths that other services look up must survive collapse_routes, so they
+    # are planned over the whole monorepo, once per environment
+    root = args.service_path if args.changed else args.root or monorepo_root(args.service_path)
+    shared = {}
+
+    def referenced_paths(service_path, environment):
+        if environment not in shared:
+            shared[environment] = {os.path.realpath(path): paths
+                                   for path, paths in shared_route_paths(root, environment).items()}
+        return shared[environment].get(os.path.realpath(service_path), ((), ()))[1]
+
+    version = generator_version()
+    for service_path, service_environments in jobs:
+        # service.yaml is read and parsed once, then rendered per environment
+        source = ServiceSource(service_path)
+        collapse_routes = collapses_routes(source.config)
+        if collapse_routes and root is None:
+            parser.error(f"{service_path} sets collapse_routes outside a git checkout; pass --root so paths "
+                         f"other services look up are never collapsed")
+        for environment in service_environments:
+            # Regenerate only when service.yaml, the generator or the output changed
+            output_dir = terraform_dir(service_path, environment)
+            snapshot = snapshots.get(environment)
+            referenced = referenced_paths(service_path, environment) if collapse_routes else ()
+            reports = []
+
+            # The reports come from the render itself, so a skipped environment
+            # is never merged and what is printed matches the Terraform written
+            def render(config, env, out):
+                reports.append(render_service_tf(config, env, out, core_snapshot=snapshot is not None,
+                                                 referenced_paths=referenced))
+
+            options = {}
+            if referenced:
+                options['referenced_paths'] = list(referenced)
+            if snapshot:
+                options['core_snapshot'] = True
+            status = regenerate(source, environment, output_dir, render, version, options=options or None,
+                                force=args.force)
+            sync_snapshot(output_dir, snapshot)
+            print(status_message(status, os.path.join(output_dir, 'main.tf')))
+            if not reports:
+                continue
+
+            collapse, cold_start = reports[0]
+            print("Cold start: " + ' '.join(f"{key}={value}" for key, value in cold_start.items()
+                                            if key != 'readiness_check'))
+            if collapse and collapse[2]:
+                before, after, collapsed = collapse
+                print(f"Collapsed {len(collapsed)} route subtree(s) into {{proxy+}}: "
+                      f"{before} -> {after} API Gateway resources ({before - after} saved)")
+
 
 if __name__ == "__main__":
     main()
@@ -1,65 +1,54 @@
 #!/usr/bin/env python3
 
-import yaml
-import sys
+import argparse
+import functools
 import os
 
-def generate_worker_terraform(service_path, environment):
-    # Read service.yaml
-    service_yaml_path = os.path.join(service_path, 'service.yaml')
-    with open(service_yaml_path, 'r') as f:
-        service_config = yaml.safe_load(f)
-    
-    # Get service name and config
-    name = service_config['name']
-    
-    # Get environment-specific config
-    env_config = service_config.get('environments', {}).get(environment, {})
-    
-    # Merge base and environment config
-    resources = {**service_config.get('resources', {}), **env_config.get('resources', {})}
-    scaling = {**service_config.get('scaling', {}), **env_config.get('scaling', {})}
-    deployment = {**service_config.get('deployment', {}), **env_config.get('deployment', {})}
-    env_vars = env_config.get('environment_variables', {})
-    secrets = service_config.get('secrets', [])
-    
-    # Merge circuit_breaker config specifically
-    base_circuit_breaker = service_config.get('scaling', {}).get('circuit_breaker', {})
-    env_circuit_breaker = env_config.get('scaling', {}).get('circuit_breaker', {})
-    circuit_breaker = {**base_circuit_breaker, **env_circuit_breaker}
-
-    # Generate Terraform
-    tf_content = f'''terraform {{
+from infragen.affected import affected_services, print_report
+from infragen.config import ConfigError, ServiceConfig, parse_duration
+from infragen.dashboard import ecs_widgets, queue_widgets, write_dashboard
+from infragen.discovery import parse_environments, service_kind, terraform_dir
+from infragen.manifest import ServiceSource, generator_version, regenerate, status_message
+from infragen.providers import REQUIRED_PROVIDERS
+from infragen.render import Template, render_to_string
+from infragen.scaling import BACKLOG_METRIC, backlog_target, max_tasks, scale_down_threshold, step_adjustments
+from infragen.snapshot import DEFAULT_MAX_AGE, SnapshotError, core_state, load_snapshots, sync_snapshot
+from infragen.tfvars import environment_tfvars
+
+# Container stopTimeout when Spot is used and service.yaml sets none, and the
+# seconds kept back from it to hand unfinished messages back to the queue
+DEFAULT_STOP_TIMEOUT = 30
+DRAIN_MARGIN = 5
+
+# (scaling.metrics name, policy suffix, description, predefined metric, default target)
+UTILIZATION_POLICIES = (
+    ('cpu_utilization', 'cpu_target', 'average CPU utilization', 'ECSServiceAverageCPUUtilization', 75),
+    ('memory_utilization', 'memory_target', 'average memory utilization', 'ECSServiceAverageMemoryUtilization', 85),
+)
+
+# Terraform templates, compiled once per process
+WORKER_HEADER = Template('''terraform {{
   backend "s3" {{
     bucket = "terraform-state-647272350116"
     key    = "{environment}/services/{name}/terraform.tfstate"
     region = "us-east-1"
     encrypt = true
   }}
-  
-  required_providers {{
-    aws = {{
-      source  = "hashicorp/aws"
-      version = "~> 6.0"
-    }}
-    random = {{
-      source  = "hashicorp/random"
-      version = "~> 3.1"
-    }}
-  }}
+
+{required_providers}
 }}
 
 # Data sources
 data "aws_caller_identity" "current" {{}}
 
 # ECR Repository (use existing)
-data "aws_ecr_repository" "{name.replace('-', '_')}_repo" {{
+data "aws_ecr_repository" "{ident}_repo" {{
   name = "{name}-{environment}"
 }}
 
 # ECR Lifecycle Policy
-resource "aws_ecr_lifecycle_policy" "{name.replace('-', '_')}_lifecycle" {{
-  repository = data.aws_ecr_repository.{name.replace('-', '_')}_repo.name
+resource "aws_ecr_lifecycle_policy" "{ident}_lifecycle" {{
+  repository = data.aws_ecr_repository.{ident}_repo.name
 
   policy = jsonencode({{
     rules = [
@@ -99,20 +88,14 @@ provider "aws" {{
 
 # Data sources - read from existing infrastructure
 data "terraform_remote_state" "core" {{
-  backend = "s3"
-  config = {{
-    bucket = "terraform-state-647272350116"
-    key    = "{environment}/core/terraform.tfstate"
-    region = "us-east-1"
-  }}
-}}
+{core_state}}}
 
 # SQS Queue
-resource "aws_sqs_queue" "{name.replace('-', '_')}_queue" {{
-  name                      = "{environment}-{name}-queue"
-  visibility_timeout_seconds = 30
+resource "aws_sqs_queue" "{ident}_queue" {{
+  name                      = "{environment}-{name}-queue{queue_suffix}"
+  visibility_timeout_seconds = {visibility_timeout}
   message_retention_seconds = 1209600
-  
+{receive_wait}{fifo_settings}
   tags = {{
     Name        = "{environment}-{name}-queue"
     Environment = "{environment}"
@@ -122,9 +105,9 @@ resource "aws_sqs_queue" "{name.replace('-', '_')}_queue" {{
 }}
 
 # SQS Dead Letter Queue
-resource "aws_sqs_queue" "{name.replace('-', '_')}_dlq" {{
-  name = "{environment}-{name}-queue-dlq"
-  
+resource "aws_sqs_queue" "{ident}_dlq" {{
+  name = "{environment}-{name}-queue-dlq{queue_suffix}"
+{dlq_fifo_settings}
   tags = {{
     Name        = "{environment}-{name}-queue-dlq"
     Environment = "{environment}"
@@ -133,8 +116,8 @@ resource "aws_sqs_queue" "{name.replace('-', '_')}_dlq" {{
 }}
 
 # SQS Queue Policy for EventBridge
-resource "aws_sqs_queue_policy" "{name.replace('-', '_')}_queue_policy" {{
-  queue_url = aws_sqs_queue.{name.replace('-', '_')}_queue.id
+resource "aws_sqs_queue_policy" "{ident}_queue_policy" {{
+  queue_url = aws_sqs_queue.{ident}_queue.id
 
   policy = jsonencode({{
     Version = "2012-10-17"
@@ -145,7 +128,7 @@ resource "aws_sqs_queue_policy" "{name.replace('-', '_')}_queue_policy" {{
           Service = "events.amazonaws.com"
         }}
         Action = "sqs:SendMessage"
-        Resource = aws_sqs_queue.{name.replace('-', '_')}_queue.arn
+        Resource = aws_sqs_queue.{ident}_queue.arn
         Condition = {{
           StringEquals = {{
             "aws:SourceAccount" = data.aws_caller_identity.current.account_id
@@ -157,25 +140,25 @@ resource "aws_sqs_queue_policy" "{name.replace('-', '_')}_queue_policy" {{
 }}
 
 # SQS Queue Policy
-resource "aws_sqs_queue_redrive_policy" "{name.replace('-', '_')}_redrive" {{
-  queue_url = aws_sqs_queue.{name.replace('-', '_')}_queue.id
+resource "aws_sqs_queue_redrive_policy" "{ident}_redrive" {{
+  queue_url = aws_sqs_queue.{ident}_queue.id
   redrive_policy = jsonencode({{
-    deadLetterTargetArn = aws_sqs_queue.{name.replace('-', '_')}_dlq.arn
-    maxReceiveCount     = 3
+    deadLetterTargetArn = aws_sqs_queue.{ident}_dlq.arn
+    maxReceiveCount     = {max_receive_count}
   }})
 }}
 
 # ECS Task Definition
-resource "aws_ecs_task_definition" "{name.replace('-', '_')}_task" {{
+resource "aws_ecs_task_definition" "{ident}_task" {{
   family                   = "{environment}-{name}"
   network_mode             = "awsvpc"
   requires_compatibilities = ["FARGATE"]
-  cpu                      = "{resources.get('cpu', 256)}"
-  memory                   = "{resources.get('memory', 512)}"
+  cpu                      = "{cpu}"
+  memory                   = "{memory}"
   execution_role_arn       = aws_iam_role.execution_role.arn
   task_role_arn           = aws_iam_role.task_role.arn
   skip_destroy             = true
-  
+
   runtime_platform {{
     operating_system_family = "LINUX"
     cpu_architecture        = "ARM64"
@@ -185,57 +168,75 @@ resource "aws_ecs_task_definition" "{name.replace('-', '_')}_task" {{
     {{
       name  = "{name}"
       image = "647272350116.dkr.ecr.us-east-1.amazonaws.com/{name}-{environment}:v$(date +%Y%m%d_%H%M%S)_$(git rev-parse --short HEAD 2>/dev/null || echo 'local')"
-      
+
       portMappings = [
         {{
           containerPort = 8080
           protocol      = "tcp"
         }}
       ]
-      
-      environment = ['''
 
-    # Add environment variables from service.yaml
-    for key, value in env_vars.items():
-        tf_content += f'''
-        {{ name = "{key}", value = "{value}" }},'''
-    
-    # Add required environment variables
-    tf_content += f'''
+      environment = [''')
+
+CONTAINER_ENV_VAR = Template('''
+        {{ name = "{key}", value = "{value}" }},''')
+
+RECEIVE_WAIT = '  receive_wait_time_seconds = {}\n'
+
+LAUNCH_TYPE = '  launch_type     = "FARGATE"\n'
+
+CAPACITY_PROVIDER = '''  capacity_provider_strategy {{
+    capacity_provider = "{provider}"
+    weight            = {weight}
+{base}  }}
+'''
+
+CAPACITY_PROVIDER_BASE = '    base              = {}\n'
+
+STOP_TIMEOUT = '\n\n      stopTimeout = {}'
+
+FIFO_QUEUE = '  fifo_queue                  = true\n'
+CONTENT_DEDUPLICATION = '  content_based_deduplication = true\n'
+
+# Deduplicate and throttle per message group instead of per queue
+HIGH_THROUGHPUT_FIFO = '''  deduplication_scope         = "messageGroup"
+  fifo_throughput_limit       = "perMessageGroupId"
+'''
+
+CONTAINER_REQUIRED_ENV = Template('''
         {{ name = "SERVICE_NAME", value = "{name}" }},
         {{ name = "ENVIRONMENT", value = "{environment}" }},
         {{ name = "PORT", value = "8080" }},
-        {{ name = "SQS_QUEUE_URL", value = aws_sqs_queue.{name.replace('-', '_')}_queue.url }},
+        {{ name = "SQS_QUEUE_URL", value = aws_sqs_queue.{ident}_queue.url }},
         # Application Signals
         {{ name = "OTEL_PROPAGATORS", value = "tracecontext,baggage,xray" }},
         {{ name = "OTEL_RESOURCE_ATTRIBUTES", value = "service.name={name},service.version=1.0,deployment.environment={environment}" }}
-      ]'''
+      ]''')
 
-    # Add secrets if defined
-    if secrets:
-        tf_content += f'''
-      
-      secrets = ['''
-        for secret in secrets:
-            tf_content += f'''
-        {{ 
+CONTAINER_SECRETS_HEADER = Template('''
+
+      secrets = [''')
+
+CONTAINER_SECRET = Template('''
+        {{
           name      = "{secret}"
-          valueFrom = "${{aws_secretsmanager_secret.{name.replace('-', '_')}_secrets.arn}}:{secret}::"
-        }},'''
-        tf_content += '''
-      ]'''
+          valueFrom = "${{aws_secretsmanager_secret.{ident}_secrets.arn}}:{secret}::"
+        }},''')
+
+CONTAINER_SECRETS_FOOTER = Template('''
+      ]''')
+
+WORKER_BODY = Template('''{stop_timeout}
 
-    tf_content += f'''
-      
       logConfiguration = {{
         logDriver = "awslogs"
         options = {{
-          "awslogs-group"         = aws_cloudwatch_log_group.{name.replace('-', '_')}_logs.name
+          "awslogs-group"         = aws_cloudwatch_log_group.{ident}_logs.name
           "awslogs-region"        = "us-east-1"
           "awslogs-stream-prefix" = "ecs"
         }}
       }}
-      
+
       # Application Signals service tags
       dockerLabels = {{
         "application-signals.service.name" = "{name}"
@@ -243,7 +244,7 @@ resource "aws_ecs_task_definition" "{name.replace('-', '_')}_task" {{
       }}
     }}
   ])
-  
+
   tags = {{
     Name        = "{environment}-{name}"
     Environment = "{environment}"
@@ -252,22 +253,21 @@ resource "aws_ecs_task_definition" "{name.replace('-', '_')}_task" {{
 }}
 
 # ECS Service - use existing cluster
-resource "aws_ecs_service" "{name.replace('-', '_')}_service" {{
+resource "aws_ecs_service" "{ident}_service" {{
   name            = "{environment}-{name}"
   cluster         = data.terraform_remote_state.core.outputs.ecs_cluster_id
-  task_definition = aws_ecs_task_definition.{name.replace('-', '_')}_task.arn
-  desired_count   = {resources.get('desired_count', 1)}
-  launch_type     = "FARGATE"
-  
-  deployment_maximum_percent         = {deployment.get('maximum_percent', 200)}
-  deployment_minimum_healthy_percent = {deployment.get('minimum_healthy_percent', 100)}
-  
+  task_definition = aws_ecs_task_definition.{ident}_task.arn
+  desired_count   = {desired_count}
+{launch}
+  deployment_maximum_percent         = {maximum_percent}
+  deployment_minimum_healthy_percent = {minimum_healthy_percent}
+
   network_configuration {{
     subnets          = data.terraform_remote_state.core.outputs.private_subnet_ids
-    security_groups  = [aws_security_group.{name.replace('-', '_')}_sg.id]
+    security_groups  = [aws_security_group.{ident}_sg.id]
     assign_public_ip = false
   }}
-  
+
   tags = {{
     Name        = "{environment}-{name}"
     Environment = "{environment}"
@@ -276,24 +276,24 @@ resource "aws_ecs_service" "{name.replace('-', '_')}_service" {{
 }}
 
 # Security Group
-resource "aws_security_group" "{name.replace('-', '_')}_sg" {{
+resource "aws_security_group" "{ident}_sg" {{
   name_prefix = "{environment}-{name}-"
   vpc_id      = data.terraform_remote_state.core.outputs.vpc_id
-  
+
   ingress {{
     from_port   = 8080
     to_port     = 8080
     protocol    = "tcp"
     cidr_blocks = ["10.0.0.0/16"]
   }}
-  
+
   egress {{
     from_port   = 0
     to_port     = 0
     protocol    = "-1"
     cidr_blocks = ["0.0.0.0/0"]
   }}
-  
+
   tags = {{
     Name        = "{environment}-{name}-sg"
     Environment = "{environment}"
@@ -304,7 +304,7 @@ resource "aws_security_group" "{name.replace('-', '_')}_sg" {{
 # IAM Roles
 resource "aws_iam_role" "execution_role" {{
   name = "{environment}-{name}-execution-role"
-  
+
   assume_role_policy = jsonencode({{
     Version = "2012-10-17"
     Statement = [
@@ -328,7 +328,7 @@ resource "aws_iam_role_policy_attachment" "execution_role_policy" {{
 resource "aws_iam_role_policy" "execution_secrets_policy" {{
   name = "{environment}-{name}-execution-secrets-policy"
   role = aws_iam_role.execution_role.id
-  
+
   policy = jsonencode({{
     Version = "2012-10-17"
     Statement = [
@@ -338,7 +338,7 @@ resource "aws_iam_role_policy" "execution_secrets_policy" {{
           "secretsmanager:GetSecretValue"
         ]
         Resource = [
-          aws_secretsmanager_secret.{name.replace('-', '_')}_secrets.arn
+          aws_secretsmanager_secret.{ident}_secrets.arn
         ]
       }}
     ]
@@ -347,7 +347,7 @@ resource "aws_iam_role_policy" "execution_secrets_policy" {{
 
 resource "aws_iam_role" "task_role" {{
   name = "{environment}-{name}-task-role"
-  
+
   assume_role_policy = jsonencode({{
     Version = "2012-10-17"
     Statement = [
@@ -366,7 +366,7 @@ resource "aws_iam_role" "task_role" {{
 resource "aws_iam_role_policy" "sqs_policy" {{
   name = "{environment}-{name}-sqs-policy"
   role = aws_iam_role.task_role.id
-  
+
   policy = jsonencode({{
     Version = "2012-10-17"
     Statement = [
@@ -379,8 +379,8 @@ resource "aws_iam_role_policy" "sqs_policy" {{
           "sqs:GetQueueUrl"
         ]
         Resource = [
-          aws_sqs_queue.{name.replace('-', '_')}_queue.arn,
-          aws_sqs_queue.{name.replace('-', '_')}_dlq.arn
+          aws_sqs_queue.{ident}_queue.arn,
+          aws_sqs_queue.{ident}_dlq.arn
         ]
       }}
     ]
@@ -412,36 +412,34 @@ resource "aws_iam_role_policy" "app_signals_policy" {{
 }}
 
 # CloudWatch Log Group
-resource "aws_cloudwatch_log_group" "{name.replace('-', '_')}_logs" {{
+resource "aws_cloudwatch_log_group" "{ident}_logs" {{
   name              = "/ecs/{environment}-{name}"
   retention_in_days = 7
-  
+
   lifecycle {{
     ignore_changes = [retention_in_days]
   }}
-  
+
   tags = {{
     Name        = "{environment}-{name}-logs"
     Environment = "{environment}"
     Service     = "{name}"
   }}
 }}
-'''
+''')
 
-    # Add single Secrets Manager resource for all secrets
-    if secrets:
-        tf_content += f'''
+SERVICE_SECRETS = Template('''
 # Random ID for unique secret naming
-resource "random_id" "{name.replace('-', '_')}_secret_suffix" {{
+resource "random_id" "{ident}_secret_suffix" {{
   byte_length = 4
 }}
 
 # Secrets Manager Secret for service
-resource "aws_secretsmanager_secret" "{name.replace('-', '_')}_secrets" {{
-  name                    = "{environment}-{name}-secrets-${{random_id.{name.replace('-', '_')}_secret_suffix.hex}}"
+resource "aws_secretsmanager_secret" "{ident}_secrets" {{
+  name                    = "{environment}-{name}-secrets-${{random_id.{ident}_secret_suffix.hex}}"
   description             = "Secret for {environment}-{name}"
   recovery_window_in_days = 0
-  
+
   tags = {{
     Name        = "{environment}-{name}-secrets"
     Environment = "{environment}"
@@ -449,12 +447,12 @@ resource "aws_secretsmanager_secret" "{name.replace('-', '_')}_secrets" {{
   }}
 }}
 
-resource "aws_secretsmanager_secret_version" "{name.replace('-', '_')}_secrets_version" {{
-  secret_id     = aws_secretsmanager_secret.{name.replace('-', '_')}_secrets.id
+resource "aws_secretsmanager_secret_version" "{ident}_secrets_version" {{
+  secret_id     = aws_secretsmanager_secret.{ident}_secrets.id
   secret_string = jsonencode({{
-    {", ".join([f'"{secret}": "changeme"' for secret in secrets])}
+    {secret_values}
   }})
-  
+
   lifecycle {{
     ignore_changes = [secret_string]
   }}
@@ -464,7 +462,7 @@ resource "aws_secretsmanager_secret_version" "{name.replace('-', '_')}_secrets_v
 resource "aws_iam_role_policy" "secrets_policy" {{
   name = "{environment}-{name}-secrets-policy"
   role = aws_iam_role.task_role.id
-  
+
   policy = jsonencode({{
     Version = "2012-10-17"
     Statement = [
@@ -474,62 +472,59 @@ resource "aws_iam_role_policy" "secrets_policy" {{
           "secretsmanager:GetSecretValue"
         ]
         Resource = [
-          aws_secretsmanager_secret.{name.replace('-', '_')}_secrets.arn
+          aws_secretsmanager_secret.{ident}_secrets.arn
         ]
       }}
     ]
   }})
 }}
-'''
+''')
 
-    # Auto Scaling Policies - Step Scaling
-    tf_content += f'''
+AUTOSCALING_TARGET = Template('''
 # Auto Scaling Target
-resource "aws_appautoscaling_target" "{name.replace('-', '_')}_target" {{
-  max_capacity       = {resources.get('max_count', 10)}
+resource "aws_appautoscaling_target" "{ident}_target" {{
+  max_capacity       = {max_count}
   min_capacity       = 1
-  resource_id        = "service/${{data.terraform_remote_state.core.outputs.ecs_cluster_name}}/${{aws_ecs_service.{name.replace('-', '_')}_service.name}}"
+  resource_id        = "service/${{data.terraform_remote_state.core.outputs.ecs_cluster_name}}/${{aws_ecs_service.{ident}_service.name}}"
   scalable_dimension = "ecs:service:DesiredCount"
   service_namespace  = "ecs"
-  
+
   tags = {{
     Name        = "{environment}-{name}-autoscaling-target"
     Environment = "{environment}"
     Service     = "{name}"
   }}
 }}
+''')
 
+STEP_SCALING = Template('''
 # Scale Up Policy
-resource "aws_appautoscaling_policy" "{name.replace('-', '_')}_scale_up_policy" {{
+resource "aws_appautoscaling_policy" "{ident}_scale_up_policy" {{
   name               = "{environment}-{name}-scale-up"
   policy_type        = "StepScaling"
-  resource_id        = aws_appautoscaling_target.{name.replace('-', '_')}_target.resource_id
-  scalable_dimension = aws_appautoscaling_target.{name.replace('-', '_')}_target.scalable_dimension
-  service_namespace  = aws_appautoscaling_target.{name.replace('-', '_')}_target.service_namespace
+  resource_id        = aws_appautoscaling_target.{ident}_target.resource_id
+  scalable_dimension = aws_appautoscaling_target.{ident}_target.scalable_dimension
+  service_namespace  = aws_appautoscaling_target.{ident}_target.service_namespace
 
   step_scaling_policy_configuration {{
     adjustment_type         = "ChangeInCapacity"
-    cooldown               = {int(scaling.get('metrics', [{}])[0].get('cooldown_up', '30s').rstrip('s')) if scaling.get('metrics') else int(scaling.get('scale_up_cooldown', '30s').rstrip('s'))}
+    cooldown               = {cooldown_up}
     metric_aggregation_type = "Average"
-
-    step_adjustment {{
-      metric_interval_lower_bound = 0
-      scaling_adjustment          = 1
-    }}
+{scale_up_steps}
   }}
 }}
 
 # Scale Down Policy
-resource "aws_appautoscaling_policy" "{name.replace('-', '_')}_scale_down_policy" {{
+resource "aws_appautoscaling_policy" "{ident}_scale_down_policy" {{
   name               = "{environment}-{name}-scale-down"
   policy_type        = "StepScaling"
-  resource_id        = aws_appautoscaling_target.{name.replace('-', '_')}_target.resource_id
-  scalable_dimension = aws_appautoscaling_target.{name.replace('-', '_')}_target.scalable_dimension
-  service_namespace  = aws_appautoscaling_target.{name.replace('-', '_')}_target.service_namespace
+  resource_id        = aws_appautoscaling_target.{ident}_target.resource_id
+  scalable_dimension = aws_appautoscaling_target.{ident}_target.scalable_dimension
+  service_namespace  = aws_appautoscaling_target.{ident}_target.service_namespace
 
   step_scaling_policy_configuration {{
     adjustment_type         = "ChangeInCapacity"
-    cooldown               = {int(scaling.get('metrics', [{}])[0].get('cooldown_down', '300s').rstrip('s')) if scaling.get('metrics') else int(scaling.get('scale_down_cooldown', '300s').rstrip('s'))}
+    cooldown               = {cooldown_down}
     metric_aggregation_type = "Average"
 
     step_adjustment {{
@@ -540,7 +535,7 @@ resource "aws_appautoscaling_policy" "{name.replace('-', '_')}_scale_down_policy
 }}
 
 # Scale Up Alarm
-resource "aws_cloudwatch_metric_alarm" "{name.replace('-', '_')}_scale_up_alarm" {{
+resource "aws_cloudwatch_metric_alarm" "{ident}_scale_up_alarm" {{
   alarm_name          = "{environment}-{name}-scale-up-alarm"
   comparison_operator = "GreaterThanThreshold"
   evaluation_periods  = "1"
@@ -548,15 +543,15 @@ resource "aws_cloudwatch_metric_alarm" "{name.replace('-', '_')}_scale_up_alarm"
   namespace           = "AWS/SQS"
   period              = "10"
   statistic           = "Sum"
-  threshold           = "{scaling.get('metrics', [{}])[0].get('target_value', 10) if scaling.get('metrics') else scaling.get('target_value', 10)}"
+  threshold           = "{scale_up_threshold}"
   alarm_description   = "Scale up when visible messages > threshold"
 
   dimensions = {{
-    QueueName = aws_sqs_queue.{name.replace('-', '_')}_queue.name
+    QueueName = aws_sqs_queue.{ident}_queue.name
   }}
 
-  alarm_actions = [aws_appautoscaling_policy.{name.replace('-', '_')}_scale_up_policy.arn]
-  
+  alarm_actions = [aws_appautoscaling_policy.{ident}_scale_up_policy.arn]
+
   tags = {{
     Name        = "{environment}-{name}-scale-up-alarm"
     Environment = "{environment}"
@@ -565,7 +560,7 @@ resource "aws_cloudwatch_metric_alarm" "{name.replace('-', '_')}_scale_up_alarm"
 }}
 
 # Scale Down Alarm
-resource "aws_cloudwatch_metric_alarm" "{name.replace('-', '_')}_scale_down_alarm" {{
+resource "aws_cloudwatch_metric_alarm" "{ident}_scale_down_alarm" {{
   alarm_name          = "{environment}-{name}-scale-down-alarm"
   comparison_operator = "LessThanOrEqualToThreshold"
   evaluation_periods  = "1"
@@ -573,37 +568,26 @@ resource "aws_cloudwatch_metric_alarm" "{name.replace('-', '_')}_scale_down_alar
   namespace           = "AWS/SQS"
   period              = "10"
   statistic           = "Sum"
-  threshold           = "{int(scaling.get('metrics', [{}])[0].get('target_value', 10) if scaling.get('metrics') else scaling.get('target_value', 10)) // 2}"
+  threshold           = "{scale_down_threshold}"
   alarm_description   = "Scale down when visible messages <= threshold"
 
   dimensions = {{
-    QueueName = aws_sqs_queue.{name.replace('-', '_')}_queue.name
+    QueueName = aws_sqs_queue.{ident}_queue.name
   }}
 
-  alarm_actions = [aws_appautoscaling_policy.{name.replace('-', '_')}_scale_down_policy.arn]
-  
+  alarm_actions = [aws_appautoscaling_policy.{ident}_scale_down_policy.arn]
+
   tags = {{
     Name        = "{environment}-{name}-scale-down-alarm"
     Environment = "{environment}"
     Service     = "{name}"
   }}
-}}'''
+}}''')
 
-    # Add CPU scaling policy if configured
-    cpu_metric = None
-    memory_metric = None
-    if scaling.get('metrics'):
-        for metric in scaling.get('metrics', []):
-            if metric.get('name') == 'cpu_utilization':
-                cpu_metric = metric
-            elif metric.get('name') == 'memory_utilization':
-                memory_metric = metric
-
-    if cpu_metric:
-        tf_content += f'''
+CPU_ALARM = Template('''
 
 # CPU Utilization Scale Up Alarm
-resource "aws_cloudwatch_metric_alarm" "{name.replace('-', '_')}_cpu_alarm" {{
+resource "aws_cloudwatch_metric_alarm" "{ident}_cpu_alarm" {{
   alarm_name          = "{environment}-{name}-cpu-high"
   comparison_operator = "GreaterThanThreshold"
   evaluation_periods  = "2"
@@ -611,28 +595,27 @@ resource "aws_cloudwatch_metric_alarm" "{name.replace('-', '_')}_cpu_alarm" {{
   namespace           = "AWS/ECS"
   period              = "60"
   statistic           = "Average"
-  threshold           = "{cpu_metric.get('target_value', 75)}"
+  threshold           = "{threshold}"
   alarm_description   = "Scale up when CPU > threshold"
 
   dimensions = {{
-    ServiceName = aws_ecs_service.{name.replace('-', '_')}_service.name
+    ServiceName = aws_ecs_service.{ident}_service.name
     ClusterName = data.terraform_remote_state.core.outputs.ecs_cluster_name
   }}
 
-  alarm_actions = [aws_appautoscaling_policy.{name.replace('-', '_')}_scale_up_policy.arn]
-  
+  alarm_actions = [aws_appautoscaling_policy.{ident}_scale_up_policy.arn]
+
   tags = {{
     Name        = "{environment}-{name}-cpu-alarm"
     Environment = "{environment}"
     Service     = "{name}"
   }}
-}}'''
+}}''')
 
-    if memory_metric:
-        tf_content += f'''
+MEMORY_ALARM = Template('''
 
 # Memory Utilization Scale Up Alarm
-resource "aws_cloudwatch_metric_alarm" "{name.replace('-', '_')}_memory_alarm" {{
+resource "aws_cloudwatch_metric_alarm" "{ident}_memory_alarm" {{
   alarm_name          = "{environment}-{name}-memory-high"
   comparison_operator = "GreaterThanThreshold"
   evaluation_periods  = "2"
@@ -640,29 +623,27 @@ resource "aws_cloudwatch_metric_alarm" "{name.replace('-', '_')}_memory_alarm" {
   namespace           = "AWS/ECS"
   period              = "60"
   statistic           = "Average"
-  threshold           = "{memory_metric.get('target_value', 85)}"
+  threshold           = "{threshold}"
   alarm_description   = "Scale up when Memory > threshold"
 
   dimensions = {{
-    ServiceName = aws_ecs_service.{name.replace('-', '_')}_service.name
+    ServiceName = aws_ecs_service.{ident}_service.name
     ClusterName = data.terraform_remote_state.core.outputs.ecs_cluster_name
   }}
 
-  alarm_actions = [aws_appautoscaling_policy.{name.replace('-', '_')}_scale_up_policy.arn]
-  
+  alarm_actions = [aws_appautoscaling_policy.{ident}_scale_up_policy.arn]
+
   tags = {{
     Name        = "{environment}-{name}-memory-alarm"
     Environment = "{environment}"
     Service     = "{name}"
   }}
-}}'''
+}}''')
 
-    # Add circuit breaker monitoring
-    if circuit_breaker.get('enabled'):
-        tf_content += f'''
+CIRCUIT_BREAKER = Template('''
 
 # Circuit Breaker CloudWatch Alarms
-resource "aws_cloudwatch_metric_alarm" "{name.replace('-', '_')}_task_failure_alarm" {{
+resource "aws_cloudwatch_metric_alarm" "{ident}_task_failure_alarm" {{
   alarm_name          = "{environment}-{name}-low-running-tasks"
   comparison_operator = "LessThanThreshold"
   evaluation_periods  = "2"
@@ -672,12 +653,12 @@ resource "aws_cloudwatch_metric_alarm" "{name.replace('-', '_')}_task_failure_al
   statistic           = "Average"
   threshold           = "1"
   alarm_description   = "Circuit breaker: Service has no running tasks - possible failures"
-  
+
   dimensions = {{
-    ServiceName = aws_ecs_service.{name.replace('-', '_')}_service.name
+    ServiceName = aws_ecs_service.{ident}_service.name
     ClusterName = data.terraform_remote_state.core.outputs.ecs_cluster_name
   }}
-  
+
   tags = {{
     Name        = "{environment}-{name}-circuit-breaker"
     Environment = "{environment}"
@@ -686,7 +667,7 @@ resource "aws_cloudwatch_metric_alarm" "{name.replace('-', '_')}_task_failure_al
 }}
 
 # CloudWatch Alarms for monitoring
-resource "aws_cloudwatch_metric_alarm" "{name.replace('-', '_')}_queue_depth_high" {{
+resource "aws_cloudwatch_metric_alarm" "{ident}_queue_depth_high" {{
   alarm_name          = "{environment}-{name}-queue-depth-high"
   comparison_operator = "GreaterThanThreshold"
   evaluation_periods  = "2"
@@ -694,35 +675,131 @@ resource "aws_cloudwatch_metric_alarm" "{name.replace('-', '_')}_queue_depth_hig
   namespace           = "AWS/SQS"
   period              = "60"
   statistic           = "Average"
-  threshold           = "{scaling.get('target_value', 5) * 2}"
+  threshold           = "{queue_depth_threshold}"
   alarm_description   = "This metric monitors SQS queue depth for {name}"
   alarm_actions       = []
 
   dimensions = {{
-    QueueName = aws_sqs_queue.{name.replace('-', '_')}_queue.name
+    QueueName = aws_sqs_queue.{ident}_queue.name
   }}
-  
+
   tags = {{
     Name        = "{environment}-{name}-queue-depth-alarm"
     Environment = "{environment}"
     Service     = "{name}"
   }}
 }}
-'''
+''')
 
-    # Add outputs section
-    tf_content += f'''
+STEP_ADJUSTMENT = '''
+    step_adjustment {{
+      metric_interval_lower_bound = {lower}
+{upper}      scaling_adjustment          = {adjustment}
+    }}'''
+
+STEP_UPPER_BOUND = '      metric_interval_upper_bound = {}\n'
+
+BACKLOG_TARGET_TRACKING = Template('''
+# Target tracking on backlog per task: visible messages / running tasks
+resource "aws_appautoscaling_policy" "{ident}_backlog_per_task" {{
+  name               = "{environment}-{name}-backlog-per-task"
+  policy_type        = "TargetTrackingScaling"
+  resource_id        = aws_appautoscaling_target.{ident}_target.resource_id
+  scalable_dimension = aws_appautoscaling_target.{ident}_target.scalable_dimension
+  service_namespace  = aws_appautoscaling_target.{ident}_target.service_namespace
+
+  target_tracking_scaling_policy_configuration {{
+    target_value       = {target_value}
+    scale_out_cooldown = {cooldown_up}
+    scale_in_cooldown  = {cooldown_down}
+
+    customized_metric_specification {{
+      metrics {{
+        id          = "visible"
+        label       = "Visible messages"
+        return_data = false
+
+        metric_stat {{
+          metric {{
+            metric_name = "ApproximateNumberOfMessagesVisible"
+            namespace   = "AWS/SQS"
+
+            dimensions {{
+              name  = "QueueName"
+              value = aws_sqs_queue.{ident}_queue.name
+            }}
+          }}
+          stat = "Average"
+        }}
+      }}
+
+      metrics {{
+        id          = "tasks"
+        label       = "Running tasks"
+        return_data = false
+
+        metric_stat {{
+          metric {{
+            metric_name = "RunningTaskCount"
+            namespace   = "ECS/ContainerInsights"
+
+            dimensions {{
+              name  = "ClusterName"
+              value = data.terraform_remote_state.core.outputs.ecs_cluster_name
+            }}
+
+            dimensions {{
+              name  = "ServiceName"
+              value = aws_ecs_service.{ident}_service.name
+            }}
+          }}
+          stat = "Average"
+        }}
+      }}
+
+      metrics {{
+        id          = "backlog_per_task"
+        label       = "Backlog per task"
+        expression  = "visible / IF(tasks > 0, tasks, 1)"
+        return_data = true
+      }}
+    }}
+  }}
+}}''')
+
+UTILIZATION_TARGET_TRACKING = Template('''
+
+# Target tracking on {label}
+resource "aws_appautoscaling_policy" "{ident}_{policy}" {{
+  name               = "{environment}-{name}-{policy_name}"
+  policy_type        = "TargetTrackingScaling"
+  resource_id        = aws_appautoscaling_target.{ident}_target.resource_id
+  scalable_dimension = aws_appautoscaling_target.{ident}_target.scalable_dimension
+  service_namespace  = aws_appautoscaling_target.{ident}_target.service_namespace
+
+  target_tracking_scaling_policy_configuration {{
+    target_value       = {target_value}
+    scale_out_cooldown = {cooldown_up}
+    scale_in_cooldown  = {cooldown_down}
+
+    predefined_metric_specification {{
+      predefined_metric_type = "{metric_type}"
+    }}
+  }}
+}}''')
+
+WORKER_OUTPUTS = Template('''
 # Outputs
 output "queue_url" {{
-  value = aws_sqs_queue.{name.replace('-', '_')}_queue.url
+  value = aws_sqs_queue.{ident}_queue.url
 }}
 
 output "queue_arn" {{
-  value = aws_sqs_queue.{name.replace('-', '_')}_queue.arn
+  value = aws_sqs_queue.{ident}_queue.arn
 }}
 
 output "service_name" {{
-  value = aws_ecs_service.{name.replace('-', '_')}_service.name
+  value = aws_ecs_service.{ident}_service.name
 }}
 
 output "cluster_name" {{
@@ -730,30 +807,264 @@ output "cluster_name" {{
 }}
 
 output "task_definition_arn" {{
-  value = aws_ecs_task_definition.{name.replace('-', '_')}_task.arn
+  value = aws_ecs_task_definition.{ident}_task.arn
 }}
 
 output "autoscaling_target_arn" {{
-  value = aws_appautoscaling_target.{name.replace('-', '_')}_target.arn
+  value = aws_appautoscaling_target.{ident}_target.arn
 }}
-'''
+''')
+
+
+def fifo_settings(queue):
+    """Template fields for the queue name suffix and the FIFO arguments of the queue and its DLQ"""
+    if not queue.fifo:
+        return {'queue_suffix': '', 'fifo_settings': '', 'dlq_fifo_settings': ''}
+    settings = FIFO_QUEUE
+    if queue.content_based_deduplication:
+        settings += CONTENT_DEDUPLICATION
+    if queue.high_throughput:
+        settings += HIGH_THROUGHPUT_FIFO
+    return {'queue_suffix': queue.suffix, 'fifo_settings': settings, 'dlq_fifo_settings': FIFO_QUEUE}
+
+
+def capacity_strategy(config):
+    """(on-demand base, on-demand weight, spot weight) from service.yaml, else the environment tfvars.
+
+    None when neither sets a split; the service then keeps launch_type FARGATE.
+    """
+    capacity = config.capacity
+    defaults = environment_tfvars(config.environment).get('ecs_capacity_providers') or {}
+    on_demand = capacity.on_demand_weight if capacity.on_demand_weight is not None else defaults.get('fargate_weight')
+    spot = capacity.spot_weight if capacity.spot_weight is not None else defaults.get('fargate_spot_weight')
+    if on_demand is None and spot is None:
+        return None
+    base = capacity.on_demand_base if capacity.on_demand_base is not None else defaults.get('fargate_base', 0)
+    on_demand, spot = on_demand or 0, spot or 0
+    if not on_demand and not spot:
+        raise ConfigError(f"{config.name} [{config.environment}]: capacity weights are all 0")
+    return base or 0, on_demand, spot
+
+
+def launch_settings(config):
+    """launch_type or capacity_provider_strategy blocks, plus the container stopTimeout (0 when unset).
+
+    Spot tasks get SIGTERM two minutes before they are reclaimed; with Spot in
+    the mix the container gets an explicit stopTimeout (ECS default 30s) so the
+    runtime knows its drain window.
+    """
+    strategy = capacity_strategy(config)
+    stop_timeout = config.capacity.stop_timeout
+    if strategy is None:
+        return LAUNCH_TYPE, stop_timeout or 0
+    base, on_demand, spot = strategy
+    blocks = []
+    if on_demand or base:
+        blocks.append(CAPACITY_PROVIDER.format(provider='FARGATE', weight=on_demand,
+                                               base=CAPACITY_PROVIDER_BASE.format(base)))
+    if spot:
+        blocks.append(CAPACITY_PROVIDER.format(provider='FARGATE_SPOT', weight=spot, base=''))
+        stop_timeout = stop_timeout or DEFAULT_STOP_TIMEOUT
+    return '\n'.join(blocks), stop_timeout or 0
+
+
+def drain_env(stop_timeout):
+    """On SIGTERM stop receiving, release unstarted messages (visibility 0) and finish the rest in time"""
+    return (
+        ('SHUTDOWN_DRAIN_SECONDS', max(stop_timeout - DRAIN_MARGIN, 1)),
+        ('SQS_RELEASE_ON_SIGTERM', 'true'),
+    )
+
+
+def consumer_env(consumer):
+    """(name, value) env vars telling the worker runtime how to receive"""
+    return (
+        ('SQS_WAIT_TIME_SECONDS', consumer.wait_time),
+        ('SQS_MAX_MESSAGES', consumer.batch_size),
+        ('SQS_CONCURRENCY', consumer.concurrency),
+        ('SQS_VISIBILITY_TIMEOUT', consumer.visibility_timeout),
+    )
+
+
+def write_step_scaling(scaling, max_count, common, out):
+    """Step scaling on the visible-message alarms, plus CPU / memory alarms on the scale-up policy"""
+    threshold = scaling.scale_up_threshold
+    steps = step_adjustments(threshold, max_count, scaling.proportional_steps)
+    STEP_SCALING.render(out, common, cooldown_up=scaling.cooldown_up, cooldown_down=scaling.cooldown_down,
+                        scale_up_threshold=threshold, scale_down_threshold=scale_down_threshold(scaling),
+                        scale_up_steps='\n'.join(
+                            STEP_ADJUSTMENT.format(lower=lower, adjustment=adjustment,
+                                                   upper=STEP_UPPER_BOUND.format(upper) if upper is not None else '')
+                            for lower, upper, adjustment in steps))
+
+    # Add CPU scaling policy if configured
+    cpu_metric = scaling.metric('cpu_utilization')
+    if cpu_metric:
+        CPU_ALARM.render(out, common, threshold=cpu_metric.target_value if cpu_metric.target_value is not None else 75)
+
+    memory_metric = scaling.metric('memory_utilization')
+    if memory_metric:
+        MEMORY_ALARM.render(out, common,
+                            threshold=memory_metric.target_value if memory_metric.target_value is not None else 85)
+
+
+def write_target_tracking(scaling, backlog_metric, consumer, common, out):
+    """Target tracking on backlog per task; CPU / memory metrics become extra target tracking policies"""
+    BACKLOG_TARGET_TRACKING.render(out, common, target_value=backlog_target(backlog_metric, consumer),
+                                   cooldown_up=backlog_metric.cooldown_up, cooldown_down=backlog_metric.cooldown_down)
+    for metric_name, policy, label, metric_type, default in UTILIZATION_POLICIES:
+        metric = scaling.metric(metric_name)
+        if metric:
+            UTILIZATION_TARGET_TRACKING.render(out, common, label=label, policy=policy,
+                                               policy_name=policy.replace('_', '-'), metric_type=metric_type,
+                                               target_value=metric.target_value if metric.target_value is not None
+                                               else default,
+                                               cooldown_up=metric.cooldown_up, cooldown_down=metric.cooldown_down)
+
+
+def write_worker_terraform(service_config, environment, out, core_snapshot=False):
+    """Stream the worker Terraform for one environment into out.
+
+    With core_snapshot, core outputs are read from a local snapshot next to main.tf.
+    """
+    config = ServiceConfig.from_yaml(service_config, environment)
+    name, ident = config.name, config.ident
+    resources, scaling, deployment = config.resources, config.scaling, config.deployment
+    secrets = config.secrets
+
+    common = {'name': name, 'ident': ident, 'environment': environment}
+
+    # Queue settings follow the consumer section when there is one
+    consumer = config.consumer
+    if consumer:
+        queue = {'visibility_timeout': consumer.visibility_timeout, 'max_receive_count': consumer.max_receive_count,
+                 'receive_wait': RECEIVE_WAIT.format(consumer.wait_time)}
+    else:
+        queue = {'visibility_timeout': 30, 'max_receive_count': 3, 'receive_wait': ''}
+    queue.update(fifo_settings(config.queue))
+
+    # Generate Terraform
+    WORKER_HEADER.render(out, {**common, **queue}, cpu=resources.cpu, memory=resources.memory,
+                         required_providers=REQUIRED_PROVIDERS, core_state=core_state(environment, core_snapshot))
+
+    # Add environment variables from service.yaml
+    for key, value in config.environment_variables.items():
+        CONTAINER_ENV_VAR.render(out, key=key, value=value)
+
+    # Consumer settings for the worker runtime, matching the queue
+    if consumer:
+        for key, value in consumer_env(consumer):
+            CONTAINER_ENV_VAR.render(out, key=key, value=value)
+
+    # SIGTERM drain window (Spot interruptions, deployments)
+    launch, stop_timeout = launch_settings(config)
+    if stop_timeout:
+        for key, value in drain_env(stop_timeout):
+            CONTAINER_ENV_VAR.render(out, key=key, value=value)
+
+    # Add required environment variables
+    CONTAINER_REQUIRED_ENV.render(out, common)
+
+    # Add secrets if defined
+    if secrets:
+        CONTAINER_SECRETS_HEADER.render(out)
+        for secret in secrets:
+            CONTAINER_SECRET.render(out, ident=ident, secret=secret)
+        CONTAINER_SECRETS_FOOTER.render(out)
+
+    WORKER_BODY.render(out, common, desired_count=resources.desired_count, launch=launch,
+                       stop_timeout=STOP_TIMEOUT.format(stop_timeout) if stop_timeout else '',
+                       maximum_percent=deployment.maximum_percent,
+                       minimum_healthy_percent=deployment.minimum_healthy_percent)
+
+    # Add single Secrets Manager resource for all secrets
+    if secrets:
+        SERVICE_SECRETS.render(out, common, secret_values=", ".join(f'"{secret}": "changeme"' for secret in secrets))
+
+    AUTOSCALING_TARGET.render(out, common, max_count=max_tasks(config))
+    backlog_metric = scaling.metric(BACKLOG_METRIC)
+    if backlog_metric:
+        write_target_tracking(scaling, backlog_metric, config.consumer, common, out)
+    else:
+        write_step_scaling(scaling, max_tasks(config), common, out)
+
+    # Add circuit breaker monitoring
+    if scaling.circuit_breaker.get('enabled'):
+        queue_depth = scaling.target_value if scaling.target_value is not None else 5
+        CIRCUIT_BREAKER.render(out, common, queue_depth_threshold=queue_depth * 2)
+
+    # Dashboard for the queue and service defined above
+    queue_name = f"{environment}-{name}-queue"
+    write_dashboard(out, name, ident, environment,
+                    queue_widgets(f"{queue_name}{config.queue.suffix}", f"{queue_name}-dlq{config.queue.suffix}")
+                    + ecs_widgets(f"{environment}-{name}"))
+
+    # Add outputs section
+    WORKER_OUTPUTS.render(out, ident=ident)
+
+
+def render_worker_terraform(service_config, environment):
+    """Render the worker Terraform for one environment and return it as a string"""
+    return render_to_string(write_worker_terraform, service_config, environment)
+
+
+def generate_worker_terraform(service_path, environment, output_dir=None, force=False, source=None, version=None,
+                              snapshot=None):
+    """Write <output_dir>/main.tf (default <service>/.terraform/<environment>) for one environment.
+
+    Pass the same ServiceSource for every environment of a service so
+    service.yaml is read and parsed only once. snapshot is the environment's
+    core outputs Snapshot, copied next to main.tf and read instead of the S3 state.
+    """
+    if output_dir is None:
+        output_dir = terraform_dir(service_path, environment)
+    terraform_file = os.path.join(output_dir, 'main.tf')
+
+    # Regenerate only when service.yaml, the generator or the output changed
+    render = functools.partial(write_worker_terraform, core_snapshot=snapshot is not None)
+    status = regenerate(source or ServiceSource(service_path), environment, output_dir, render,
+                        version or generator_version(), options={'core_snapshot': True} if snapshot else None,
+                        force=force)
+    sync_snapshot(output_dir, snapshot)
+    print(status_message(status, terraform_file))
+    return status
 
-    # Write Terraform file
-    terraform_dir = os.path.join(service_path, '.terraform')
-    os.makedirs(terraform_dir, exist_ok=True)
-    
-    terraform_file = os.path.join(terraform_dir, 'main.tf')
-    with open(terraform_file, 'w') as f:
-        f.write(tf_content)
-    
-    print(f"Generated Terraform in {terraform_file}")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python3 generate-worker-infra.py <service-path> <environment>")
-        sys.exit(1)
-    
-    service_path = sys.argv[1]
-    environment = sys.argv[2]
-    
-    generate_worker_terraform(service_path, environment)
+    parser = argparse.ArgumentParser(description="Generate Terraform for an ECS worker service")
+    parser.add_argument('service_path', help="service directory, or the monorepo root with --changed")
+    parser.add_argument('environments', nargs='+', help="environments (dev stg, dev,stg or all); each is written "
+                                                         "to <service>/.terraform/<environment>/main.tf")
+    parser.add_argument('--force', action='store_true', help="ignore the manifest and re-render")
+    parser.add_argument('--changed', metavar='REV_RANGE',
+                        help="only generate workers whose service.yaml changed in this git range")
+    parser.add_argument('--core-outputs', metavar='DIR',
+                        help="read core outputs from DIR/<env>.tfstate snapshots instead of the S3 state")
+    parser.add_argument('--core-outputs-max-age', metavar='AGE', default=DEFAULT_MAX_AGE,
+                        help=f"refuse --core-outputs snapshots exported longer ago than this "
+                             f"(default {DEFAULT_MAX_AGE}, 0 = no limit)")
+    args = parser.parse_args()
+
+    environments = parse_environments(args.environments)
+    if not environments:
+        parser.error("no environments given (and none found under terraform/environments)")
+    try:
+        snapshots = load_snapshots(args.core_outputs, environments,
+                                   parse_duration(args.core_outputs_max_age, '--core-outputs-max-age'))
+    except (SnapshotError, ConfigError) as e:
+        parser.error(str(e))
+
+    if args.changed:
+        affected = affected_services(args.service_path, args.changed, environments)
+        print_report(affected, args.changed)
+        jobs = [(item.service_path, [e for e in environments if e in item.environments]) for item in affected
+                if item.environments and service_kind(item.config) == 'worker']
+    else:
+        jobs = [(args.service_path, environments)]
+
+    version = generator_version()
+    for service_path, service_environments in jobs:
+        source = ServiceSource(service_path)
+        for environment in service_environments:
+            generate_worker_terraform(service_path, environment, force=args.force, source=source, version=version,
+                                      snapshot=snapshots.get(environment))
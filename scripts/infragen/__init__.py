@@ -0,0 +1 @@
+"""Shared helpers for the service.yaml -> Terraform generators in scripts/"""
@@ -0,0 +1,231 @@
+"""Resolve which services (and which of their environments) a git revision range touches.
+
+Only local git plumbing is used, so this works offline against any clone.
+Range syntax follows git diff: "A..B", "A...B" (from the merge base) or a single
+revision, which is compared against the working tree (untracked service.yaml
+files included).
+
+Services whose own service.yaml did not change are still affected when a
+changed service is linked to them in that environment:
+
+* through shared API routes: a route prefix the other service also uses was
+  added or removed, or gained or lost its methods, which moves ownership;
+* through events: a worker's queue was added, removed or renamed (the services
+  publishing to it), or a publisher started or stopped delivering to a queue
+  (the worker consuming it).
+"""
+import os
+import subprocess
+from dataclasses import dataclass, field
+
+from infragen.config import ServiceConfig
+from infragen.discovery import find_services, service_kind
+from infragen.loader import load_service_config, parse_yaml
+from infragen.manifest import generator_inputs
+from infragen.providers import LOCK_FILE
+from infragen.routes import normalize_path
+
+
+@dataclass
+class AffectedService:
+    service_path: str
+    environments: set = field(default_factory=set)
+    reason: str = ''
+    deleted: bool = False
+    config: dict = None
+
+
+def git(repo, *args):
+    result = subprocess.run(['git', '-C', repo, *args], check=True, capture_output=True, text=True)
+    return result.stdout
+
+
+def resolve_range(repo, rev_range):
+    """Split a range into (base, head); head None means the working tree"""
+    if '...' in rev_range:
+        left, right = rev_range.split('...', 1)
+        right = right or 'HEAD'
+        return git(repo, 'merge-base', left or 'HEAD', right).strip(), right
+    if '..' in rev_range:
+        left, right = rev_range.split('..', 1)
+        return left or 'HEAD', right or 'HEAD'
+    return rev_range, None
+
+
+def changed_files(repo, base, head):
+    """{path relative to the repo top level: status letter} between base and head"""
+    args = ['diff', '--name-status', '--no-renames', '-z', base]
+    if head:
+        args.append(head)
+    fields = git(repo, *args).split('\0')
+    return {path: status for status, path in zip(fields[0::2], fields[1::2]) if path}
+
+
+def untracked_files(repo):
+    """{path relative to the repo top level: 'A'} for files git does not track or ignore"""
+    fields = git(repo, 'ls-files', '--others', '--exclude-standard', '--full-name', '-z').split('\0')
+    return {path: 'A' for path in fields if path}
+
+
+def read_yaml_at(repo, revision, path):
+    """Parse path as of revision (None = working tree); {} if it did not exist"""
+    try:
+        if revision is None:
+            with open(os.path.join(repo, path), 'rb') as f:
+                return parse_yaml(f.read()) or {}
+        return parse_yaml(git(repo, 'show', f"{revision}:{path}")) or {}
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        return {}
+
+
+def affected_environments(old_config, new_config, environments):
+    """Environments whose merged config differs between the two versions"""
+    old_base = {k: v for k, v in old_config.items() if k != 'environments'}
+    new_base = {k: v for k, v in new_config.items() if k != 'environments'}
+    if old_base != new_base:
+        return set(environments)
+    old_envs = old_config.get('environments') or {}
+    new_envs = new_config.get('environments') or {}
+    return {env for env in environments if old_envs.get(env) != new_envs.get(env)}
+
+
+def service_links(config, environment):
+    """(route prefixes {path: routes a method}, own queue or None, target queues) of config in environment"""
+    if not config:
+        return {}, None, frozenset()
+    try:
+        model = ServiceConfig.from_yaml(config, environment)
+    except ValueError:
+        return {}, None, frozenset()
+    prefixes, queue = {}, None
+    if service_kind(config) == 'lambda':
+        for route in model.routing:
+            prefix = ''
+            for segment in filter(None, normalize_path(route.path).split('/')):
+                prefix = f"{prefix}/{segment}" if prefix else segment
+                prefixes.setdefault(prefix, False)
+            if prefix:
+                prefixes[prefix] = True
+    else:
+        queue = f"{model.name}-queue{model.queue.suffix}"
+    return prefixes, queue, frozenset(target.queue for routing in model.event_routing for target in routing.targets)
+
+
+def related_services(changed, others, environments):
+    """{service path: (environments, reason)} for services in others linked to a changed service.
+
+    changed is [(service path, old config, new config)], with {} for a side
+    that does not exist; others is {service path: config} as of the new side,
+    and may include the changed services themselves.
+    """
+    related = {}
+    for environment in environments:
+        by_prefix, by_queue, by_target = {}, {}, {}
+        for path, config in others.items():
+            prefixes, queue, targets = service_links(config, environment)
+            for prefix in prefixes:
+                by_prefix.setdefault(prefix, set()).add(path)
+            if queue:
+                by_queue.setdefault(queue, set()).add(path)
+            for target in targets:
+                by_target.setdefault(target, set()).add(path)
+
+        for service_path, old_config, new_config in changed:
+            old_prefixes, old_queue, old_targets = service_links(old_config, environment)
+            new_prefixes, new_queue, new_targets = service_links(new_config, environment)
+            linked = set()
+            for prefix in old_prefixes.keys() | new_prefixes.keys():
+                if old_prefixes.get(prefix) != new_prefixes.get(prefix):
+                    linked |= by_prefix.get(prefix, set())
+            if old_queue != new_queue:
+                for queue in filter(None, (old_queue, new_queue)):
+                    linked |= by_target.get(queue, set())
+            for queue in old_targets ^ new_targets:
+                linked |= by_queue.get(queue, set())
+            for path in linked - {service_path}:
+                envs, _ = related.setdefault(path, (set(), f"linked to {os.path.basename(service_path)}"))
+                envs.add(environment)
+    return related
+
+
+def generator_paths(toplevel):
+    """Generator inputs (manifest.generator_inputs) relative to toplevel, or [] when they live in another repo.
+
+    The lock file is listed even before it exists, so the commit that adds it
+    counts as a generator change.
+    """
+    paths = generator_inputs()
+    if LOCK_FILE not in paths:
+        paths.append(LOCK_FILE)
+    relative = [os.path.relpath(os.path.realpath(p), toplevel) for p in paths]
+    return [p for p in relative if not p.startswith('..')]
+
+
+def affected_services(root, rev_range, environments):
+    """AffectedService entries for every service.yaml under root touched by rev_range.
+
+    A change to the generators themselves (when they live in the same repo)
+    marks every service under root as affected for all environments.
+    """
+    toplevel = os.path.realpath(git(root, 'rev-parse', '--show-toplevel').strip())
+    root_rel = os.path.relpath(os.path.realpath(root), toplevel)
+    base, head = resolve_range(root, rev_range)
+    changes = changed_files(root, base, head)
+    if head is None:
+        changes = {**untracked_files(root), **changes}
+
+    def under_root(path):
+        return root_rel == '.' or path == root_rel or path.startswith(root_rel + '/')
+
+    def local_path(path):
+        return os.path.join(root, os.path.relpath(os.path.join(toplevel, path), os.path.realpath(root)))
+
+    if any(path in changes for path in generator_paths(toplevel)):
+        return [AffectedService(path, set(environments), 'generator changed',
+                                config=read_yaml_at(path, None, 'service.yaml'))
+                for path in find_services(root)]
+
+    affected = []
+    changed = []
+    for path, status in sorted(changes.items()):
+        if os.path.basename(path) != 'service.yaml' or not under_root(path):
+            continue
+        service_path = os.path.dirname(local_path(path))
+        old_config = {} if status == 'A' else read_yaml_at(toplevel, base, path)
+        if status == 'D':
+            affected.append(AffectedService(service_path, set(), 'service.yaml deleted', deleted=True))
+            changed.append((service_path, old_config, {}))
+            continue
+        new_config = read_yaml_at(toplevel, head, path)
+        envs = affected_environments(old_config, new_config, environments)
+        if envs:
+            reason = 'service.yaml added' if status == 'A' else 'service.yaml changed'
+            affected.append(AffectedService(service_path, envs, reason, config=new_config))
+            changed.append((service_path, old_config, new_config))
+    if not changed:
+        return affected
+
+    # Every service as of head: the working tree (through the parse cache) or the revision
+    by_path = {item.service_path: item for item in affected}
+    others = {}
+    for service_path in find_services(root):
+        if service_path in by_path:
+            others[service_path] = by_path[service_path].config
+        elif head is None:
+            others[service_path] = load_service_config(service_path) or {}
+        else:
+            relative = os.path.relpath(os.path.join(os.path.realpath(service_path), 'service.yaml'), toplevel)
+            others[service_path] = read_yaml_at(toplevel, head, relative)
+    for service_path, (envs, reason) in sorted(related_services(changed, others, environments).items()):
+        if service_path in by_path:
+            by_path[service_path].environments |= envs
+        else:
+            affected.append(AffectedService(service_path, envs, reason, config=others[service_path]))
+    return affected
+
+
+def print_report(affected, rev_range):
+    print(f"Affected services for {rev_range}: {len(affected)}")
+    for item in affected:
+        envs = ','.join(sorted(item.environments)) or '-'
+        print(f"  {item.service_path} [{envs}] ({item.reason})")
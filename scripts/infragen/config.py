@@ -0,0 +1,700 @@
+"""Typed service.yaml model shared by the generators.
+
+ServiceConfig.from_yaml() merges the base config with environments.<env> once,
+parses durations ("30s", "5m", "250ms") and sizes ("512", "1Gi") once and
+checks types, so a bad service.yaml fails in milliseconds with a message that
+names the offending key, before any Terraform is rendered or run.
+
+Merge rules: mapping sections (resources, scaling, deployment,
+environment_variables, provisioned_concurrency, consumer, queue, capacity,
+lambda, event_delivery, scaling.circuit_breaker) merge key by key with the
+environment winning; scalars and lists from the environment replace the base.
+"""
+import math
+import re
+from dataclasses import dataclass, field
+
+HTTP_METHODS = {'GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS', 'ANY'}
+CACHEABLE_METHODS = {'GET', 'HEAD'}
+MAX_CACHE_TTL = 3600        # API Gateway's limit for cache_ttl_in_seconds
+
+LAMBDA_RUNTIMES = {'provided.al2', 'provided.al2023', 'python3.12', 'python3.13', 'java17', 'java21', 'dotnet8',
+                   'nodejs20.x', 'nodejs22.x'}
+# Managed runtimes Lambda SnapStart supports; custom (provided.*) runtimes are not among them
+SNAPSTART_RUNTIMES = {'python3.12', 'python3.13', 'java17', 'java21', 'dotnet8'}
+TELEMETRY_MODES = ('adot', 'xray', 'none')
+INVOKE_MODES = ('buffered', 'response_stream')
+
+MAX_INPUT_PATHS = 100      # EventBridge input transformer limit
+MAX_EVENT_RETRIES = 185    # EventBridge target retry limit
+
+_duration = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*$')
+_size = re.compile(r'^\s*(\d+)\s*(mi|mb|m|gi|gb|g)?\s*$', re.IGNORECASE)
+_name = re.compile(r'^[a-z0-9][a-z0-9-]*$')
+_schedule = re.compile(r'^(cron|rate|at)\(.+\)$')
+
+# Sections merged key by key with environments.<env>; everything else is replaced
+MAPPING_SECTIONS = ('resources', 'scaling', 'deployment', 'environment_variables', 'provisioned_concurrency',
+                    'consumer', 'queue', 'capacity', 'lambda', 'event_delivery')
+
+
+class ConfigError(ValueError):
+    """service.yaml failed validation"""
+
+
+def parse_duration(value, where):
+    """Seconds (float) from 30, "30s", "5m", "1h" or "250ms"; bare numbers are seconds"""
+    if isinstance(value, bool):
+        raise ConfigError(f"{where}: expected a duration, got {value!r}")
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _duration.match(str(value))
+    if not match:
+        raise ConfigError(f"{where}: expected a duration like 30s, 5m or 250ms, got {value!r}")
+    number, unit = float(match.group(1)), match.group(2) or 's'
+    return number * {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}[unit]
+
+
+def parse_seconds(value, where):
+    """Whole seconds for Terraform arguments that take integers"""
+    seconds = parse_duration(value, where)
+    if seconds != int(seconds):
+        raise ConfigError(f"{where}: expected whole seconds, got {value!r}")
+    return int(seconds)
+
+
+def parse_size_mb(value, where):
+    """Megabytes (int) from 512, "512", "512Mi", "512MB", "1Gi" or "1GB\""""
+    if isinstance(value, bool):
+        raise ConfigError(f"{where}: expected a size in MB, got {value!r}")
+    if isinstance(value, int):
+        return value
+    match = _size.match(str(value))
+    if not match:
+        raise ConfigError(f"{where}: expected a size like 512 or 1Gi, got {value!r}")
+    number, unit = int(match.group(1)), (match.group(2) or 'mi').lower()
+    return number * 1024 if unit in ('gi', 'gb', 'g') else number
+
+
+def parse_cpu_units(value, where):
+    """ECS CPU units (int) from 256 or "256", as the task definition took either"""
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    return expect_int(value, where, 1)
+
+
+def expect(value, types, where):
+    """value if it is one of types; a YAML true/false only counts as bool, not int"""
+    allowed = types if isinstance(types, tuple) else (types,)
+    if not isinstance(value, allowed) or (isinstance(value, bool) and bool not in allowed):
+        raise ConfigError(f"{where}: expected {_type_names(types)}, got {value!r}")
+    return value
+
+
+def _type_names(types):
+    types = types if isinstance(types, tuple) else (types,)
+    return ' or '.join({dict: 'a mapping', list: 'a list', str: 'a string', int: 'an integer',
+                        float: 'a number', bool: 'true/false'}.get(t, t.__name__) for t in types)
+
+
+def expect_int(value, where, minimum=None):
+    expect(value, int, where)
+    if minimum is not None and value < minimum:
+        raise ConfigError(f"{where}: must be >= {minimum}, got {value}")
+    return value
+
+
+def optional_number(value, where):
+    return None if value is None else expect(value, (int, float), where)
+
+
+def optional_duration(value, where):
+    return None if value is None else parse_duration(value, where)
+
+
+def step_mode(value):
+    if value not in ('simple', 'proportional'):
+        raise ConfigError(f"scaling.step_adjustments: expected simple or proportional, got {value!r}")
+    return value
+
+
+def merge_sections(base, overlay, where):
+    base = expect(base if base is not None else {}, dict, where)
+    overlay = expect(overlay if overlay is not None else {}, dict, f"environments.<env>.{where}")
+    return {**base, **overlay}
+
+
+@dataclass(slots=True, frozen=True)
+class Resources:
+    cpu: int = 256
+    memory: int = 512
+    timeout: int = 30
+    architecture: str = 'arm64'
+    desired_count: int = 1
+    max_count: int = 10
+
+
+@dataclass(slots=True, frozen=True)
+class ScalingMetric:
+    name: str
+    target_value: float | None
+    cooldown_up: int
+    cooldown_down: int
+    processing_time: float | None = None
+    latency_slo: float | None = None
+    settings: dict = field(default_factory=dict)
+
+
+@dataclass(slots=True, frozen=True)
+class Scaling:
+    metrics: tuple = ()
+    target_value: float | None = None
+    scale_up_cooldown: int = 30
+    scale_down_cooldown: int = 300
+    scale_down_threshold: float | None = None
+    proportional_steps: bool = False
+    circuit_breaker: dict = field(default_factory=dict)
+    settings: dict = field(default_factory=dict)
+
+    @property
+    def cooldown_up(self):
+        return self.metrics[0].cooldown_up if self.metrics else self.scale_up_cooldown
+
+    @property
+    def cooldown_down(self):
+        return self.metrics[0].cooldown_down if self.metrics else self.scale_down_cooldown
+
+    @property
+    def scale_up_threshold(self):
+        """Visible-message threshold of the step scaling alarms"""
+        value = self.metrics[0].target_value if self.metrics else self.target_value
+        return value if value is not None else 10
+
+    def metric(self, name):
+        for metric in self.metrics:
+            if metric.name == name:
+                return metric
+        return None
+
+
+@dataclass(slots=True, frozen=True)
+class Deployment:
+    maximum_percent: int = 200
+    minimum_healthy_percent: int = 100
+
+
+@dataclass(slots=True, frozen=True)
+class ConcurrencySchedule:
+    name: str
+    schedule: str
+    min_capacity: int
+    max_capacity: int
+    timezone: str = 'UTC'
+
+
+@dataclass(slots=True, frozen=True)
+class ProvisionedConcurrency:
+    """Provisioned concurrency on the Lambda alias; autoscaled when min/max are set"""
+    units: int
+    min_capacity: int | None = None
+    max_capacity: int | None = None
+    target_utilization: float = 0.7
+    scale_in_cooldown: int = 300
+    scale_out_cooldown: int = 60
+    schedules: tuple = ()
+
+    @property
+    def autoscaled(self):
+        return self.max_capacity is not None
+
+
+@dataclass(slots=True, frozen=True)
+class Consumer:
+    """How a worker task receives from its queue"""
+    wait_time: int = 20
+    batch_size: int = 10
+    concurrency: int = 1
+    processing_time: float | None = None
+    max_receives: int | None = None
+
+    @property
+    def visibility_timeout(self):
+        """Twice the time a task needs for one batch, so slow jobs are not redelivered mid-processing"""
+        if not self.processing_time:
+            return 30
+        rounds = math.ceil(self.batch_size / self.concurrency)
+        return min(max(30, math.ceil(2 * rounds * self.processing_time)), 43200)
+
+    @property
+    def max_receive_count(self):
+        """Batched receives can hand a message back unprocessed (shutdown, expiry), so allow more attempts"""
+        if self.max_receives is not None:
+            return self.max_receives
+        return 3 if self.batch_size == 1 else 5
+
+
+@dataclass(slots=True, frozen=True)
+class Queue:
+    """The worker's own SQS queue"""
+    fifo: bool = False
+    high_throughput: bool = False
+    content_based_deduplication: bool = False
+    message_groups: int | None = None
+
+    @property
+    def suffix(self):
+        return '.fifo' if self.fifo else ''
+
+
+@dataclass(slots=True, frozen=True)
+class Capacity:
+    """Fargate / Fargate Spot split for a worker; None falls back to the environment tfvars"""
+    on_demand_weight: int | None = None
+    spot_weight: int | None = None
+    on_demand_base: int | None = None
+    stop_timeout: int | None = None
+
+
+@dataclass(slots=True, frozen=True)
+class LambdaSettings:
+    """Runtime, telemetry and Web Adapter settings that decide a function's init cost"""
+    runtime: str = 'provided.al2'
+    handler: str = 'bootstrap'
+    telemetry: str = 'adot'
+    async_init: bool = True
+    readiness_check_path: str = '/health'
+    readiness_check_port: int | None = None
+    readiness_check_protocol: str | None = None
+    readiness_check_min_unhealthy_status: int | None = None
+    invoke_mode: str = 'buffered'
+    snapstart: bool = False
+
+    @property
+    def snapstart_applied(self):
+        return self.snapstart and self.runtime in SNAPSTART_RUNTIMES
+
+    @property
+    def streaming(self):
+        return self.invoke_mode == 'response_stream'
+
+
+@dataclass(slots=True, frozen=True)
+class Route:
+    method: str
+    path: str
+    cache_ttl: int | None = None
+    cache_key_parameters: tuple = ()
+    throttle_rate_limit: float | None = None
+    throttle_burst_limit: int | None = None
+    settings: dict = field(default_factory=dict)
+
+    @property
+    def path_parameters(self):
+        return tuple(segment.strip('{}+') for segment in self.path.split('/')
+                     if segment.startswith('{') and segment.endswith('}'))
+
+    @property
+    def cached(self):
+        return bool(self.cache_ttl)
+
+    @property
+    def method_settings(self):
+        """True when the route needs its own stage method settings"""
+        return self.cache_ttl is not None or self.throttle_rate_limit is not None \
+            or self.throttle_burst_limit is not None
+
+
+@dataclass(slots=True, frozen=True)
+class EventTarget:
+    queue: str
+    message_group_id: str | None = None
+    fields: tuple = ()          # ((name, JSONPath), ...) kept by the input transformer
+    settings: dict = field(default_factory=dict)
+
+
+@dataclass(slots=True, frozen=True)
+class EventRoute:
+    event: str
+    targets: tuple = ()
+
+
+@dataclass(slots=True, frozen=True)
+class EventDelivery:
+    merge_rules: bool = False
+    retry_attempts: int | None = None
+    max_event_age: int | None = None
+    dead_letter_queue: bool = False
+
+    @property
+    def retry(self):
+        return self.retry_attempts is not None or self.max_event_age is not None
+
+
+@dataclass(slots=True, frozen=True)
+class ServiceConfig:
+    name: str
+    environment: str
+    stage: str = 'latest'
+    resources: Resources = field(default_factory=Resources)
+    scaling: Scaling = field(default_factory=Scaling)
+    deployment: Deployment = field(default_factory=Deployment)
+    environment_variables: dict = field(default_factory=dict)
+    secrets: tuple = ()
+    routing: tuple = ()
+    event_routing: tuple = ()
+    collapse_routes: bool = False
+    shared_route_prefixes: tuple = ()
+    provisioned_concurrency: ProvisionedConcurrency | None = None
+    consumer: Consumer | None = None
+    queue: Queue = field(default_factory=Queue)
+    capacity: Capacity = field(default_factory=Capacity)
+    lambda_settings: LambdaSettings = field(default_factory=LambdaSettings)
+    event_delivery: EventDelivery = field(default_factory=EventDelivery)
+    merged: dict = field(default_factory=dict)
+
+    @property
+    def ident(self):
+        """Name usable in Terraform resource addresses"""
+        return self.name.replace('-', '_')
+
+    @classmethod
+    def from_yaml(cls, raw, environment, source='service.yaml'):
+        """Validate raw service.yaml data and merge environments.<environment> into it"""
+        try:
+            return cls._from_yaml(raw, environment)
+        except ConfigError as e:
+            raise ConfigError(f"{source} [{environment}]: {e}") from None
+
+    @classmethod
+    def _from_yaml(cls, raw, environment):
+        expect(raw, dict, 'top level')
+        environments = expect(raw.get('environments') or {}, dict, 'environments')
+        overlay = expect(environments.get(environment) or {}, dict, f"environments.{environment}")
+        merged = merge(raw, overlay)
+
+        name = expect(merged.get('name'), str, 'name')
+        if not _name.match(name):
+            raise ConfigError(f"name: must be lowercase letters, digits and dashes, got {name!r}")
+
+        env_vars = merged['environment_variables']
+        for key, value in env_vars.items():
+            expect(value, (str, int, float, bool), f"environment_variables.{key}")
+
+        config = cls(
+            name=name,
+            environment=environment,
+            stage=str(merged.get('stage', 'latest')),
+            resources=build_resources(merged['resources']),
+            scaling=build_scaling(merged['scaling']),
+            deployment=Deployment(
+                maximum_percent=expect_int(merged['deployment'].get('maximum_percent', 200),
+                                           'deployment.maximum_percent', 100),
+                minimum_healthy_percent=expect_int(merged['deployment'].get('minimum_healthy_percent', 100),
+                                                   'deployment.minimum_healthy_percent', 0),
+            ),
+            environment_variables=env_vars,
+            secrets=tuple(expect(secret, str, f"secrets[{i}]")
+                          for i, secret in enumerate(expect(merged.get('secrets') or [], list, 'secrets'))),
+            routing=tuple(build_route(route, f"routing[{i}]")
+                          for i, route in enumerate(expect(merged.get('routing') or [], list, 'routing'))),
+            event_routing=tuple(build_event_route(route, f"event_routing[{i}]")
+                                for i, route in enumerate(expect(merged.get('event_routing') or [], list,
+                                                                 'event_routing'))),
+            collapse_routes=expect(merged.get('collapse_routes', False), bool, 'collapse_routes'),
+            shared_route_prefixes=tuple(expect(merged.get('shared_route_prefixes') or [], list,
+                                               'shared_route_prefixes')),
+            provisioned_concurrency=build_provisioned_concurrency(merged['provisioned_concurrency']),
+            consumer=build_consumer(merged['consumer']),
+            queue=build_queue(merged['queue']),
+            capacity=build_capacity(merged['capacity']),
+            lambda_settings=build_lambda_settings(merged['lambda']),
+            event_delivery=build_event_delivery(merged['event_delivery']),
+            merged=merged,
+        )
+        if config.lambda_settings.snapstart_applied and config.provisioned_concurrency:
+            raise ConfigError("lambda.snapstart: SnapStart cannot be combined with provisioned_concurrency")
+        return config
+
+
+def merge(raw, overlay):
+    """One-pass merge of a service.yaml base with one environment overlay"""
+    merged = {k: v for k, v in raw.items() if k != 'environments'}
+    for key, value in overlay.items():
+        if key not in MAPPING_SECTIONS:
+            merged[key] = value
+    for section in MAPPING_SECTIONS:
+        merged[section] = merge_sections(raw.get(section), overlay.get(section), section)
+    merged['scaling']['circuit_breaker'] = merge_sections(
+        (raw.get('scaling') or {}).get('circuit_breaker'),
+        (overlay.get('scaling') or {}).get('circuit_breaker'), 'scaling.circuit_breaker')
+    return merged
+
+
+def build_resources(resources):
+    return Resources(
+        cpu=parse_cpu_units(resources.get('cpu', 256), 'resources.cpu'),
+        memory=parse_size_mb(resources.get('memory', 512), 'resources.memory'),
+        timeout=parse_seconds(resources.get('timeout', '30s'), 'resources.timeout'),
+        architecture=expect(resources.get('architecture', 'arm64'), str, 'resources.architecture'),
+        desired_count=expect_int(resources.get('desired_count', 1), 'resources.desired_count', 0),
+        max_count=expect_int(resources.get('max_count', 10), 'resources.max_count', 1),
+    )
+
+
+def build_scaling(scaling):
+    metrics = []
+    for i, metric in enumerate(expect(scaling.get('metrics') or [], list, 'scaling.metrics')):
+        where = f"scaling.metrics[{i}]"
+        expect(metric, dict, where)
+        metrics.append(ScalingMetric(
+            name=expect(metric.get('name', ''), str, f"{where}.name"),
+            target_value=optional_number(metric.get('target_value'), f"{where}.target_value"),
+            cooldown_up=parse_seconds(metric.get('cooldown_up', '30s'), f"{where}.cooldown_up"),
+            cooldown_down=parse_seconds(metric.get('cooldown_down', '300s'), f"{where}.cooldown_down"),
+            processing_time=optional_duration(metric.get('processing_time'), f"{where}.processing_time"),
+            latency_slo=optional_duration(metric.get('latency_slo'), f"{where}.latency_slo"),
+            settings=metric,
+        ))
+    return Scaling(
+        metrics=tuple(metrics),
+        target_value=optional_number(scaling.get('target_value'), 'scaling.target_value'),
+        scale_up_cooldown=parse_seconds(scaling.get('scale_up_cooldown', '30s'), 'scaling.scale_up_cooldown'),
+        scale_down_cooldown=parse_seconds(scaling.get('scale_down_cooldown', '300s'),
+                                          'scaling.scale_down_cooldown'),
+        scale_down_threshold=optional_number(scaling.get('scale_down_threshold'), 'scaling.scale_down_threshold'),
+        proportional_steps=step_mode(scaling.get('step_adjustments', 'simple')) == 'proportional',
+        circuit_breaker=scaling['circuit_breaker'],
+        settings=scaling,
+    )
+
+
+def build_route(route, where):
+    expect(route, dict, where)
+    method = expect(route.get('method', 'GET'), str, f"{where}.method").upper()
+    if method not in HTTP_METHODS:
+        raise ConfigError(f"{where}.method: unknown HTTP method {method!r}")
+    path = expect(route.get('path', '/'), str, f"{where}.path")
+    if not path.startswith('/'):
+        raise ConfigError(f"{where}.path: must start with '/', got {path!r}")
+    cache = expect(route.get('cache') or {}, dict, f"{where}.cache")
+    throttle = expect(route.get('throttle') or {}, dict, f"{where}.throttle")
+    cache_ttl = None
+    if 'ttl' in cache:
+        if method not in CACHEABLE_METHODS:
+            raise ConfigError(f"{where}.cache: only GET and HEAD responses can be cached, not {method}")
+        cache_ttl = parse_seconds(cache['ttl'], f"{where}.cache.ttl")
+        if not 0 <= cache_ttl <= MAX_CACHE_TTL:
+            raise ConfigError(f"{where}.cache.ttl: must be between 0 and {MAX_CACHE_TTL}s, got {cache_ttl}")
+    key_parameters = []
+    for i, parameter in enumerate(expect(cache.get('key_parameters') or [], list, f"{where}.cache.key_parameters")):
+        expect(parameter, str, f"{where}.cache.key_parameters[{i}]")
+        if parameter.split('.', 1)[0] not in ('querystring', 'header', 'path') or '.' not in parameter:
+            raise ConfigError(f"{where}.cache.key_parameters[{i}]: expected querystring.<name>, header.<name> "
+                              f"or path.<name>, got {parameter!r}")
+        key_parameters.append(parameter)
+    rate_limit = optional_number(throttle.get('rate_limit'), f"{where}.throttle.rate_limit")
+    burst_limit = throttle.get('burst_limit')
+    if burst_limit is not None:
+        burst_limit = expect_int(burst_limit, f"{where}.throttle.burst_limit", 0)
+    return Route(
+        method=method,
+        path=path,
+        cache_ttl=cache_ttl,
+        cache_key_parameters=tuple(key_parameters),
+        throttle_rate_limit=rate_limit,
+        throttle_burst_limit=burst_limit,
+        settings=route,
+    )
+
+
+def build_event_route(route, where):
+    expect(route, dict, where)
+    event = expect(route.get('event'), str, f"{where}.event")
+    targets = []
+    for i, target in enumerate(expect(route.get('targets') or [], list, f"{where}.targets")):
+        if isinstance(target, str):
+            targets.append(EventTarget(queue=target, settings={'queue': target}))
+        else:
+            expect(target, dict, f"{where}.targets[{i}]")
+            group = target.get('message_group_id')
+            targets.append(EventTarget(
+                queue=expect(target.get('queue'), str, f"{where}.targets[{i}].queue"),
+                message_group_id=None if group is None else expect(group, str,
+                                                                   f"{where}.targets[{i}].message_group_id"),
+                fields=build_event_fields(target.get('fields'), f"{where}.targets[{i}].fields"),
+                settings=target))
+    return EventRoute(event=event, targets=tuple(targets))
+
+
+def build_event_fields(fields, where):
+    """((name, JSONPath), ...) from a list of event paths (detail.user.id) or a {name: path} mapping"""
+    if fields is None:
+        return ()
+    if isinstance(fields, list):
+        pairs = [(expect(path, str, f"{where}[{i}]").rsplit('.', 1)[-1], path) for i, path in enumerate(fields)]
+    else:
+        pairs = list(expect(fields, dict, where).items())
+    result = []
+    for name, path in pairs:
+        expect(path, str, f"{where}.{name}")
+        name = re.sub(r'[^0-9A-Za-z_]', '_', str(name))
+        if name in dict(result):
+            raise ConfigError(f"{where}: two fields are named {name!r}; use a {{name: path}} mapping")
+        result.append((name, path if path.startswith('$') else f"$.{path}"))
+    if len(result) > MAX_INPUT_PATHS:
+        raise ConfigError(f"{where}: at most {MAX_INPUT_PATHS} fields, got {len(result)}")
+    return tuple(result)
+
+
+def build_event_delivery(settings):
+    where = 'event_delivery'
+    retry = expect(settings.get('retry') or {}, dict, f"{where}.retry")
+    attempts = retry.get('max_attempts')
+    if attempts is not None:
+        expect_int(attempts, f"{where}.retry.max_attempts", 0)
+        if attempts > MAX_EVENT_RETRIES:
+            raise ConfigError(f"{where}.retry.max_attempts: must be <= {MAX_EVENT_RETRIES}, got {attempts}")
+    max_age = retry.get('max_event_age')
+    if max_age is not None:
+        max_age = parse_seconds(max_age, f"{where}.retry.max_event_age")
+        if not 60 <= max_age <= 86400:
+            raise ConfigError(f"{where}.retry.max_event_age: must be between 60s and 24h, got {max_age}s")
+    return EventDelivery(
+        merge_rules=expect(settings.get('merge_rules', False), bool, f"{where}.merge_rules"),
+        retry_attempts=attempts,
+        max_event_age=max_age,
+        dead_letter_queue=expect(settings.get('dead_letter_queue', False), bool, f"{where}.dead_letter_queue"),
+    )
+
+
+def build_provisioned_concurrency(settings):
+    """ProvisionedConcurrency, or None when the section is absent or enabled: false"""
+    where = 'provisioned_concurrency'
+    if not settings or not expect(settings.get('enabled', True), bool, f"{where}.enabled"):
+        return None
+    autoscaling = expect(settings.get('autoscaling') or {}, dict, f"{where}.autoscaling")
+    min_capacity = max_capacity = None
+    if autoscaling:
+        min_capacity = expect_int(autoscaling.get('min', 1), f"{where}.autoscaling.min", 1)
+        max_capacity = expect_int(autoscaling.get('max'), f"{where}.autoscaling.max", min_capacity)
+    units = expect_int(settings.get('units', min_capacity or 1), f"{where}.units", 1)
+    if autoscaling and not min_capacity <= units <= max_capacity:
+        raise ConfigError(f"{where}.units: {units} is outside autoscaling min/max {min_capacity}-{max_capacity}")
+
+    target = expect(autoscaling.get('target_utilization', 0.7), (int, float), f"{where}.autoscaling.target_utilization")
+    if not 0.1 <= target <= 0.9:
+        raise ConfigError(f"{where}.autoscaling.target_utilization: must be between 0.1 and 0.9, got {target}")
+
+    schedules = []
+    for i, schedule in enumerate(expect(settings.get('schedules') or [], list, f"{where}.schedules")):
+        at = f"{where}.schedules[{i}]"
+        expect(schedule, dict, at)
+        if not autoscaling:
+            raise ConfigError(f"{at}: schedules need provisioned_concurrency.autoscaling")
+        name = expect(schedule.get('name'), str, f"{at}.name")
+        if not _name.match(name) or any(s.name == name for s in schedules):
+            raise ConfigError(f"{at}.name: must be unique lowercase letters, digits and dashes, got {name!r}")
+        expression = expect(schedule.get('schedule'), str, f"{at}.schedule")
+        if not _schedule.match(expression):
+            raise ConfigError(f"{at}.schedule: expected cron(...), rate(...) or at(...), got {expression!r}")
+        low = expect_int(schedule.get('min', min_capacity), f"{at}.min", 0)
+        high = expect_int(schedule.get('max', max_capacity), f"{at}.max", max(low, 1))
+        schedules.append(ConcurrencySchedule(name=name, schedule=expression, min_capacity=low, max_capacity=high,
+                                             timezone=expect(schedule.get('timezone', 'UTC'), str, f"{at}.timezone")))
+
+    return ProvisionedConcurrency(
+        units=units,
+        min_capacity=min_capacity,
+        max_capacity=max_capacity,
+        target_utilization=target,
+        scale_in_cooldown=parse_seconds(autoscaling.get('scale_in_cooldown', '300s'),
+                                        f"{where}.autoscaling.scale_in_cooldown"),
+        scale_out_cooldown=parse_seconds(autoscaling.get('scale_out_cooldown', '60s'),
+                                         f"{where}.autoscaling.scale_out_cooldown"),
+        schedules=tuple(schedules),
+    )
+
+
+def build_consumer(settings):
+    """Consumer, or None when service.yaml has no consumer section"""
+    if not settings:
+        return None
+    where = 'consumer'
+    wait_time = parse_seconds(settings.get('wait_time', '20s'), f"{where}.wait_time")
+    if not 0 <= wait_time <= 20:
+        raise ConfigError(f"{where}.wait_time: SQS long polling allows 0-20s, got {wait_time}s")
+    batch_size = expect_int(settings.get('batch_size', 10), f"{where}.batch_size", 1)
+    if batch_size > 10:
+        raise ConfigError(f"{where}.batch_size: SQS returns at most 10 messages per receive, got {batch_size}")
+    max_receives = settings.get('max_receives')
+    return Consumer(
+        wait_time=wait_time,
+        batch_size=batch_size,
+        concurrency=expect_int(settings.get('concurrency', 1), f"{where}.concurrency", 1),
+        processing_time=optional_duration(settings.get('processing_time'), f"{where}.processing_time"),
+        max_receives=None if max_receives is None else expect_int(max_receives, f"{where}.max_receives", 1),
+    )
+
+
+def build_queue(settings):
+    where = 'queue'
+    fifo = expect(settings.get('fifo', False), bool, f"{where}.fifo")
+    high_throughput = expect(settings.get('high_throughput', False), bool, f"{where}.high_throughput")
+    deduplication = expect(settings.get('content_based_deduplication', False), bool,
+                           f"{where}.content_based_deduplication")
+    message_groups = settings.get('message_groups')
+    if message_groups is not None:
+        expect_int(message_groups, f"{where}.message_groups", 1)
+    if not fifo and (high_throughput or deduplication or message_groups is not None):
+        raise ConfigError(f"{where}: high_throughput, content_based_deduplication and message_groups need fifo: true")
+    return Queue(fifo=fifo, high_throughput=high_throughput, content_based_deduplication=deduplication,
+                 message_groups=message_groups)
+
+
+def build_capacity(settings):
+    where = 'capacity'
+
+    def optional_int(key, minimum):
+        value = settings.get(key)
+        return None if value is None else expect_int(value, f"{where}.{key}", minimum)
+
+    stop_timeout = settings.get('stop_timeout')
+    if stop_timeout is not None:
+        stop_timeout = parse_seconds(stop_timeout, f"{where}.stop_timeout")
+        if not 2 <= stop_timeout <= 120:
+            raise ConfigError(f"{where}.stop_timeout: Fargate allows 2-120s, got {stop_timeout}s")
+    capacity = Capacity(on_demand_weight=optional_int('on_demand_weight', 0), spot_weight=optional_int('spot_weight', 0),
+                        on_demand_base=optional_int('on_demand_base', 0), stop_timeout=stop_timeout)
+    if capacity.on_demand_weight == 0 and capacity.spot_weight == 0:
+        raise ConfigError(f"{where}: on_demand_weight and spot_weight cannot both be 0")
+    return capacity
+
+
+def build_lambda_settings(settings):
+    where = 'lambda'
+
+    def choice(key, default, allowed):
+        value = settings.get(key, default)
+        if value not in allowed:
+            raise ConfigError(f"{where}.{key}: expected one of {', '.join(sorted(allowed))}, got {value!r}")
+        return value
+
+    readiness = expect(settings.get('readiness_check') or {}, dict, f"{where}.readiness_check")
+    port = readiness.get('port')
+    status = readiness.get('min_unhealthy_status')
+    protocol = readiness.get('protocol')
+    if protocol is not None and protocol not in ('http', 'tcp'):
+        raise ConfigError(f"{where}.readiness_check.protocol: expected http or tcp, got {protocol!r}")
+    return LambdaSettings(
+        runtime=choice('runtime', 'provided.al2', LAMBDA_RUNTIMES),
+        handler=expect(settings.get('handler', 'bootstrap'), str, f"{where}.handler"),
+        telemetry=choice('telemetry', 'adot', TELEMETRY_MODES),
+        async_init=expect(settings.get('async_init', True), bool, f"{where}.async_init"),
+        readiness_check_path=expect(readiness.get('path', '/health'), str, f"{where}.readiness_check.path"),
+        readiness_check_port=None if port is None else expect_int(port, f"{where}.readiness_check.port", 1),
+        readiness_check_protocol=protocol,
+        readiness_check_min_unhealthy_status=None if status is None else expect_int(
+            status, f"{where}.readiness_check.min_unhealthy_status", 100),
+        invoke_mode=choice('invoke_mode', 'buffered', INVOKE_MODES),
+        snapstart=expect(settings.get('snapstart', False), bool, f"{where}.snapstart"),
+    )
@@ -0,0 +1,158 @@
+"""CloudWatch dashboard per service, built from the same config the generators render.
+
+Widgets are derived from the route trie, event_routing and the worker queue, so
+a route, rule or queue added to service.yaml shows up on the dashboard in the
+same run that creates it. The body is JSON in a heredoc; Terraform interpolates
+the few values only known at apply time (region, API name and stage, cluster).
+
+Per-route API Gateway series need detailed CloudWatch metrics on the stage,
+which the core api-gateway module enables. Routes are spread over as many
+widgets as needed to keep each one at MAX_WIDGET_SERIES series, well inside
+CloudWatch's per-widget metric limit.
+"""
+import json
+
+from infragen.render import Template
+
+REGION = "${data.aws_region.dashboard.region}"
+API_NAME = "${data.terraform_remote_state.core.outputs.api_gateway_name}"
+API_STAGE = "${data.terraform_remote_state.core.outputs.api_gateway_stage_name}"
+CLUSTER_NAME = "${data.terraform_remote_state.core.outputs.ecs_cluster_name}"
+
+MAX_WIDGET_SERIES = 100
+
+DASHBOARD = Template('''# CloudWatch dashboard for {name}
+data "aws_region" "dashboard" {{}}
+
+resource "aws_cloudwatch_dashboard" "{ident}" {{
+  dashboard_name = "{environment}-{name}"
+  dashboard_body = <<-EOT
+{body}
+  EOT
+}}
+
+''')
+
+
+def header(title):
+    return {'type': 'text', 'width': 24, 'height': 1, 'properties': {'markdown': f"## {title}"}}
+
+
+def metric_widget(title, metrics, stat='Average', width=12, period=60):
+    return {'type': 'metric', 'width': width, 'height': 6,
+            'properties': {'title': title, 'region': REGION, 'view': 'timeSeries', 'stat': stat,
+                           'period': period, 'metrics': metrics}}
+
+
+def log_widget(title, log_group, query, width=12):
+    return {'type': 'log', 'width': width, 'height': 6,
+            'properties': {'title': title, 'region': REGION, 'view': 'timeSeries',
+                           'query': f"SOURCE '{log_group}' | {query}"}}
+
+
+def api_widgets(routes):
+    """Latency and error widgets with two series per (method, path) the service routes.
+
+    Each pair of widgets covers MAX_WIDGET_SERIES // 2 routes; titles are
+    numbered when there is more than one pair.
+    """
+    def series(metric, method, path, stat, label):
+        return ['AWS/ApiGateway', metric, 'ApiName', API_NAME, 'Stage', API_STAGE, 'Resource', path,
+                'Method', method, {'stat': stat, 'label': f"{method} {path} {label}"}]
+
+    routes = list(routes)
+    per_widget = MAX_WIDGET_SERIES // 2
+    chunks = [routes[i:i + per_widget] for i in range(0, len(routes), per_widget)] or [[]]
+    widgets = [header('API Gateway')]
+    for number, chunk in enumerate(chunks, 1):
+        part = f" ({number}/{len(chunks)})" if len(chunks) > 1 else ''
+        latency, errors = [], []
+        for method, path in chunk:
+            latency += [series('Latency', method, path, 'p50', 'p50'), series('Latency', method, path, 'p99', 'p99')]
+            errors += [series('4XXError', method, path, 'Sum', '4xx'), series('5XXError', method, path, 'Sum', '5xx')]
+        widgets += [metric_widget(f'Latency by route (ms){part}', latency),
+                    metric_widget(f'4XX / 5XX by route{part}', errors, stat='Sum')]
+    return widgets
+
+
+def lambda_widgets(function_name, provisioned_alias=None):
+    """Lambda widgets; provisioned_alias adds the provisioned concurrency series of that alias"""
+    def series(metric, stat, *dimensions, **extra):
+        return ['AWS/Lambda', metric, 'FunctionName', function_name, *dimensions, {'stat': stat, **extra}]
+
+    concurrency = [series('ConcurrentExecutions', 'Maximum')]
+    if provisioned_alias:
+        # Provisioned concurrency metrics are only published per alias/version (Resource)
+        resource = ('Resource', f"{function_name}:{provisioned_alias}")
+        concurrency += [series('ProvisionedConcurrencyUtilization', 'Maximum', *resource, yAxis='right'),
+                        series('ProvisionedConcurrencySpilloverInvocations', 'Sum', *resource)]
+    return [header('Lambda'),
+            metric_widget('Duration (ms)', [series('Duration', 'p50'), series('Duration', 'p99'),
+                                            series('Duration', 'Maximum')]),
+            log_widget('Init duration (cold starts)', f"/aws/lambda/{function_name}",
+                       'filter @type = "REPORT" and ispresent(@initDuration) '
+                       '| stats count() as cold_starts, avg(@initDuration) as avg_init_ms, '
+                       'pct(@initDuration, 99) as p99_init_ms by bin(5m)'),
+            metric_widget('Concurrency', concurrency),
+            metric_widget('Invocations, errors and throttles',
+                          [series('Invocations', 'Sum'), series('Errors', 'Sum'), series('Throttles', 'Sum')],
+                          stat='Sum')]
+
+
+def event_widgets(bus_name, rule_names, dlq_name=None):
+    invocations, failures = [], []
+    for rule in rule_names:
+        invocations.append(['AWS/Events', 'Invocations', 'EventBusName', bus_name, 'RuleName', rule,
+                            {'label': rule}])
+        failures.append(['AWS/Events', 'FailedInvocations', 'EventBusName', bus_name, 'RuleName', rule,
+                         {'label': rule}])
+    if dlq_name:
+        failures.append(['AWS/SQS', 'ApproximateNumberOfMessagesVisible', 'QueueName', dlq_name,
+                         {'stat': 'Maximum', 'label': 'dead-lettered', 'yAxis': 'right'}])
+    return [header('EventBridge'),
+            metric_widget('Rule invocations', invocations, stat='Sum'),
+            metric_widget('Failed invocations', failures, stat='Sum')]
+
+
+def queue_widgets(queue_name, dlq_name):
+    def series(metric, queue, stat='Maximum', **extra):
+        return ['AWS/SQS', metric, 'QueueName', queue, {'stat': stat, **extra}]
+
+    return [header('SQS'),
+            metric_widget('Age of oldest message (s)', [series('ApproximateAgeOfOldestMessage', queue_name)],
+                          stat='Maximum'),
+            metric_widget('Messages visible / in flight / DLQ',
+                          [series('ApproximateNumberOfMessagesVisible', queue_name, label='visible'),
+                           series('ApproximateNumberOfMessagesNotVisible', queue_name, label='in flight'),
+                           series('ApproximateNumberOfMessagesVisible', dlq_name, label='dlq', yAxis='right')],
+                          stat='Maximum')]
+
+
+def ecs_widgets(service_name):
+    def series(namespace, metric, stat, **extra):
+        return [namespace, metric, 'ClusterName', CLUSTER_NAME, 'ServiceName', service_name, {'stat': stat, **extra}]
+
+    return [header('ECS'),
+            metric_widget('Running / desired tasks',
+                          [series('ECS/ContainerInsights', 'RunningTaskCount', 'Average', label='running'),
+                           series('ECS/ContainerInsights', 'DesiredTaskCount', 'Average', label='desired')]),
+            metric_widget('CPU / memory utilization (%)',
+                          [series('AWS/ECS', 'CPUUtilization', 'Average', label='cpu'),
+                           series('AWS/ECS', 'MemoryUtilization', 'Average', label='memory')])]
+
+
+def widget_json(widget):
+    """One widget per line, with each metric row of a metric widget on its own line"""
+    properties = dict(widget['properties'])
+    metrics = properties.pop('metrics', None)
+    text = json.dumps({**widget, 'properties': properties})
+    if metrics is None:
+        return text
+    rows = ',\n'.join(f"      {json.dumps(row)}" for row in metrics)
+    return f'{text[:-2]}, "metrics": [\n{rows}\n    ]}}}}'
+
+
+def write_dashboard(out, name, ident, environment, widgets):
+    body = ',\n'.join(f"  {widget_json(widget)}" for widget in widgets)
+    DASHBOARD.render(out, name=name, ident=ident, environment=environment,
+                     body='\n'.join(f"    {line}" for line in f'{{"widgets": [\n{body}\n]}}'.splitlines()))
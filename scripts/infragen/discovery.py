@@ -0,0 +1,73 @@
+"""Locate service.yaml files in a monorepo and decide where their Terraform goes"""
+import os
+
+from infragen.config import ConfigError, ServiceConfig
+from infragen.loader import load_service_config
+from infragen.routes import plan_referenced_paths, plan_shared_prefixes
+from infragen.tfvars import environment_names
+
+SKIP_DIRS = {'.git', '.terraform', 'node_modules', '__pycache__', 'vendor'}
+
+
+def find_services(root):
+    """Return every directory under root that contains a service.yaml, sorted"""
+    service_paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        # Prune in place so os.walk never descends into generated or vendored trees
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.')]
+        if 'service.yaml' in filenames:
+            service_paths.append(dirpath)
+    return sorted(service_paths)
+
+
+def service_kind(service_config):
+    """Classify a service as 'lambda' (API behind API Gateway) or 'worker' (ECS + SQS)"""
+    kind = service_config.get('type')
+    if kind in ('lambda', 'api'):
+        return 'lambda'
+    if kind in ('worker', 'ecs'):
+        return 'worker'
+    return 'lambda' if service_config.get('routing') else 'worker'
+
+
+def terraform_dir(service_path, environment):
+    """Per-environment output directory so several environments never share a main.tf"""
+    return os.path.join(service_path, '.terraform', environment)
+
+
+def parse_environments(values):
+    """Environment names from CLI arguments: names, comma-separated lists or "all".
+
+    "all" expands to every terraform/environments/<env>.tfvars. Order is kept
+    and duplicates are dropped.
+    """
+    names = []
+    for value in values:
+        for name in value.split(','):
+            name = name.strip()
+            expanded = environment_names() if name == 'all' else [name] if name else []
+            names.extend(e for e in expanded if e not in names)
+    return names
+
+
+def shared_route_paths(root, environment):
+    """{service path: (prefixes owned by another Lambda service, own paths other services look up)}.
+
+    Ownership is planned from each service's routing merged for environment,
+    since routes may differ between environments. Services whose service.yaml
+    does not validate are left out; generating them reports the error.
+    """
+    configs = {}
+    for service_path in find_services(root):
+        raw = load_service_config(service_path)
+        if service_kind(raw) != 'lambda':
+            continue
+        try:
+            configs[service_path] = ServiceConfig.from_yaml(raw, environment,
+                                                            source=os.path.join(service_path, 'service.yaml'))
+        except ConfigError:
+            continue
+    external = plan_shared_prefixes(configs.values())
+    referenced = plan_referenced_paths(configs.values())
+    return {path: (external.get(config.name, []), referenced.get(config.name, []))
+            for path, config in configs.items() if config.name in external or config.name in referenced}
@@ -0,0 +1,74 @@
+"""EventBridge rule plan for a service's `event_routing` entries.
+
+By default every event type gets its own rule, named as it always was. With
+`event_delivery.merge_rules`, event types whose targets are identical (same
+queues, message groups and trimmed fields) share one rule whose detail-type
+pattern lists all of them, so a fan-out of N event types to the same queues
+costs one rule and one target per queue instead of N of each.
+
+FIFO targets without an explicit message_group_id use the event type as their
+group, so they only merge with themselves and keep the per-event name. Every
+other rule is named after its target set (`<service>-fanout-<digest>`), so
+adding or removing an event type only edits the rule's pattern instead of
+renaming it, which would make Terraform replace the rule and its targets.
+"""
+import hashlib
+from dataclasses import dataclass
+
+
+@dataclass(slots=True, frozen=True)
+class EventRule:
+    resource_name: str      # Terraform resource name
+    name: str               # rule name without the <env>- prefix
+    event_types: tuple
+    targets: tuple          # EventTargets, delivered for every event type of the rule
+
+    def group_id(self, target):
+        """SQS message group for a FIFO target, or None for standard queues"""
+        if not target.queue.endswith('.fifo'):
+            return None
+        return target.message_group_id or self.event_types[0]
+
+
+def _resource_name(text):
+    return text.replace('-', '_').replace('.', '_')
+
+
+def target_key(target, event_type):
+    group = (target.message_group_id or event_type) if target.queue.endswith('.fifo') else None
+    return target.queue, group, target.fields
+
+
+def plan_event_rules(config):
+    """[EventRule] for config.event_routing, merged by target set when event_delivery.merge_rules is on"""
+    name = config.name
+    if not config.event_delivery.merge_rules:
+        return [EventRule(_resource_name(f"{name}_{routing.event}"), f"{name}-{routing.event}",
+                          (routing.event,), routing.targets)
+                for routing in config.event_routing]
+
+    groups = {}
+    for routing in config.event_routing:
+        key = frozenset(target_key(target, routing.event) for target in routing.targets)
+        groups.setdefault(key, []).append(routing)
+
+    rules = []
+    for key, routings in groups.items():
+        events = tuple(routing.event for routing in routings)
+        targets = routings[0].targets
+        if any(target.queue.endswith('.fifo') and not target.message_group_id for target in targets):
+            rules.append(EventRule(_resource_name(f"{name}_{events[0]}"), f"{name}-{events[0]}", events, targets))
+            continue
+        digest = hashlib.sha256('\n'.join(sorted(map(repr, key))).encode('utf-8')).hexdigest()[:8]
+        rules.append(EventRule(_resource_name(f"{name}_fanout_{digest}"), f"{name}-fanout-{digest}",
+                               events, targets))
+    return rules
+
+
+def input_transformer(target):
+    """(input_paths, input_template) keeping only target.fields, plus the event's detail-type"""
+    paths = dict(target.fields)
+    if 'detail_type' not in paths:
+        paths['detail_type'] = '$.detail-type'
+    template = ', '.join(f'"{"detail-type" if key == "detail_type" else key}": <{key}>' for key in paths)
+    return paths, f"{{{template}}}"
@@ -0,0 +1,26 @@
+"""Load the generator scripts as modules so other entry points can reuse their functions"""
+import importlib.util
+import os
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_modules = {}
+
+
+def load_script(filename):
+    """Import a hyphenated script from scripts/ once per process"""
+    if filename not in _modules:
+        module_name = filename.rsplit('.', 1)[0].replace('-', '_')
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPTS_DIR, filename))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[filename] = module
+    return _modules[filename]
+
+
+def service_generator():
+    return load_script('generate-service-infra.py')
+
+
+def worker_generator():
+    return load_script('generate-worker-infra.py')
@@ -0,0 +1,94 @@
+"""Shared service.yaml loading: libyaml when available, plus an on-disk parse cache.
+
+PyYAML's pure-Python loader dominates generator start-up on large configs.
+CSafeLoader (built when PyYAML is compiled against libyaml) parses the same
+safe subset several times faster; without it we fall back to SafeLoader.
+
+Parsed configs are also cached in <service>/.terraform/service.yaml.cache,
+keyed by the SHA-256 of the service.yaml bytes, so an unchanged file is never
+parsed twice. The cache is plain JSON behind a one-line header with the format
+and digest, and the header is checked before the payload is decoded, so a
+planted or stale file can at worst cost a re-parse. Configs JSON cannot
+represent exactly (dates, non-string keys) are simply not cached. Delete the
+file (or the whole .terraform/) to reset.
+"""
+import hashlib
+import json
+import os
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+CACHE_FILE = 'service.yaml.cache'
+CACHE_FORMAT = 2
+_CACHE_MAGIC = b'infragen-service-yaml'
+
+LIBYAML = SafeLoader.__name__ == 'CSafeLoader'
+
+
+def parse_yaml(data):
+    """Parse YAML text or bytes with the fastest safe loader available"""
+    return yaml.load(data, Loader=SafeLoader)
+
+
+def cache_path(service_path):
+    return os.path.join(service_path, '.terraform', CACHE_FILE)
+
+
+def _cache_header(digest):
+    return b"%s %d %s\n" % (_CACHE_MAGIC, CACHE_FORMAT, digest.encode())
+
+
+def read_cache(path, digest):
+    try:
+        with open(path, 'rb') as f:
+            if f.readline() != _cache_header(digest):
+                return None
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def write_cache(path, digest, config):
+    """Best effort: a read-only checkout, or a config JSON cannot round-trip, just means no cache"""
+    try:
+        payload = json.dumps(config, separators=(',', ':'))
+    except (TypeError, ValueError):
+        return
+    if json.loads(payload) != config:
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(_cache_header(digest))
+            f.write(payload.encode())
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_service_config(service_path, data=None, digest=None, use_cache=True):
+    """Parsed service.yaml for service_path.
+
+    data/digest may be passed when the caller already read and hashed the file.
+    """
+    if data is None:
+        with open(os.path.join(service_path, 'service.yaml'), 'rb') as f:
+            data = f.read()
+    if not use_cache:
+        return parse_yaml(data)
+    if digest is None:
+        digest = hashlib.sha256(data).hexdigest()
+
+    path = cache_path(service_path)
+    config = read_cache(path, digest)
+    if config is None:
+        config = parse_yaml(data)
+        write_cache(path, digest, config)
+    return config
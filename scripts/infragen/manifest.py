@@ -0,0 +1,208 @@
+"""Content-hash manifest that lets the generators skip services whose inputs did not change.
+
+Each output directory keeps a manifest.json next to main.tf with one entry per
+environment recording the hash of the raw service.yaml, the hash of the merged
+(base + environments.<env>) config, the generator version and the hash of the
+emitted Terraform. A rerun then:
+
+  1. skips parsing entirely when service.yaml bytes and the generator are unchanged,
+  2. skips rendering when the merged config for the environment is unchanged
+     (e.g. only another environment's block or a comment was edited),
+  3. never rewrites a main.tf whose content would be byte-identical,
+
+so file mtimes only move when the Terraform actually changes. The shared
+provider lock file (see infragen.providers) is kept in sync on every run.
+"""
+import glob
+import hashlib
+import json
+import os
+
+from infragen.loader import load_service_config
+from infragen.providers import LOCK_FILE, sync_lock_file
+from infragen.render import HashingWriter
+from infragen.tfvars import tfvars_paths
+
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_FORMAT = 1
+
+# Statuses returned by regenerate()
+SKIPPED = 'skipped'        # inputs unchanged, nothing parsed or rendered
+UNCHANGED = 'unchanged'    # rendered, but output was byte-identical
+WRITTEN = 'written'        # main.tf was (re)written
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+GENERATOR_SCRIPTS = ('generate-service-infra.py', 'generate-worker-infra.py')
+
+
+def sha256_hex(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_sha256(path):
+    try:
+        with open(path, 'rb') as f:
+            return sha256_hex(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def generator_inputs():
+    """Files other than service.yaml that the generators read, in a fixed order.
+
+    Both generator scripts, this package, the environment tfvars the
+    generators read defaults from and the shared provider lock file (once
+    scripts/provider-mirror.py has created it).
+    """
+    scripts_dir = os.path.dirname(PACKAGE_DIR)
+    paths = [os.path.join(scripts_dir, name) for name in GENERATOR_SCRIPTS]
+    paths += sorted(glob.glob(os.path.join(PACKAGE_DIR, '*.py'))) + tfvars_paths()
+    if os.path.exists(LOCK_FILE):
+        paths.append(LOCK_FILE)
+    return paths
+
+
+def generator_version():
+    """Hash of generator_inputs().
+
+    Any edit to them invalidates every manifest entry, and the single service
+    scripts and the batch entry point agree on the version.
+    """
+    digest = hashlib.sha256()
+    for path in generator_inputs():
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def merged_config_hash(service_config, environment, options=None):
+    """Hash of everything that can influence one environment's output"""
+    base = {k: v for k, v in service_config.items() if k != 'environments'}
+    overlay = (service_config.get('environments') or {}).get(environment, {})
+    payload = {'base': base, 'overlay': overlay, 'environment': environment, 'options': options or {}}
+    return sha256_hex(json.dumps(payload, sort_keys=True, default=str))
+
+
+class ServiceSource:
+    """service.yaml bytes, hash and parsed config, each computed at most once"""
+    __slots__ = ('service_path', 'path', '_data', '_digest', '_config')
+
+    def __init__(self, service_path):
+        self.service_path = service_path
+        self.path = os.path.join(service_path, 'service.yaml')
+        self._data = None
+        self._digest = None
+        self._config = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            with open(self.path, 'rb') as f:
+                self._data = f.read()
+        return self._data
+
+    @property
+    def digest(self):
+        if self._digest is None:
+            self._digest = sha256_hex(self.data)
+        return self._digest
+
+    @property
+    def config(self):
+        if self._config is None:
+            self._config = load_service_config(self.service_path, self.data, self.digest)
+        return self._config
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), 'r') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'format': MANIFEST_FORMAT, 'environments': {}}
+    if manifest.get('format') != MANIFEST_FORMAT:
+        return {'format': MANIFEST_FORMAT, 'environments': {}}
+    return manifest
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, path)
+
+
+def stream_if_changed(path, write_fn):
+    """Stream write_fn(out) into a temp file and move it over path only if the bytes differ.
+
+    Returns (changed, sha256 of the content).
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            writer = HashingWriter(f)
+            write_fn(writer)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    content_hash = writer.hexdigest()
+    if file_sha256(path) == content_hash:
+        os.remove(tmp_path)
+        return False, content_hash
+    os.replace(tmp_path, path)
+    return True, content_hash
+
+
+def status_message(status, output_file):
+    if status == WRITTEN:
+        return f"Generated Terraform in {output_file}"
+    if status == SKIPPED:
+        return f"Skipped {output_file} (service.yaml and generator unchanged)"
+    return f"Terraform unchanged in {output_file}"
+
+
+def regenerate(source, environment, output_dir, render, version, options=None, force=False):
+    """Bring output_dir/main.tf up to date for one environment.
+
+    source is a ServiceSource, render(service_config, environment, out) streams
+    the Terraform text into the writer out, version is generator_version() and
+    options is any extra generator input (CLI flags) that must invalidate the cache.
+    Returns SKIPPED, UNCHANGED or WRITTEN.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    sync_lock_file(output_dir)
+    output_file = os.path.join(output_dir, 'main.tf')
+    manifest = load_manifest(output_dir)
+    entry = manifest['environments'].get(environment)
+    options_hash = sha256_hex(json.dumps(options or {}, sort_keys=True, default=str))
+
+    output_intact = (entry is not None and entry.get('generator') == version
+                     and entry.get('options') == options_hash
+                     and file_sha256(output_file) == entry.get('output'))
+
+    if not force and output_intact and entry.get('source') == source.digest:
+        return SKIPPED
+
+    config_hash = merged_config_hash(source.config, environment, options)
+    if not force and output_intact and entry.get('config') == config_hash:
+        status = SKIPPED
+        output_hash = entry['output']
+    else:
+        changed, output_hash = stream_if_changed(
+            output_file, lambda out: render(source.config, environment, out))
+        status = WRITTEN if changed else UNCHANGED
+
+    manifest['environments'][environment] = {
+        'source': source.digest,
+        'config': config_hash,
+        'generator': version,
+        'options': options_hash,
+        'output': output_hash,
+    }
+    save_manifest(output_dir, manifest)
+    return status
@@ -0,0 +1,286 @@
+"""Run terraform init/plan/apply over the generated stacks in dependency order.
+
+Stacks are the core root module (terraform/core with the environment tfvars)
+and every <service>/.terraform/<env>/main.tf the generators wrote. Every
+service depends on core, whose outputs they read through remote state, and a
+service whose event_routing targets a worker's queue depends on that worker,
+so the queue exists before the rule that delivers to it.
+
+Independent stacks run in parallel (bounded by the pool size) with one shared
+TF_PLUGIN_CACHE_DIR. Terraform does not guarantee that cache is safe for
+concurrent writers, so an `init` that may have to download providers into it
+takes a lock. Inits whose locked provider versions are all in the cache
+already only read from it and run in parallel, as do plan and apply.
+Output is streamed line by line with a [stack] prefix. When a stack fails,
+everything that depends on it is skipped.
+
+Stacks generated with --core-outputs read a local core outputs snapshot (see
+infragen.snapshot). Once core has run, its state is pulled a single time and
+copies with another lineage or serial are refreshed before any service plans.
+
+The terraform executable is a parameter, so a stand-in script can drive the
+whole flow without AWS.
+"""
+import contextlib
+import json
+import os
+import platform
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from infragen.config import ServiceConfig
+from infragen.discovery import find_services, service_kind, terraform_dir
+from infragen.events import plan_event_rules
+from infragen.loader import load_service_config
+from infragen.snapshot import SNAPSHOT_FILE, SnapshotError, snapshot_from_state, sync_snapshot
+from infragen.tfvars import ENVIRONMENTS_DIR
+
+CORE = 'core'
+CORE_DIR = os.path.join(os.path.dirname(ENVIRONMENTS_DIR), 'core')
+
+# provider "<address>" {\n  version = "<version>" in a .terraform.lock.hcl
+_LOCKED_PROVIDER = re.compile(r'provider "([^"]+)" \{\s*version\s*=\s*"([^"]+)"')
+_ARCHITECTURES = {'x86_64': 'amd64', 'amd64': 'amd64', 'aarch64': 'arm64', 'arm64': 'arm64'}
+
+# Statuses of a StackResult
+APPLIED = 'applied'
+PLANNED = 'planned'
+NO_CHANGES = 'no changes'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+
+@dataclass(slots=True)
+class Stack:
+    name: str
+    directory: str
+    init_args: tuple = ()
+    plan_args: tuple = ()
+    depends_on: set = field(default_factory=set)
+
+
+@dataclass(slots=True)
+class StackResult:
+    status: str
+    timings: dict = field(default_factory=dict)     # step -> seconds
+    error: str | None = None
+
+
+class CycleError(ValueError):
+    """The stacks' dependencies loop"""
+
+
+def core_stack(environment):
+    return Stack(CORE, CORE_DIR,
+                 init_args=(f"-backend-config=key={environment}/core/terraform.tfstate", '-reconfigure'),
+                 plan_args=(f"-var-file={os.path.join(ENVIRONMENTS_DIR, f'{environment}.tfvars')}",))
+
+
+def discover_stacks(root, environment, include_core=True):
+    """{stack name: Stack} for core and every service with generated Terraform for the environment"""
+    stacks = {CORE: core_stack(environment)} if include_core else {}
+    services = []
+    for service_path in find_services(root):
+        directory = terraform_dir(service_path, environment)
+        if not os.path.exists(os.path.join(directory, 'main.tf')):
+            continue
+        raw = load_service_config(service_path)
+        config = ServiceConfig.from_yaml(raw, environment, source=os.path.join(service_path, 'service.yaml'))
+        services.append((service_kind(raw), config))
+        stacks[config.name] = Stack(config.name, directory, depends_on={CORE} if include_core else set())
+
+    queues = {f"{config.name}-queue{config.queue.suffix}": config.name
+              for kind, config in services if kind == 'worker'}
+    for _, config in services:
+        for rule in plan_event_rules(config):
+            for target in rule.targets:
+                owner = queues.get(target.queue)
+                if owner and owner != config.name:
+                    stacks[config.name].depends_on.add(owner)
+    return stacks
+
+
+def topological_order(stacks):
+    """Stack names, dependencies first; raises CycleError"""
+    remaining = {name: {dep for dep in stack.depends_on if dep in stacks} for name, stack in stacks.items()}
+    order = []
+    ready = sorted(name for name, deps in remaining.items() if not deps)
+    dependents = {}
+    for name, deps in remaining.items():
+        for dep in deps:
+            dependents.setdefault(dep, []).append(name)
+    while ready:
+        name = ready.pop(0)
+        order.append(name)
+        for dependent in dependents.get(name, ()):
+            remaining[dependent].discard(name)
+            if not remaining[dependent]:
+                ready.append(dependent)
+    if len(order) != len(stacks):
+        raise CycleError("stack dependencies loop: " + ', '.join(sorted(set(stacks) - set(order))))
+    return order
+
+
+def terraform_platform():
+    """<os>_<arch> as Terraform names it, e.g. linux_amd64"""
+    machine = platform.machine().lower()
+    return f"{platform.system().lower()}_{_ARCHITECTURES.get(machine, machine)}"
+
+
+def providers_cached(directory, plugin_cache):
+    """True when every provider version in directory's lock file is already unpacked in plugin_cache"""
+    try:
+        with open(os.path.join(directory, '.terraform.lock.hcl'), 'r') as f:
+            providers = _LOCKED_PROVIDER.findall(f.read())
+    except FileNotFoundError:
+        return False
+    target = terraform_platform()
+    return bool(providers) and all(os.path.isdir(os.path.join(plugin_cache, address, version, target))
+                                   for address, version in providers)
+
+
+class Runner:
+    """Runs terraform steps for stacks, streaming prefixed output through log(line)"""
+
+    def __init__(self, terraform='terraform', plugin_cache=None, log=print, extra_env=None):
+        self.terraform = terraform
+        self.log = log
+        self.env = {**os.environ, 'TF_IN_AUTOMATION': '1', **(extra_env or {})}
+        self.plugin_cache = plugin_cache
+        if plugin_cache:
+            os.makedirs(plugin_cache, exist_ok=True)
+            self.env['TF_PLUGIN_CACHE_DIR'] = plugin_cache
+        self.init_lock = threading.Lock()
+        self.log_lock = threading.Lock()
+
+    def run(self, stack, *args):
+        """Run one terraform command in the stack directory; returns its exit code"""
+        command = [self.terraform, *args]
+        with subprocess.Popen(command, cwd=stack.directory, env=self.env, stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT, text=True, bufsize=1) as process:
+            for line in process.stdout:
+                with self.log_lock:
+                    self.log(f"[{stack.name}] {line.rstrip()}")
+        return process.returncode
+
+    def capture(self, stack, *args):
+        """Run one terraform command and return (exit code, stdout); stderr is logged"""
+        process = subprocess.run([self.terraform, *args], cwd=stack.directory, env=self.env,
+                                 capture_output=True, text=True)
+        with self.log_lock:
+            for line in process.stderr.splitlines():
+                self.log(f"[{stack.name}] {line}")
+        return process.returncode, process.stdout
+
+    def deploy(self, stack, apply=False):
+        result = StackResult(PLANNED)
+
+        def step(name, *args, ok=(0,)):
+            started = time.perf_counter()
+            code = self.run(stack, *args)
+            result.timings[name] = time.perf_counter() - started
+            if code not in ok:
+                raise RuntimeError(f"terraform {name} exited with {code}")
+            return code
+
+        # Only an init that may write to the shared plugin cache is serialised
+        warm = self.plugin_cache and providers_cached(stack.directory, self.plugin_cache)
+        try:
+            with contextlib.nullcontext() if warm else self.init_lock:
+                step('init', 'init', '-input=false', '-no-color', *stack.init_args)
+            # -detailed-exitcode: 0 = no changes, 2 = changes present
+            code = step('plan', 'plan', '-input=false', '-no-color', '-detailed-exitcode', '-out=tfplan',
+                        *stack.plan_args, ok=(0, 2))
+            if code == 0:
+                result.status = NO_CHANGES
+            elif apply:
+                step('apply', 'apply', '-input=false', '-no-color', 'tfplan')
+                result.status = APPLIED
+        except (RuntimeError, OSError) as e:
+            result.status, result.error = FAILED, str(e)
+        return result
+
+
+def pull_core_snapshot(runner, environment, init=True):
+    """Snapshot of the core state, pulled once with `terraform state pull`; raises SnapshotError"""
+    core = core_stack(environment)
+    if init and runner.run(core, 'init', '-input=false', '-no-color', *core.init_args) != 0:
+        raise SnapshotError(f"{environment}: terraform init failed for core")
+    code, output = runner.capture(core, 'state', 'pull')
+    if code != 0:
+        raise SnapshotError(f"{environment}: terraform state pull exited with {code}")
+    try:
+        return snapshot_from_state(json.loads(output), environment)
+    except (ValueError, KeyError) as e:
+        raise SnapshotError(f"{environment}: cannot read the core state: {e}")
+
+
+def refresh_core_snapshots(stacks, runner, environment, init=False):
+    """Pull the core state once and rewrite stale core outputs snapshots in the stacks; returns how many.
+
+    init runs `terraform init` for core first, for when the core stack itself
+    is not part of the run. Raises SnapshotError if the state cannot be read.
+    """
+    copies = [stack for name, stack in stacks.items()
+              if name != CORE and os.path.exists(os.path.join(stack.directory, SNAPSHOT_FILE))]
+    if not copies:
+        return 0
+    live = pull_core_snapshot(runner, environment, init)
+    refreshed = sum(sync_snapshot(stack.directory, live) for stack in copies)
+    with runner.log_lock:
+        runner.log(f"[{CORE}] core outputs {live.version}: {refreshed} of {len(copies)} snapshots refreshed")
+    return refreshed
+
+
+def run_environment(stacks, runner, environment, parallelism=4, apply=False):
+    """run_stacks, refreshing core outputs snapshots after core (or first, when core is not in stacks)"""
+    if CORE not in stacks:
+        try:
+            refresh_core_snapshots(stacks, runner, environment, init=True)
+        except SnapshotError as e:
+            return {name: StackResult(SKIPPED, error=str(e)) for name in stacks}
+
+    def after(name, result):
+        if name == CORE and result.status != FAILED:
+            try:
+                refresh_core_snapshots(stacks, runner, environment)
+            except SnapshotError as e:
+                result.status, result.error = FAILED, str(e)
+        return result
+
+    return run_stacks(stacks, runner, parallelism, apply, after)
+
+
+def run_stacks(stacks, runner, parallelism=4, apply=False, after=None):
+    """{stack name: StackResult}, running each stack once all of its dependencies succeeded.
+
+    after(name, result), if given, runs as each stack finishes and before its
+    dependents start; it returns the result to record.
+    """
+    topological_order(stacks)       # fail fast on cycles
+    results = {}
+    waiting = {name: {dep for dep in stack.depends_on if dep in stacks} for name, stack in stacks.items()}
+    with ThreadPoolExecutor(max_workers=parallelism) as pool:
+        running = {}
+        while waiting or running:
+            for name in sorted(waiting):
+                if len(running) >= parallelism:
+                    break
+                deps = waiting[name]
+                if any(results.get(dep) and results[dep].status in (FAILED, SKIPPED) for dep in deps):
+                    results[name] = StackResult(SKIPPED, error="a dependency failed")
+                    del waiting[name]
+                elif all(dep in results for dep in deps):
+                    running[pool.submit(runner.deploy, stacks[name], apply)] = name
+                    del waiting[name]
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name] = after(name, future.result()) if after else future.result()
+    return results
@@ -0,0 +1,102 @@
+"""Provider requirements, dependency lock file and offline mirror shared by every generated stack.
+
+Lambda and worker stacks declare the same required_providers block, so one
+.terraform.lock.hcl fits all of them. That lock file is produced once by
+scripts/provider-mirror.py from a filesystem mirror and kept in
+terraform/providers/. The generators copy it next to each main.tf, so every
+stack resolves the same provider versions and checksums.
+
+With the CLI config the helper writes (a filesystem_mirror for the hashicorp
+providers, no direct downloads, a shared plugin_cache_dir), `terraform init`
+links providers from the local cache instead of downloading them. It works
+offline once the mirror is populated.
+"""
+import os
+
+from infragen.tfvars import ENVIRONMENTS_DIR
+
+# name -> (source, version constraint); the lock file picks the exact version
+PROVIDERS = {
+    'aws': ('hashicorp/aws', '~> 6.0'),
+    'random': ('hashicorp/random', '~> 3.1'),
+}
+REGISTRY = 'registry.terraform.io'
+DEFAULT_PLATFORMS = ('linux_amd64', 'linux_arm64', 'darwin_arm64', 'darwin_amd64')
+
+PROVIDERS_DIR = os.path.join(os.path.dirname(ENVIRONMENTS_DIR), 'providers')
+LOCK_FILE = os.path.join(PROVIDERS_DIR, '.terraform.lock.hcl')
+STACK_LOCK_FILE = '.terraform.lock.hcl'
+
+DEFAULT_MIRROR = os.path.expanduser('~/.terraform.d/provider-mirror')
+DEFAULT_PLUGIN_CACHE = os.path.expanduser('~/.terraform.d/plugin-cache')
+
+
+def required_providers_block(indent='  '):
+    """The required_providers block for a terraform {} block"""
+    lines = [f"{indent}required_providers {{"]
+    for name, (source, version) in PROVIDERS.items():
+        lines += [f"{indent}  {name} = {{",
+                  f'{indent}    source  = "{source}"',
+                  f'{indent}    version = "{version}"',
+                  f"{indent}  }}"]
+    lines.append(f"{indent}}}")
+    return '\n'.join(lines)
+
+
+REQUIRED_PROVIDERS = required_providers_block()
+
+
+def versions_tf():
+    """Root module declaring only the shared providers, used to build the mirror and lock file"""
+    return ("# Generated by scripts/provider-mirror.py: the providers every generated service stack requires\n"
+            f"terraform {{\n{REQUIRED_PROVIDERS}\n}}\n")
+
+
+def cli_config(mirror_dir, plugin_cache_dir):
+    """Terraform CLI config that installs hashicorp providers only from the mirror"""
+    pattern = f"{REGISTRY}/hashicorp/*"
+    return (f'plugin_cache_dir = "{plugin_cache_dir}"\n\n'
+            'provider_installation {\n'
+            '  filesystem_mirror {\n'
+            f'    path    = "{mirror_dir}"\n'
+            f'    include = ["{pattern}"]\n'
+            '  }\n'
+            '  direct {\n'
+            f'    exclude = ["{pattern}"]\n'
+            '  }\n'
+            '}\n')
+
+
+_lock_cache = {}
+
+
+def shared_lock_file(path=LOCK_FILE):
+    """Text of the shared lock file, or None until provider-mirror.py has created it"""
+    if path not in _lock_cache:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except FileNotFoundError:
+            _lock_cache[path] = None
+        else:
+            _lock_cache[path] = content
+    return _lock_cache[path]
+
+
+def sync_lock_file(output_dir, path=LOCK_FILE):
+    """Copy the shared lock file into a stack directory unless it is already identical; returns True if written"""
+    lock = shared_lock_file(path)
+    if lock is None:
+        return False
+    target = os.path.join(output_dir, STACK_LOCK_FILE)
+    try:
+        with open(target, 'r', encoding='utf-8') as f:
+            if f.read() == lock:
+                return False
+    except FileNotFoundError:
+        pass
+    tmp_path = f"{target}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(lock)
+    os.replace(tmp_path, target)
+    return True
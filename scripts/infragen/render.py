@@ -0,0 +1,73 @@
+"""Precompiled Terraform templates that stream straight into any writer.
+
+Templates use str.format syntax (literal braces doubled, {field} placeholders),
+so the HCL reads the same as the f-strings it replaced. Each Template is parsed
+once at import time into (literal, field) chunks; rendering only writes those
+chunks and the field values to out.write(), so nothing builds up a whole
+document in memory and there is no repeated string concatenation.
+"""
+import hashlib
+import io
+import string
+
+_formatter = string.Formatter()
+
+
+class Template:
+    __slots__ = ('chunks',)
+
+    def __init__(self, source):
+        chunks = []
+        for literal, field_name, format_spec, conversion in _formatter.parse(source):
+            if format_spec or conversion:
+                raise ValueError(f"Template field {field_name!r} must be a plain name")
+            if field_name is not None and not field_name.isidentifier():
+                raise ValueError(f"Template field {field_name!r} must be a plain name")
+            chunks.append((literal, field_name))
+        self.chunks = tuple(chunks)
+
+    def render(self, out, values=None, **fields):
+        """Write the template to out; values and keyword fields fill the placeholders"""
+        if values is None:
+            values = fields
+        elif fields:
+            values = {**values, **fields}
+        write = out.write
+        for literal, field_name in self.chunks:
+            if literal:
+                write(literal)
+            if field_name is not None:
+                write(str(values[field_name]))
+
+
+class HashingWriter:
+    """Writer that forwards to another writer while hashing everything written"""
+    __slots__ = ('out', 'digest')
+
+    def __init__(self, out):
+        self.out = out
+        self.digest = hashlib.sha256()
+
+    def write(self, text):
+        self.digest.update(text.encode('utf-8'))
+        return self.out.write(text)
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
+
+
+def write_joined(out, items, separator):
+    """Write items with separator between them (no trailing separator)"""
+    first = True
+    for item in items:
+        if not first:
+            out.write(separator)
+        out.write(item)
+        first = False
+
+
+def render_to_string(write_fn, *args):
+    """Run a streaming write_fn(*args, out) into a string, for callers that want text"""
+    buffer = io.StringIO()
+    write_fn(*args, buffer)
+    return buffer.getvalue()
@@ -0,0 +1,308 @@
+"""Percentile-based CPU/memory recommendations from exported CloudWatch metrics.
+
+Exports are streamed record by record into fixed-size histograms, so a
+multi-gigabyte export needs constant memory per (service, metric). Accepted
+inputs:
+
+* CSV with a header naming `metric`, `value` and the service in `service`,
+  `ServiceName` or `FunctionName` (other columns such as timestamps are ignored);
+* JSON Lines, each line either one datapoint with the same keys or one
+  GetMetricData result ({"Label": "<service> <metric>", "Values": [...]});
+* a GetMetricData JSON document ({"MetricDataResults": [...]}), labelled the
+  same way, or several such pages concatenated. Only the outer object is walked
+  by hand and each result is decoded on its own, so memory is bounded by the
+  largest single result rather than by the file.
+
+Service names may carry the `<env>-` prefix the generated resources use.
+"""
+import csv
+import json
+import math
+from dataclasses import dataclass
+
+# Valid Fargate task sizes: CPU units -> allowed memory (MiB)
+FARGATE_SIZES = {
+    256: (512, 1024, 2048),
+    512: tuple(range(1024, 4096 + 1, 1024)),
+    1024: tuple(range(2048, 8192 + 1, 1024)),
+    2048: tuple(range(4096, 16384 + 1, 1024)),
+    4096: tuple(range(8192, 30720 + 1, 1024)),
+    8192: tuple(range(16384, 61440 + 1, 4096)),
+    16384: tuple(range(32768, 122880 + 1, 8192)),
+}
+
+LAMBDA_MEMORY_TIERS = (128, 256, 512, 768, 1024, 1536, 2048, 3008, 4096, 6144, 8192, 10240)
+
+ECS_CPU = 'CPUUtilization'
+ECS_MEMORY = 'MemoryUtilization'
+LAMBDA_DURATION = 'Duration'
+LAMBDA_MEMORY = 'MaxMemoryUsed'
+
+# Lambda Insights names for the same measurement
+METRIC_ALIASES = {'used_memory_max': LAMBDA_MEMORY, 'max_memory_used': LAMBDA_MEMORY}
+
+SERVICE_KEYS = ('service', 'ServiceName', 'FunctionName')
+
+_CHUNK_SIZE = 1 << 20
+_WHITESPACE = ' \t\n\r'
+_DECODER = json.JSONDecoder()
+
+
+class Histogram:
+    """Fixed-bin histogram for streaming percentiles; bins are linear or logarithmic"""
+    __slots__ = ('low', 'high', 'log', 'counts', 'count', 'maximum')
+
+    def __init__(self, low, high, bins=2000, log=False):
+        self.low, self.high, self.log = low, high, log
+        self.counts = [0] * bins
+        self.count = 0
+        self.maximum = 0.0
+
+    def _position(self, value):
+        if self.log:
+            value = max(value, self.low)
+            return (math.log(value) - math.log(self.low)) / (math.log(self.high) - math.log(self.low))
+        return (value - self.low) / (self.high - self.low)
+
+    def add(self, value):
+        bins = len(self.counts)
+        index = min(max(int(self._position(value) * bins), 0), bins - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.maximum = max(self.maximum, value)
+
+    def percentile(self, pct):
+        """Upper edge of the bin holding the pct-th value (never under-estimates by more than a bin)"""
+        if not self.count:
+            return None
+        rank = math.ceil(pct / 100 * self.count)
+        seen = 0
+        bins = len(self.counts)
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                fraction = (index + 1) / bins
+                if self.log:
+                    edge = math.exp(math.log(self.low) + fraction * (math.log(self.high) - math.log(self.low)))
+                else:
+                    edge = self.low + fraction * (self.high - self.low)
+                return min(edge, self.maximum)
+        return self.maximum
+
+
+def new_histogram(metric):
+    if metric in (ECS_CPU, ECS_MEMORY):
+        return Histogram(0, 100, bins=1000)
+    if metric == LAMBDA_MEMORY:
+        return Histogram(0, 10240, bins=10240)
+    return Histogram(0.1, 900000, log=True)      # durations, ms
+
+
+def _split_label(label):
+    service, _, metric = (label or '').rpartition(' ')
+    return service, metric
+
+
+def _datapoint(record):
+    service = next((record[key] for key in SERVICE_KEYS if record.get(key)), None)
+    return service, record.get('metric'), record.get('value')
+
+
+class _JsonStream:
+    """Chunked reader over a text file, decoding one JSON value at a time"""
+    __slots__ = ('f', 'chunk_size', 'buffer', 'pos', 'eof')
+
+    def __init__(self, f, chunk_size=_CHUNK_SIZE):
+        self.f, self.chunk_size = f, chunk_size
+        self.buffer, self.pos, self.eof = '', 0, False
+
+    def _fill(self):
+        # Read at least as much as is buffered, so a value spanning many chunks is re-decoded O(log n) times
+        chunk = self.f.read(max(self.chunk_size, len(self.buffer) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer, self.pos = self.buffer[self.pos:] + chunk, 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character without consuming it; '' at the end of the file"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        """Consume and return the next non-whitespace character, which must be one of chars"""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"expected one of {chars!r} in GetMetricData JSON, got {char or 'end of file'!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may go on in the next chunk
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self):
+        """Yield the elements of the array that comes next, decoding one element at a time"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.expect(']')
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+
+def metric_data_results(f, chunk_size=_CHUNK_SIZE):
+    """Yield each entry of MetricDataResults from the GetMetricData document(s) in f, one at a time"""
+    stream = _JsonStream(f, chunk_size)
+    while stream.peek():
+        stream.expect('{')
+        if stream.peek() == '}':
+            stream.expect('}')
+            continue
+        while True:
+            key = stream.value()
+            stream.expect(':')
+            if key == 'MetricDataResults':
+                yield from stream.items()
+            else:
+                stream.value()
+            if stream.expect(',}') == '}':
+                break
+
+
+def read_records(path):
+    """Yield (service, metric, value) from one export file without loading it whole"""
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                yield _datapoint(row)
+        return
+    if path.endswith('.json'):
+        with open(path) as f:
+            for result in metric_data_results(f):
+                service, metric = _split_label(result.get('Label'))
+                for value in result.get('Values', []):
+                    yield service, metric, value
+        return
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if 'Values' in record:
+                service, metric = _split_label(record.get('Label'))
+                for value in record['Values']:
+                    yield service, metric, value
+            else:
+                yield _datapoint(record)
+
+
+def collect(paths, environment):
+    """{service name: {metric: Histogram}} over every export file"""
+    prefix = f"{environment}-"
+    histograms = {}
+    for path in paths:
+        for service, metric, value in read_records(path):
+            if not service or not metric or value in (None, ''):
+                continue
+            metric = METRIC_ALIASES.get(metric, metric)
+            if service.startswith(prefix):
+                service = service[len(prefix):]
+            by_metric = histograms.setdefault(service, {})
+            histogram = by_metric.get(metric)
+            if histogram is None:
+                histogram = by_metric[metric] = new_histogram(metric)
+            histogram.add(float(value))
+    return histograms
+
+
+def snap_fargate(cpu_needed, memory_needed):
+    """Smallest valid (cpu, memory) with at least the needed CPU units and MiB"""
+    for cpu, memories in FARGATE_SIZES.items():
+        if cpu < cpu_needed:
+            continue
+        for memory in memories:
+            if memory >= memory_needed:
+                return cpu, memory
+    cpu = max(FARGATE_SIZES)
+    return cpu, FARGATE_SIZES[cpu][-1]
+
+
+def snap_lambda(memory_needed):
+    return next((tier for tier in LAMBDA_MEMORY_TIERS if tier >= memory_needed), LAMBDA_MEMORY_TIERS[-1])
+
+
+@dataclass(slots=True, frozen=True)
+class Recommendation:
+    service: str
+    kind: str
+    current: dict
+    recommended: dict
+    evidence: dict
+
+    @property
+    def changed(self):
+        return self.current != self.recommended
+
+
+def recommend_worker(config, metrics, cpu_target=0.7, memory_headroom=1.25, min_samples=100):
+    """Fargate size keeping p95 CPU under cpu_target and p99 memory with headroom, or None without data"""
+    cpu, memory = metrics.get(ECS_CPU), metrics.get(ECS_MEMORY)
+    if not cpu or not memory or cpu.count < min_samples or memory.count < min_samples:
+        return None
+    current = {'cpu': config.resources.cpu, 'memory': config.resources.memory}
+    cpu_p95, memory_p99 = cpu.percentile(95), memory.percentile(99)
+    cpu_needed = current['cpu'] * cpu_p95 / 100 / cpu_target
+    memory_needed = current['memory'] * memory_p99 / 100 * memory_headroom
+    new_cpu, new_memory = snap_fargate(cpu_needed, memory_needed)
+    return Recommendation(config.name, 'worker', current, {'cpu': new_cpu, 'memory': new_memory},
+                          {'cpu_p95_pct': round(cpu_p95, 1), 'memory_p99_pct': round(memory_p99, 1),
+                           'samples': min(cpu.count, memory.count)})
+
+
+def recommend_lambda(config, metrics, memory_headroom=1.3, min_samples=100):
+    """Lambda memory tier covering p99 MaxMemoryUsed with headroom, or None without data.
+
+    Lambda CPU scales with memory, so a function whose p95 duration is over
+    half its timeout is never shrunk.
+    """
+    used, duration = metrics.get(LAMBDA_MEMORY), metrics.get(LAMBDA_DURATION)
+    if not used or used.count < min_samples:
+        return None
+    current = {'memory': config.resources.memory}
+    used_p99 = used.percentile(99)
+    memory = snap_lambda(used_p99 * memory_headroom)
+    evidence = {'max_memory_used_p99_mb': round(used_p99), 'samples': used.count}
+    if duration and duration.count:
+        duration_p95 = duration.percentile(95)
+        evidence.update(duration_p50_ms=round(duration.percentile(50)), duration_p95_ms=round(duration_p95),
+                        duration_p99_ms=round(duration.percentile(99)))
+        if memory < current['memory'] and duration_p95 > config.resources.timeout * 1000 / 2:
+            memory = current['memory']
+            evidence['kept'] = 'p95 duration is over half the timeout'
+    return Recommendation(config.name, 'lambda', current, {'memory': memory}, evidence)
+
+
+def resources_patch(environment, recommendation):
+    """service.yaml fragment setting environments.<env>.resources"""
+    return {'environments': {environment: {'resources': dict(recommendation.recommended)}}}
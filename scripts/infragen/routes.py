@@ -0,0 +1,236 @@
+"""Route trie that plans the API Gateway resources for a service's `routing` entries.
+
+Every path segment becomes one trie node, so each aws_api_gateway_resource is
+emitted exactly once no matter how many routes share it, and the methods of a
+path are grouped on its node. Path parameters ({id}) and greedy proxies
+({proxy+}) are validated the way API Gateway will: one parameter child per
+node and nothing below a greedy segment.
+
+Paths that exist on the core REST API but belong to another stack (another
+service mounted under the same prefix) are marked external and referenced
+through a data source instead of being created a second time.
+"""
+import re
+
+ROOT_RESOURCE_ID = "data.terraform_remote_state.core.outputs.api_gateway_root_resource_id"
+
+_invalid_chars = re.compile(r'[^0-9A-Za-z_]')
+
+
+def is_parameter(segment):
+    return segment.startswith('{') and segment.endswith('}')
+
+
+def is_greedy(segment):
+    return segment.startswith('{') and segment.endswith('+}')
+
+
+def normalize_path(path):
+    return '/'.join(segment for segment in (path or '').split('/') if segment)
+
+
+def terraform_name(service_name, path):
+    """Resource name for a path; plain paths keep the historical name (and state address)"""
+    segments = []
+    for segment in path.split('/'):
+        if is_greedy(segment):
+            segment = f"{segment[1:-2]}_plus"
+        elif is_parameter(segment):
+            segment = f"by_{segment[1:-1]}"
+        segments.append(segment)
+    return _invalid_chars.sub('_', f"{service_name}_{'_'.join(segments)}")
+
+
+class RouteNode:
+    __slots__ = ('segment', 'path', 'parent', 'children', 'methods', 'external', 'resource_name')
+
+    def __init__(self, segment, path, parent):
+        self.segment = segment
+        self.path = path
+        self.parent = parent
+        self.children = {}
+        self.methods = {}
+        self.external = False
+        self.resource_name = None
+
+    def parameter_child(self):
+        for segment, child in self.children.items():
+            if is_parameter(segment):
+                return child
+        return None
+
+    def reference(self):
+        """Terraform expression for this node's resource id"""
+        if self.parent is None:
+            return ROOT_RESOURCE_ID
+        if self.external:
+            return f"data.aws_api_gateway_resource.{self.resource_name}.id"
+        return f"aws_api_gateway_resource.{self.resource_name}.id"
+
+
+class RouteTrie:
+    def __init__(self, service_name):
+        self.service_name = service_name
+        self.root = RouteNode('', '', None)
+        self.route_count = 0
+
+    def node(self, path):
+        """Return the node for path, creating the chain of nodes as needed"""
+        node = self.root
+        for segment in normalize_path(path).split('/') if normalize_path(path) else []:
+            child = node.children.get(segment)
+            if child is None:
+                if is_greedy(node.segment):
+                    raise ValueError(f"{self.service_name}: route /{node.path}/{segment} is below greedy "
+                                     f"segment {node.segment}")
+                sibling = node.parameter_child() if is_parameter(segment) else None
+                if sibling is not None:
+                    raise ValueError(f"{self.service_name}: /{node.path} has conflicting path parameters "
+                                     f"{sibling.segment} and {segment}")
+                child_path = f"{node.path}/{segment}" if node.path else segment
+                child = RouteNode(segment, child_path, node)
+                child.resource_name = terraform_name(self.service_name, child_path)
+                node.children[segment] = child
+            node = child
+        return node
+
+    def add(self, path, method, route=None):
+        node = self.node(path)
+        if node is self.root:
+            return None
+        method = method.upper()
+        if method in node.methods:
+            raise ValueError(f"{self.service_name}: duplicate route {method} /{node.path}")
+        node.methods[method] = route if route is not None else {}
+        self.route_count += 1
+        return node
+
+    def mark_external(self, path, ancestors=True):
+        """Mark path (and by default its ancestors) as owned by another stack"""
+        node = self.node(path)
+        while node is not self.root:
+            node.external = True
+            if not ancestors:
+                break
+            node = node.parent
+
+    def resource_count(self):
+        """aws_api_gateway_resource + method + integration blocks this trie emits"""
+        return sum((0 if node.external else 1) + 2 * len(node.methods) for node in self.walk())
+
+    def walk(self):
+        """Nodes in depth-first order (parents before children), root excluded"""
+        stack = list(reversed(list(self.root.children.values())))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(list(node.children.values())))
+
+
+# Route keys that only describe where the route lives; anything else is a
+# per-method setting that a shared {proxy+} method could not carry.
+_ROUTE_LOCATION_KEYS = {'method', 'path'}
+
+
+def _subtree_cost(node, referenced=frozenset()):
+    """(resources emitted, collapsible) for node's subtree"""
+    cost = 1 + 2 * len(node.methods)
+    collapsible = (not node.external and node.path not in referenced
+                   and all(not (set(route) - _ROUTE_LOCATION_KEYS) for route in node.methods.values()))
+    for child in node.children.values():
+        child_cost, child_collapsible = _subtree_cost(child, referenced)
+        cost += child_cost
+        collapsible = collapsible and child_collapsible
+    return cost, collapsible
+
+
+def collapse_to_proxy(trie, referenced_paths=()):
+    """Collapse route subtrees into a single greedy {proxy+} resource.
+
+    Every route of a service integrates with the same Lambda alias, so any
+    subtree can be served by one proxy. The topmost profitable node keeps an
+    ANY method for its own path (if it had methods) and gets a {proxy+} child
+    with ANY, replacing every resource below it. The Lambda Web Adapter routes
+    in-process, so the same requests reach the same handlers; paths or methods
+    the service never declared now get the application's 404/405 instead of
+    API Gateway's 403. Subtrees with external nodes, per-method settings or
+    paths in referenced_paths (resources of this service that other stacks look
+    up, see plan_referenced_paths) are left alone. Returns (resources before,
+    resources after, collapsed paths).
+    """
+    referenced = frozenset(normalize_path(path) for path in referenced_paths)
+    before = trie.resource_count()
+    collapsed = []
+    stack = list(trie.root.children.values())
+    while stack:
+        node = stack.pop()
+        cost, collapsible = _subtree_cost(node, referenced)
+        collapsed_cost = 4 + (2 if node.methods else 0)
+        if collapsible and node.children and collapsed_cost < cost:
+            if node.methods:
+                node.methods = {'ANY': {}}
+            node.children = {}
+            trie.node(f"{node.path}/{{proxy+}}").methods = {'ANY': {}}
+            collapsed.append(node.path)
+        else:
+            stack.extend(node.children.values())
+    return before, trie.resource_count(), sorted(collapsed)
+
+
+def build_route_trie(service_config, external_paths=()):
+    """RouteTrie for a ServiceConfig; external_paths are prefixes created by other stacks"""
+    trie = RouteTrie(service_config.name)
+    for route in service_config.routing:
+        if normalize_path(route.path):
+            trie.add(route.path, route.method, route.settings)
+    # Prefixes declared in service.yaml imply their parents exist on the core API too
+    for path in service_config.shared_route_prefixes:
+        trie.mark_external(path)
+    # Paths from plan_shared_prefixes() already list every shared ancestor with its own owner
+    for path in external_paths:
+        trie.mark_external(path, ancestors=False)
+    return trie
+
+
+def _shared_path_owners(service_configs):
+    """{path: (owning service, {services using it})} for paths used by several services.
+
+    service_configs are ServiceConfigs merged for one environment. A path used
+    by several services is owned by the one that routes a method on it (the
+    first by name when there are several, or none).
+    """
+    users = {}
+    method_owners = {}
+    for config in service_configs:
+        for route in config.routing:
+            path = normalize_path(route.path)
+            if not path:
+                continue
+            method_owners.setdefault(path, set()).add(config.name)
+            prefix = ''
+            for segment in path.split('/'):
+                prefix = f"{prefix}/{segment}" if prefix else segment
+                users.setdefault(prefix, set()).add(config.name)
+
+    return {path: (min(method_owners.get(path) or names), names) for path, names in users.items() if len(names) > 1}
+
+
+def plan_shared_prefixes(service_configs):
+    """{service name: [paths owned by another service]} for services sharing route prefixes.
+
+    Every service but a path's owner references it as external.
+    """
+    external = {}
+    for path, (owner, names) in _shared_path_owners(service_configs).items():
+        for name in names:
+            if name != owner:
+                external.setdefault(name, []).append(path)
+    return {name: sorted(paths) for name, paths in external.items()}
+
+
+def plan_referenced_paths(service_configs):
+    """{service name: [own paths that other services reference]}, which collapse_to_proxy must keep"""
+    referenced = {}
+    for path, (owner, _) in _shared_path_owners(service_configs).items():
+        referenced.setdefault(owner, []).append(path)
+    return {name: sorted(paths) for name, paths in referenced.items()}
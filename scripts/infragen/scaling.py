@@ -0,0 +1,78 @@
+"""Worker autoscaling policy math shared by the generator and the simulator.
+
+Two policy shapes are generated for ECS workers:
+
+* step scaling (the default) on the visible-message alarms, adding one task per
+  alarm or, with `step_adjustments: proportional`, one task per threshold's
+  worth of backlog above the alarm;
+* target tracking on backlog per task (visible messages / running tasks) when
+  scaling.metrics has a `backlog_per_task` entry. Its target is how many
+  messages one task can drain within the latency SLO, so the service is sized
+  to the backlog instead of stepping towards it one task at a time.
+
+FIFO queues with a known number of message groups cap the task count at the
+parallelism the groups allow.
+"""
+import math
+
+from infragen.config import ConfigError
+
+BACKLOG_METRIC = 'backlog_per_task'
+MAX_PROPORTIONAL_STEPS = 10
+
+
+def backlog_target(metric, consumer=None):
+    """Backlog-per-task target for a backlog_per_task metric.
+
+    An explicit target_value wins; otherwise latency_slo / processing_time,
+    scaled by how many messages a task processes concurrently. The processing
+    time and concurrency fall back to the service's consumer section.
+    """
+    if metric.target_value is not None:
+        return metric.target_value
+    processing_time = metric.processing_time or (consumer.processing_time if consumer else None)
+    if not processing_time or not metric.latency_slo:
+        raise ConfigError(f"scaling.metrics.{BACKLOG_METRIC}: set target_value, or processing_time and latency_slo")
+    concurrency = consumer.concurrency if consumer else 1
+    return max(1, math.floor(metric.latency_slo / processing_time * concurrency))
+
+
+def step_adjustments(threshold, max_count, proportional):
+    """[(lower bound, upper bound or None, adjustment)] for the scale-up policy.
+
+    Bounds are relative to the alarm threshold. Proportional steps add one
+    task per `threshold` messages above the alarm (rounded up to a whole
+    message), up to max_count tasks. Raises ConfigError when the threshold
+    cannot size a step.
+    """
+    if not proportional:
+        return [(0, None, 1)]
+    if not 0 < threshold < math.inf:
+        raise ConfigError(f"scaling.step_adjustments: proportional steps need a positive scale_up_threshold, "
+                          f"got {threshold!r}")
+    steps = min(max_count, MAX_PROPORTIONAL_STEPS)
+    width = max(1, math.ceil(threshold))
+    adjustments = [(i * width, (i + 1) * width, i + 1) for i in range(steps - 1)]
+    adjustments.append(((steps - 1) * width, None, steps))
+    return adjustments
+
+
+def max_tasks(config):
+    """Autoscaling ceiling: resources.max_count, capped for FIFO queues by message-group parallelism.
+
+    Only one message per group is in flight at a time, so tasks beyond
+    message_groups / consumer concurrency would sit idle.
+    """
+    max_count = config.resources.max_count
+    groups = config.queue.message_groups if config.queue.fifo else None
+    if groups is None:
+        return max_count
+    concurrency = config.consumer.concurrency if config.consumer else 1
+    return max(1, min(max_count, math.ceil(groups / concurrency)))
+
+
+def scale_down_threshold(scaling):
+    """Visible-message threshold of the scale-down alarm"""
+    if scaling.scale_down_threshold is not None:
+        return scaling.scale_down_threshold
+    return int(scaling.scale_up_threshold) // 2
@@ -0,0 +1,256 @@
+"""Offline model of the worker autoscaling policies the generator emits.
+
+Replays an arrival trace (messages per second) through SQS, Fargate task
+start-up latency and a per-message service time, with the scaling policy
+read from the same ServiceConfig the worker generator renders:
+
+* step scaling: the visible-message alarms (10 s period, one evaluation),
+  the step adjustments (simple or proportional), the scale-down threshold
+  and the cooldowns, exactly as generated;
+* target tracking on backlog per task: one-minute datapoints, scale out
+  after 3 breaching datapoints and in after 15 below 90% of the target,
+  which is how Application Auto Scaling shapes its alarms.
+
+The CPU and memory alarms are not modelled: only the queue drives load here.
+
+Only the policy decisions are evaluated in Python, once per evaluation
+period; the queue between two decisions is a Lindley recursion solved with
+cumulative sums, and queue age, task-hours and provisioning error are
+computed over the whole trace at once. A day at 1 s resolution takes well
+under a second.
+"""
+import csv
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from infragen.scaling import BACKLOG_METRIC, backlog_target, max_tasks, scale_down_threshold, step_adjustments
+
+STEP_PERIOD = 10
+TARGET_TRACKING_PERIOD = 60
+SCALE_OUT_DATAPOINTS = 3
+SCALE_IN_DATAPOINTS = 15
+SCALE_IN_RATIO = 0.9
+
+
+@dataclass(slots=True, frozen=True)
+class StepPolicy:
+    threshold: float
+    scale_down_threshold: float
+    steps: tuple
+    cooldown_up: int
+    cooldown_down: int
+    period: int = STEP_PERIOD
+
+    def decide(self, visible, running, capacity, state):
+        """Capacity change for one evaluation; state carries nothing for step scaling"""
+        if visible > self.threshold:
+            excess = visible - self.threshold
+            for lower, upper, adjustment in self.steps:
+                if excess >= lower and (upper is None or excess < upper):
+                    return adjustment
+            return self.steps[-1][2]
+        if visible <= self.scale_down_threshold:
+            return -1
+        return 0
+
+
+@dataclass(slots=True, frozen=True)
+class TargetTrackingPolicy:
+    target: float
+    cooldown_up: int
+    cooldown_down: int
+    period: int = TARGET_TRACKING_PERIOD
+
+    def decide(self, visible, running, capacity, state):
+        """Change towards visible / target tasks once the breach has lasted enough datapoints"""
+        backlog = visible / max(running, 1)
+        state['high'] = state.get('high', 0) + 1 if backlog > self.target else 0
+        state['low'] = state.get('low', 0) + 1 if backlog < self.target * SCALE_IN_RATIO else 0
+        desired = math.ceil(visible / self.target) if self.target else capacity
+        if state['high'] >= SCALE_OUT_DATAPOINTS and desired > capacity:
+            return desired - capacity
+        if state['low'] >= SCALE_IN_DATAPOINTS and desired < capacity:
+            return desired - capacity
+        return 0
+
+
+@dataclass(slots=True, frozen=True)
+class WorkerModel:
+    policy: StepPolicy | TargetTrackingPolicy
+    per_task_rate: float
+    min_tasks: int
+    max_tasks: int
+    initial_tasks: int
+    startup: int
+    latency_slo: float | None = None
+
+
+def policy_from_config(config):
+    """The scaling policy the worker generator renders for this ServiceConfig"""
+    scaling = config.scaling
+    backlog_metric = scaling.metric(BACKLOG_METRIC)
+    if backlog_metric:
+        return TargetTrackingPolicy(target=backlog_target(backlog_metric, config.consumer),
+                                    cooldown_up=backlog_metric.cooldown_up,
+                                    cooldown_down=backlog_metric.cooldown_down)
+    threshold = scaling.scale_up_threshold
+    return StepPolicy(threshold=threshold, scale_down_threshold=scale_down_threshold(scaling),
+                      steps=tuple(step_adjustments(threshold, max_tasks(config), scaling.proportional_steps)),
+                      cooldown_up=scaling.cooldown_up, cooldown_down=scaling.cooldown_down)
+
+
+def model_from_config(config, processing_time=None, concurrency=None, startup=60):
+    """WorkerModel for a ServiceConfig.
+
+    processing_time and concurrency default to the backlog_per_task metric's
+    and the consumer section's.
+    """
+    backlog_metric = config.scaling.metric(BACKLOG_METRIC)
+    consumer = config.consumer
+    if processing_time is None and backlog_metric:
+        processing_time = backlog_metric.processing_time
+    if processing_time is None and consumer:
+        processing_time = consumer.processing_time
+    if not processing_time:
+        raise ValueError(f"{config.name}: pass a per-message processing time (no backlog_per_task metric "
+                         f"or consumer section sets one)")
+    if concurrency is None:
+        concurrency = consumer.concurrency if consumer else 1
+    resources = config.resources
+    return WorkerModel(
+        policy=policy_from_config(config),
+        per_task_rate=concurrency / processing_time,
+        min_tasks=1,
+        max_tasks=max_tasks(config),
+        initial_tasks=min(max(resources.desired_count, 1), max_tasks(config)),
+        startup=int(startup),
+        latency_slo=backlog_metric.latency_slo if backlog_metric else None,
+    )
+
+
+def load_trace(path):
+    """Messages per second from a CSV; the last numeric column of each row, header rows skipped"""
+    rates = []
+    with open(path, newline='') as f:
+        for row in csv.reader(f):
+            try:
+                rates.append(float(row[-1]))
+            except (ValueError, IndexError):
+                continue
+    if not rates:
+        raise ValueError(f"{path}: no numeric rows")
+    return np.asarray(rates, dtype=np.float64)
+
+
+def synthetic_trace(seconds=86400, base=5.0, peak=50.0, bursts=4, burst_rate=200.0, burst_seconds=300, seed=0):
+    """Diurnal Poisson arrivals (trough at midnight, peak at noon) with a few short bursts"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(seconds)
+    rate = base + (peak - base) * (1 - np.cos(2 * np.pi * t / 86400)) / 2
+    for start in rng.integers(0, max(seconds - burst_seconds, 1), size=bursts):
+        rate[start:start + burst_seconds] += burst_rate
+    return rng.poisson(rate).astype(np.float64)
+
+
+def _drain(queue, arrivals, capacity):
+    """Queue length after each second: q[t] = max(q[t-1] + a[t] - c[t], 0), solved without a loop"""
+    level = queue + np.cumsum(arrivals - capacity)
+    return level - np.minimum(np.minimum.accumulate(level), 0)
+
+
+def simulate(arrivals, model):
+    """Replay arrivals (messages per second) and return a SimulationResult"""
+    arrivals = np.asarray(arrivals, dtype=np.float64)
+    n = len(arrivals)
+    policy = model.policy
+    queue = np.empty(n)
+    running = np.empty(n)
+    billed = np.empty(n)
+
+    visible = 0.0
+    active = model.initial_tasks
+    pending = np.empty(0)          # seconds at which started tasks become ready
+    cooldown_up_until = cooldown_down_until = -1
+    state = {}
+    actions = 0
+    for start in range(0, n, policy.period):
+        end = min(start + policy.period, n)
+        seconds = np.arange(start, end)
+        ready = np.searchsorted(pending, seconds, side='right')
+        running[start:end] = active + ready
+        billed[start:end] = active + len(pending)
+        queue[start:end] = _drain(visible, arrivals[start:end], running[start:end] * model.per_task_rate)
+
+        visible = queue[end - 1]
+        started = np.searchsorted(pending, end - 1, side='right')
+        active += started
+        pending = pending[started:]
+
+        change = policy.decide(visible, active, active + len(pending), state)
+        desired = min(max(active + len(pending) + change, model.min_tasks), model.max_tasks)
+        change = desired - active - len(pending)
+        if change > 0 and end >= cooldown_up_until:
+            pending = np.concatenate([pending, np.full(change, end + model.startup)])
+            cooldown_up_until = end + policy.cooldown_up
+            actions += 1
+        elif change < 0 and end >= cooldown_down_until and end >= cooldown_up_until:
+            # Scale in drops pending tasks first, then running ones
+            drop_pending = min(-change, len(pending))
+            pending = pending[:len(pending) - drop_pending]
+            active = max(active + change + drop_pending, model.min_tasks)
+            cooldown_down_until = end + policy.cooldown_down
+            actions += 1
+    return SimulationResult(arrivals, queue, running, billed, model, actions)
+
+
+class SimulationResult:
+    """Per-second series of a simulation plus the summary metrics"""
+
+    def __init__(self, arrivals, queue, running, billed, model, actions):
+        self.arrivals = arrivals
+        self.queue = queue
+        self.running = running
+        self.billed = billed
+        self.model = model
+        self.actions = actions
+
+    def oldest_age(self):
+        """Age in seconds of the oldest visible message each second (ApproximateAgeOfOldestMessage)"""
+        previous = np.concatenate([[0.0], self.queue[:-1]])
+        departures = previous + self.arrivals - self.queue
+        arrived = np.cumsum(self.arrivals)
+        served = np.cumsum(departures)
+        oldest = np.searchsorted(arrived, served + 1e-9, side='left')
+        age = np.arange(len(self.queue)) - oldest
+        return np.where(self.queue > 1e-9, np.maximum(age, 0), 0)
+
+    def required_tasks(self, window=60):
+        """Tasks needed to keep up with the arrival rate (moving average over window seconds)"""
+        kernel = np.ones(window) / window
+        rate = np.convolve(self.arrivals, kernel, mode='same')
+        return np.clip(np.ceil(rate / self.model.per_task_rate), self.model.min_tasks, None)
+
+    def summary(self):
+        age = self.oldest_age()
+        required = self.required_tasks()
+        p50, p90, p99 = np.percentile(age, [50, 90, 99])
+        summary = {
+            'seconds': int(len(self.queue)),
+            'messages': float(self.arrivals.sum()),
+            'queue_age_p50_s': float(p50),
+            'queue_age_p90_s': float(p90),
+            'queue_age_p99_s': float(p99),
+            'queue_age_max_s': float(age.max()) if len(age) else 0.0,
+            'mean_wait_s': float(self.queue.mean() / self.arrivals.mean()) if self.arrivals.mean() else 0.0,
+            'task_hours': float(self.billed.sum() / 3600),
+            'over_provisioned_task_hours': float(np.maximum(self.running - required, 0).sum() / 3600),
+            'under_provisioned_task_hours': float(np.maximum(required - self.running, 0).sum() / 3600),
+            'under_provisioned_pct': float((self.running < required).mean() * 100),
+            'max_tasks': int(self.billed.max()) if len(self.billed) else 0,
+            'scaling_actions': self.actions,
+        }
+        if self.model.latency_slo:
+            summary['slo_breach_pct'] = float((age > self.model.latency_slo).mean() * 100)
+        return summary
@@ -0,0 +1,134 @@
+"""Local snapshot of the core stack's outputs, read by service stacks instead of the S3 state.
+
+Every generated stack reads core outputs through `terraform_remote_state`, so
+each plan downloads and parses the whole core state for a handful of values.
+scripts/export-core-outputs.py pulls that state once per pipeline run and
+keeps only what the stacks need: serial, lineage and the non-sensitive
+outputs, in a minimal state file (<dir>/<env>.tfstate).
+
+With --core-outputs <dir>, the generators point the remote state at a local
+copy of that file next to main.tf (`backend = "local"`). Every
+`data.terraform_remote_state.core.outputs.*` reference stays the same, and
+main.tf does not change when core outputs do; only the copy is rewritten.
+deploy-stacks.py pulls the core state once after core has run. Any copy whose
+lineage and serial differ from it is refreshed before the service stacks plan.
+
+Generating on its own has no such check, so load_snapshots refuses exports
+older than max_age (by file modification time): an export from this pipeline
+run is fine, one left over from an earlier run is not.
+"""
+import json
+import os
+import time
+from dataclasses import dataclass
+
+SNAPSHOT_FILE = 'core-outputs.tfstate'
+STATE_FORMAT = 4
+DEFAULT_MAX_AGE = '2h'    # --core-outputs-max-age: about one pipeline run
+
+# Core outputs the generated stacks reference
+REQUIRED_OUTPUTS = ('vpc_id', 'private_subnet_ids', 'ecs_cluster_id', 'ecs_cluster_name', 'api_gateway_id',
+                    'api_gateway_root_resource_id', 'api_gateway_execution_arn', 'api_gateway_name',
+                    'api_gateway_stage_name', 'api_gateway_invoke_url')
+
+S3_STATE = '''  backend = "s3"
+  config = {{
+    bucket = "terraform-state-647272350116"
+    key    = "{}/core/terraform.tfstate"
+    region = "us-east-1"
+  }}
+'''
+
+LOCAL_STATE = f'''  backend = "local"
+  config = {{
+    path = "${{path.module}}/{SNAPSHOT_FILE}"
+  }}
+'''
+
+
+class SnapshotError(ValueError):
+    """A core outputs snapshot that cannot be used"""
+
+
+@dataclass(slots=True, frozen=True)
+class Snapshot:
+    environment: str
+    serial: int
+    lineage: str
+    text: str           # minimal state file contents
+
+    @property
+    def version(self):
+        return f"serial {self.serial} of {self.lineage}"
+
+
+def core_state(environment, snapshot=False):
+    """Body of the `data "terraform_remote_state" "core"` block"""
+    return LOCAL_STATE if snapshot else S3_STATE.format(environment)
+
+
+def snapshot_from_state(state, environment, source='core state'):
+    """Snapshot with the non-sensitive outputs of a full state (as from `terraform state pull`)"""
+    if state.get('version') != STATE_FORMAT:
+        raise SnapshotError(f"{source}: unsupported state format {state.get('version')!r}")
+    outputs = {name: output for name, output in (state.get('outputs') or {}).items() if not output.get('sensitive')}
+    state_environment = outputs.get('environment', {}).get('value', environment)
+    if state_environment != environment:
+        raise SnapshotError(f"{source}: outputs are for {state_environment!r}, not {environment!r}")
+    missing = [name for name in REQUIRED_OUTPUTS if name not in outputs]
+    if missing:
+        raise SnapshotError(f"{source}: missing core outputs {', '.join(missing)}")
+    minimal = {'version': STATE_FORMAT, 'terraform_version': state.get('terraform_version'),
+               'serial': state['serial'], 'lineage': state['lineage'], 'outputs': outputs, 'resources': []}
+    text = json.dumps(minimal, indent=2, sort_keys=True) + '\n'
+    return Snapshot(environment, state['serial'], state['lineage'], text)
+
+
+def read_snapshot(path, environment, max_age=None):
+    """Snapshot from an exported <env>.tfstate; max_age (seconds) rejects older exports"""
+    try:
+        with open(path, 'r') as f:
+            state = json.load(f)
+            age = time.time() - os.fstat(f.fileno()).st_mtime
+    except FileNotFoundError:
+        raise SnapshotError(f"{path}: no core outputs snapshot (run scripts/export-core-outputs.py {environment})")
+    except ValueError as e:
+        raise SnapshotError(f"{path}: {e}")
+    if max_age and age > max_age:
+        raise SnapshotError(f"{path}: exported {age / 60:.0f} minutes ago, more than --core-outputs-max-age "
+                            f"allows; core may have changed since (run scripts/export-core-outputs.py {environment})")
+    return snapshot_from_state(state, environment, source=path)
+
+
+def load_snapshots(directory, environments, max_age=None):
+    """{environment: Snapshot} from <directory>/<env>.tfstate, or {} when directory is None"""
+    if directory is None:
+        return {}
+    return {environment: read_snapshot(os.path.join(directory, f"{environment}.tfstate"), environment, max_age)
+            for environment in environments}
+
+
+def sync_snapshot(output_dir, snapshot):
+    """Write snapshot next to main.tf unless the copy there has the same lineage and serial.
+
+    snapshot None removes a copy left from an earlier run, since the stack
+    then reads the S3 state again. Returns True if the directory changed.
+    """
+    path = os.path.join(output_dir, SNAPSHOT_FILE)
+    if snapshot is None:
+        if not os.path.exists(path):
+            return False
+        os.remove(path)
+        return True
+    try:
+        with open(path, 'r') as f:
+            current = json.load(f)
+        if (current.get('lineage'), current.get('serial')) == (snapshot.lineage, snapshot.serial):
+            return False
+    except (FileNotFoundError, ValueError):
+        pass
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(snapshot.text)
+    os.replace(tmp_path, path)
+    return True
@@ -0,0 +1,43 @@
+"""Synthetic service.yaml configs for benchmarks"""
+
+
+def synthetic_lambda_service(name='bench-api', routes=100, env_vars=20, secrets=5, events=5, targets_per_event=2):
+    """A Lambda service with nested routes, env vars, secrets and event routing"""
+    methods = ('GET', 'POST', 'PUT', 'DELETE')
+    routing = []
+    for i in range(routes):
+        # Four methods per leaf and shared parents, so resources get deduplicated
+        routing.append({'method': methods[i % 4], 'path': f"/group-{i // 40}/item-{i // 4}/action"})
+    return {
+        'name': name,
+        'stage': 'latest',
+        'resources': {'memory': 512, 'timeout': '30s'},
+        'routing': routing,
+        'secrets': [f"secret-{i}" for i in range(secrets)],
+        'event_routing': [
+            {'event': f"{name}.event-{i}",
+             'targets': [{'queue': f"worker-{(i + j) % 50}-queue"} for j in range(targets_per_event)]}
+            for i in range(events)
+        ],
+        'environments': {
+            'dev': {'environment_variables': {f"VAR_{i}": f"value-{i}" for i in range(env_vars)}},
+        },
+    }
+
+
+def synthetic_worker_service(name='bench-worker', env_vars=20, secrets=5, metrics=3):
+    """An ECS worker with env vars, secrets, scaling metrics and a circuit breaker"""
+    metric_names = ('queue_depth', 'cpu_utilization', 'memory_utilization')
+    return {
+        'name': name,
+        'resources': {'cpu': 512, 'memory': 1024, 'desired_count': 1, 'max_count': 10},
+        'scaling': {
+            'metrics': [{'name': metric_names[i % 3], 'target_value': 10 + i,
+                         'cooldown_up': '30s', 'cooldown_down': '300s'} for i in range(metrics)],
+            'circuit_breaker': {'enabled': True},
+        },
+        'secrets': [f"SECRET_{i}" for i in range(secrets)],
+        'environments': {
+            'dev': {'environment_variables': {f"VAR_{i}": f"value-{i}" for i in range(env_vars)}},
+        },
+    }
@@ -0,0 +1,92 @@
+"""Environment defaults read from terraform/environments/<env>.tfvars.
+
+The generated service stacks are separate Terraform roots, so they cannot
+read the core variables; settings that must agree with core (such as the ECS
+capacity provider split) are read from the same tfvars files instead.
+
+Only what those files use is understood: top-level `name = value` with
+strings, numbers and booleans, and flat `name = { key = value }` maps. Lists
+and anything nested are skipped.
+"""
+import functools
+import os
+import re
+
+ENVIRONMENTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                'terraform', 'environments')
+
+_assignment = re.compile(r'^\s*([A-Za-z_][A-Za-z0-9_-]*)\s*=\s*(.*?)\s*$')
+_comment = re.compile(r'\s*(#|//).*$')
+
+
+def parse_value(text):
+    if text.startswith('"') and text.endswith('"') and len(text) >= 2:
+        return text[1:-1]
+    if text in ('true', 'false'):
+        return text == 'true'
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return None
+
+
+def strip_comment(line):
+    # Values in these files never contain '#' or '//' inside strings
+    return _comment.sub('', line)
+
+
+def parse_tfvars(text):
+    """{name: value} for the simple assignments and flat maps in a tfvars file"""
+    values = {}
+    block, block_name, depth = None, None, 0
+    for raw_line in text.splitlines():
+        line = strip_comment(raw_line).strip()
+        if not line:
+            continue
+        if depth:
+            depth += line.count('{') + line.count('[') - line.count('}') - line.count(']')
+            match = _assignment.match(line)
+            if block is not None and depth == 1 and match:
+                block[match.group(1)] = parse_value(match.group(2).rstrip(','))
+            if depth == 0 and block is not None:
+                values[block_name] = block
+            continue
+        match = _assignment.match(line)
+        if not match:
+            continue
+        name, value = match.groups()
+        if value.startswith('{') or value.startswith('['):
+            depth = value.count('{') + value.count('[') - value.count('}') - value.count(']')
+            block = {} if value.startswith('{') else None
+            block_name = name
+            if depth == 0 and block is not None:
+                values[name] = block
+            continue
+        values[name] = parse_value(value)
+    return values
+
+
+def tfvars_paths(environments_dir=ENVIRONMENTS_DIR):
+    try:
+        return sorted(os.path.join(environments_dir, name) for name in os.listdir(environments_dir)
+                      if name.endswith('.tfvars'))
+    except FileNotFoundError:
+        return []
+
+
+def environment_names(environments_dir=ENVIRONMENTS_DIR):
+    """Environments that have a tfvars file, sorted"""
+    return [os.path.basename(path)[:-len('.tfvars')] for path in tfvars_paths(environments_dir)]
+
+
+@functools.lru_cache(maxsize=None)
+def environment_tfvars(environment, environments_dir=ENVIRONMENTS_DIR):
+    """Parsed <environment>.tfvars, or {} when the environment has none"""
+    try:
+        with open(os.path.join(environments_dir, f"{environment}.tfvars"), encoding='utf-8') as f:
+            return parse_tfvars(f.read())
+    except FileNotFoundError:
+        return {}
@@ -0,0 +1,233 @@
+"""Cross-service event topology: API routes -> Lambda -> bus -> rule -> queue -> worker.
+
+Every service.yaml is turned into nodes and edges of one in-memory graph. Event
+targets are resolved against the queues the worker generator creates
+(`<worker>-queue`, plus `.fifo` for FIFO workers) through a dict index, and
+everything after loading is linear in nodes + edges, so thousands of services
+analyse in milliseconds once parsed.
+
+A worker that declares event_routing publishes those events while consuming,
+which is how a path can loop back to a queue it started from.
+
+Findings:
+
+* missing-queue (error): a target names a queue no worker creates. The
+  generated ARN would point at nothing.
+* cycle (error): events can flow back to where they started.
+* orphaned-queue (warning): a worker queue that no rule delivers to.
+* fan-out (warning): one event type reaches `fanout_threshold` or more queues.
+* amplification (warning): one published event produces `amplification_threshold`
+  or more messages downstream (counting republishing workers).
+"""
+import json
+from dataclasses import dataclass, field
+
+from infragen.config import ServiceConfig
+from infragen.discovery import service_kind
+from infragen.events import plan_event_rules
+
+KIND_SHAPES = {'route': 'note', 'lambda': 'box', 'bus': 'hexagon', 'rule': 'diamond', 'queue': 'cylinder',
+               'worker': 'box3d'}
+
+
+@dataclass(slots=True)
+class Finding:
+    severity: str
+    kind: str
+    message: str
+    nodes: tuple = ()
+
+
+@dataclass(slots=True)
+class Graph:
+    nodes: dict = field(default_factory=dict)        # id -> {'kind': ..., 'service': ..., ...}
+    edges: list = field(default_factory=list)        # (source, target, attributes)
+    successors: dict = field(default_factory=dict)   # id -> [target ids]
+    predecessors: dict = field(default_factory=dict) # id -> [source ids]
+
+    def add_node(self, node_id, kind, **attributes):
+        if node_id not in self.nodes:
+            self.nodes[node_id] = {'kind': kind, **attributes}
+            self.successors[node_id] = []
+            self.predecessors[node_id] = []
+        return node_id
+
+    def add_edge(self, source, target, **attributes):
+        self.successors[source].append(target)
+        self.predecessors[target].append(source)
+        self.edges.append((source, target, attributes))
+
+    def targets(self, node_id):
+        return self.successors[node_id]
+
+
+def queue_id(queue):
+    return f"queue:{queue}"
+
+
+def build_graph(services):
+    """Graph from (kind, ServiceConfig) pairs; returns (graph, [(service, queue) targets with no worker queue])"""
+    graph = Graph()
+    queues = {}
+    for kind, config in services:
+        if kind == 'worker':
+            queue = f"{config.name}-queue{config.queue.suffix}"
+            queues[queue] = config.name
+            worker = graph.add_node(f"worker:{config.name}", 'worker', service=config.name)
+            graph.add_node(queue_id(queue), 'queue', service=config.name)
+            graph.add_edge(queue_id(queue), worker, kind='consumes', amplification=1)
+
+    missing = []
+    for kind, config in services:
+        name = config.name
+        source = graph.add_node(f"{kind}:{name}", kind, service=name)
+        if kind == 'lambda':
+            for route in config.routing:
+                route_node = graph.add_node(f"route:{name} {route.method} {route.path}", 'route', service=name)
+                graph.add_edge(route_node, source, kind='invokes', amplification=1)
+        if not config.event_routing:
+            continue
+        bus = graph.add_node(f"bus:{name}-events", 'bus', service=name)
+        graph.add_edge(source, bus, kind='publishes', amplification=1)
+        for rule in plan_event_rules(config):
+            rule_node = graph.add_node(f"rule:{rule.name}", 'rule', service=name, events=list(rule.event_types))
+            graph.add_edge(bus, rule_node, kind='matches', events=list(rule.event_types),
+                           amplification=len(rule.targets))
+            for target in rule.targets:
+                if target.queue not in queues:
+                    missing.append((name, target.queue))
+                    graph.add_node(queue_id(target.queue), 'queue', service=None, missing=True)
+                graph.add_edge(rule_node, queue_id(target.queue), kind='delivers', amplification=1,
+                               trimmed=bool(target.fields))
+    return graph, missing
+
+
+def strongly_connected(graph):
+    """Tarjan's algorithm, iterative; returns components that contain a cycle"""
+    index, lowlink, on_stack, stack, components = {}, {}, set(), [], []
+    counter = 0
+    for root in graph.nodes:
+        if root in index:
+            continue
+        work = [(root, iter(graph.targets(root)))]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(graph.targets(child))))
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in graph.targets(node):
+                        components.append(component)
+    return components
+
+
+def downstream_messages(graph, cyclic):
+    """{node id: SQS messages one unit of input produces at and below it}, nodes on cycles excluded"""
+    memo = {}
+    for root in graph.nodes:
+        if root in memo or root in cyclic:
+            continue
+        work = [(root, False)]
+        while work:
+            node, expanded = work.pop()
+            if node in memo:
+                continue
+            children = [child for child in graph.targets(node) if child not in cyclic]
+            if not expanded:
+                work.append((node, True))
+                work.extend((child, False) for child in children if child not in memo)
+                continue
+            counts = [memo.get(child, 0) for child in children]
+            kind = graph.nodes[node]['kind']
+            if kind == 'bus':
+                # An event matches one rule of its bus
+                memo[node] = max(counts, default=0)
+            else:
+                # A rule sends every event to each of its targets
+                memo[node] = (1 if kind == 'queue' else 0) + sum(counts)
+    return memo
+
+
+def analyse(graph, missing, fanout_threshold=5, amplification_threshold=10):
+    findings = [Finding('error', 'missing-queue',
+                        f"{service}: event target {queue!r} is not the queue of any worker", (queue_id(queue),))
+                for service, queue in missing]
+
+    components = strongly_connected(graph)
+    for component in components:
+        findings.append(Finding('error', 'cycle', "events can loop through " + ', '.join(sorted(component)),
+                                tuple(component)))
+
+    for node_id, node in graph.nodes.items():
+        if node['kind'] == 'queue' and not node.get('missing') and not graph.predecessors[node_id]:
+            findings.append(Finding('warning', 'orphaned-queue',
+                                    f"{node_id[len('queue:'):]}: no event rule delivers to this queue", (node_id,)))
+
+    reach = {}
+    for source, target, attributes in graph.edges:
+        if attributes['kind'] == 'delivers':
+            for event in graph.nodes[source]['events']:
+                reach.setdefault((graph.nodes[source]['service'], event), set()).add(target)
+    for (service, event), queues in reach.items():
+        if len(queues) >= fanout_threshold:
+            findings.append(Finding('warning', 'fan-out', f"{service}: {event} is delivered to {len(queues)} queues",
+                                    tuple(sorted(queues))))
+
+    cyclic = {node for component in components for node in component}
+    messages = downstream_messages(graph, cyclic)
+    for node_id, node in graph.nodes.items():
+        if node['kind'] == 'bus' and messages.get(node_id, 0) >= amplification_threshold:
+            findings.append(Finding('warning', 'amplification',
+                                    f"{node['service']}: one published event produces up to "
+                                    f"{messages[node_id]} SQS messages downstream", (node_id,)))
+    return findings, messages
+
+
+def load_services(sources, environment):
+    """[(kind, ServiceConfig)] from (service.yaml path, parsed service.yaml) pairs"""
+    return [(service_kind(raw), ServiceConfig.from_yaml(raw, environment, source=path)) for path, raw in sources]
+
+
+def to_json(graph, findings, messages):
+    return {
+        'nodes': [{'id': node_id, **node, 'downstream_messages': messages.get(node_id)}
+                  for node_id, node in graph.nodes.items()],
+        'edges': [{'source': source, 'target': target, **attributes} for source, target, attributes in graph.edges],
+        'findings': [{'severity': f.severity, 'kind': f.kind, 'message': f.message, 'nodes': list(f.nodes)}
+                     for f in findings],
+    }
+
+
+def write_dot(graph, findings, out):
+    flagged = {node for finding in findings if finding.severity == 'error' for node in finding.nodes}
+    out.write('digraph events {\n  rankdir=LR;\n  node [fontsize=10];\n')
+    for node_id, node in graph.nodes.items():
+        color = ', color=red' if node_id in flagged else ''
+        out.write(f'  {json.dumps(node_id)} [shape={KIND_SHAPES[node["kind"]]}{color}];\n')
+    for source, target, attributes in graph.edges:
+        label = f' [label="x{attributes["amplification"]}"]' if attributes['amplification'] != 1 else ''
+        out.write(f'  {json.dumps(source)} -> {json.dumps(target)}{label};\n')
+    out.write('}\n')
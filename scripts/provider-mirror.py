@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Populate a local provider mirror and the shared lock file for the generated stacks.
+
+Needs network access once. Afterwards the generated stacks (and terraform/core)
+can run `terraform init` fully offline:
+
+  1. writes terraform/providers/versions.tf with the providers every service stack requires,
+  2. `terraform providers mirror` downloads them, and terraform/core's, into the mirror,
+  3. `terraform providers lock -fs-mirror` records versions and checksums for each platform
+     in terraform/providers/.terraform.lock.hcl (commit it; the generators copy it
+     next to every main.tf),
+  4. writes a Terraform CLI config that installs hashicorp providers only from the
+     mirror and shares one plugin cache.
+
+    python3 scripts/provider-mirror.py
+    export TF_CLI_CONFIG_FILE=~/.terraform.d/provider-mirror/terraformrc
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from infragen.orchestrate import CORE_DIR
+from infragen.providers import (DEFAULT_MIRROR, DEFAULT_PLATFORMS, DEFAULT_PLUGIN_CACHE, LOCK_FILE, PROVIDERS_DIR,
+                                cli_config, versions_tf)
+
+
+def terraform(executable, directory, *args):
+    print(f"🔧 terraform {' '.join(args)} ({os.path.relpath(directory)})")
+    if subprocess.run([executable, *args], cwd=directory).returncode != 0:
+        print(f"❌ terraform {args[0]} {args[1]} failed in {directory}")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mirror', default=DEFAULT_MIRROR, help="filesystem mirror directory")
+    parser.add_argument('--plugin-cache', default=os.environ.get('TF_PLUGIN_CACHE_DIR', DEFAULT_PLUGIN_CACHE),
+                        help="plugin cache shared by all stacks")
+    parser.add_argument('--platform', action='append', dest='platforms',
+                        help=f"platform to mirror and lock, repeatable (default: {', '.join(DEFAULT_PLATFORMS)})")
+    parser.add_argument('--terraform', default=os.environ.get('TERRAFORM', 'terraform'),
+                        help="terraform executable (default: $TERRAFORM or terraform on PATH)")
+    parser.add_argument('--skip-core', action='store_true', help="do not mirror terraform/core's providers")
+    args = parser.parse_args()
+
+    mirror = os.path.abspath(os.path.expanduser(args.mirror))
+    plugin_cache = os.path.abspath(os.path.expanduser(args.plugin_cache))
+    platforms = [f"-platform={platform}" for platform in args.platforms or DEFAULT_PLATFORMS]
+    os.makedirs(mirror, exist_ok=True)
+    os.makedirs(plugin_cache, exist_ok=True)
+    os.makedirs(PROVIDERS_DIR, exist_ok=True)
+
+    with open(os.path.join(PROVIDERS_DIR, 'versions.tf'), 'w') as f:
+        f.write(versions_tf())
+    terraform(args.terraform, PROVIDERS_DIR, 'providers', 'mirror', *platforms, mirror)
+    if not args.skip_core:
+        terraform(args.terraform, CORE_DIR, 'providers', 'mirror', *platforms, mirror)
+    terraform(args.terraform, PROVIDERS_DIR, 'providers', 'lock', f"-fs-mirror={mirror}", *platforms)
+
+    config_path = os.path.join(mirror, 'terraformrc')
+    with open(config_path, 'w') as f:
+        f.write(cli_config(mirror, plugin_cache))
+
+    print(f"✅ Lock file: {LOCK_FILE}")
+    print(f"✅ Mirror: {mirror}")
+    print("Regenerate the stacks to copy the lock file, and point terraform at the mirror with:")
+    print(f"  export TF_CLI_CONFIG_FILE={config_path}")
+
+
+if __name__ == "__main__":
+    main()
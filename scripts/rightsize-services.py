@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Recommend Fargate CPU/memory and Lambda memory from exported CloudWatch metrics.
+
+Streams the export files (CSV, JSON Lines or GetMetricData JSON; see
+infragen/rightsizing.py), matches each series to a service.yaml under the
+monorepo root and prints, per service, a patch for environments.<env>.resources.
+
+    python3 scripts/rightsize-services.py <monorepo-root> prod exports/*.csv --output resources-prod.yaml
+"""
+import argparse
+import os
+import sys
+
+import yaml
+
+from infragen.config import ConfigError, ServiceConfig
+from infragen.discovery import find_services, service_kind
+from infragen.loader import load_service_config
+from infragen.rightsizing import collect, recommend_lambda, recommend_worker, resources_patch
+
+
+def describe(resources):
+    return ' '.join(f"{key}={value}" for key, value in resources.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('root', help="monorepo root to scan for service.yaml files")
+    parser.add_argument('environment')
+    parser.add_argument('exports', nargs='+', help="exported metric files (.csv, .jsonl, .json)")
+    parser.add_argument('--cpu-target', type=float, default=0.7, help="p95 CPU utilization to size for")
+    parser.add_argument('--memory-headroom', type=float, default=1.25, help="multiplier on p99 memory")
+    parser.add_argument('--min-samples', type=int, default=100, help="skip series with fewer datapoints")
+    parser.add_argument('--output', help="write the service.yaml patches here instead of stdout")
+    parser.add_argument('--all', action='store_true', help="also emit patches for services already right-sized")
+    args = parser.parse_args()
+
+    metrics = collect(args.exports, args.environment)
+    patches = []
+    print(f"{'SERVICE':<32} {'KIND':<7} {'CURRENT':<22} {'RECOMMENDED':<22} EVIDENCE", file=sys.stderr)
+    for service_path in find_services(args.root):
+        raw = load_service_config(service_path)
+        try:
+            config = ServiceConfig.from_yaml(raw, args.environment, source=os.path.join(service_path, 'service.yaml'))
+        except ConfigError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            continue
+        series = metrics.get(config.name)
+        if not series:
+            continue
+        if service_kind(raw) == 'lambda':
+            recommendation = recommend_lambda(config, series, args.memory_headroom, args.min_samples)
+        else:
+            recommendation = recommend_worker(config, series, args.cpu_target, args.memory_headroom, args.min_samples)
+        if recommendation is None:
+            print(f"{config.name:<32} not enough datapoints", file=sys.stderr)
+            continue
+        print(f"{config.name:<32} {recommendation.kind:<7} {describe(recommendation.current):<22} "
+              f"{describe(recommendation.recommended):<22} {describe(recommendation.evidence)}", file=sys.stderr)
+        if recommendation.changed or args.all:
+            patches.append((os.path.join(service_path, 'service.yaml'), recommendation))
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for path, recommendation in patches:
+            out.write(f"# {path}\n")
+            yaml.safe_dump(resources_patch(args.environment, recommendation), out, sort_keys=False)
+            out.write('---\n')
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Replay an arrival trace through the autoscaling policy generated for one or more workers.
+
+Each service.yaml (or service directory) is read for the given environment and
+its step or target tracking policy is simulated against the same trace, so
+different thresholds and cooldowns can be compared side by side before
+deploying. Requires NumPy.
+
+    python3 scripts/simulate-worker-scaling.py workers/email-send prod --trace arrivals.csv --processing-time 200ms
+    python3 scripts/simulate-worker-scaling.py a/service.yaml b/service.yaml prod --peak 80 --json sim.json
+"""
+import argparse
+import json
+import os
+import time
+
+from infragen.config import ServiceConfig, parse_duration
+from infragen.loader import load_service_config
+from infragen.simulate import load_trace, model_from_config, simulate, synthetic_trace
+
+COLUMNS = (
+    ('queue_age_p50_s', 'AGE p50', '{:.0f}s'),
+    ('queue_age_p99_s', 'AGE p99', '{:.0f}s'),
+    ('task_hours', 'TASK-H', '{:.1f}'),
+    ('over_provisioned_task_hours', 'OVER-H', '{:.1f}'),
+    ('under_provisioned_task_hours', 'UNDER-H', '{:.1f}'),
+    ('max_tasks', 'MAX', '{}'),
+    ('scaling_actions', 'ACTIONS', '{}'),
+)
+
+
+def service_dir(path):
+    return os.path.dirname(path) if path.endswith('.yaml') else path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('services', nargs='+', help="service directories or service.yaml files")
+    parser.add_argument('environment')
+    parser.add_argument('--trace', help="CSV of messages per second (last column); synthetic when omitted")
+    parser.add_argument('--processing-time', help="per-message service time, e.g. 200ms "
+                                                  "(default: from the backlog_per_task metric or consumer)")
+    parser.add_argument('--concurrency', type=int,
+                        help="messages a task processes at once (default: consumer.concurrency, else 1)")
+    parser.add_argument('--startup', default='60s', help="Fargate task start-up latency")
+    parser.add_argument('--seconds', type=int, default=86400, help="length of the synthetic trace")
+    parser.add_argument('--base', type=float, default=5.0, help="synthetic trough, messages/s")
+    parser.add_argument('--peak', type=float, default=50.0, help="synthetic midday peak, messages/s")
+    parser.add_argument('--bursts', type=int, default=4, help="synthetic 5-minute bursts")
+    parser.add_argument('--burst-rate', type=float, default=200.0, help="extra messages/s during a burst")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='FILE', help="also write the summaries as JSON")
+    args = parser.parse_args()
+
+    if args.trace:
+        arrivals = load_trace(args.trace)
+    else:
+        arrivals = synthetic_trace(args.seconds, args.base, args.peak, args.bursts, args.burst_rate, seed=args.seed)
+    processing_time = parse_duration(args.processing_time, '--processing-time') if args.processing_time else None
+    startup = parse_duration(args.startup, '--startup')
+
+    print(f"{len(arrivals)} s trace, {arrivals.sum():.0f} messages, peak {arrivals.max():.0f}/s")
+    print(f"{'SERVICE':<32} {'POLICY':<16}" + ''.join(f" {title:>9}" for _, title, _ in COLUMNS) + f" {'SIM ms':>8}")
+    reports = {}
+    for path in args.services:
+        directory = service_dir(path)
+        config = ServiceConfig.from_yaml(load_service_config(directory), args.environment,
+                                         source=os.path.join(directory, 'service.yaml'))
+        model = model_from_config(config, processing_time, args.concurrency, startup)
+        started = time.perf_counter()
+        summary = simulate(arrivals, model).summary()
+        elapsed = (time.perf_counter() - started) * 1000
+        reports[path] = {'policy': repr(model.policy), 'summary': summary}
+        print(f"{config.name:<32} {type(model.policy).__name__[:-6]:<16}"
+              + ''.join(f" {fmt.format(summary[key]):>9}" for key, _, fmt in COLUMNS) + f" {elapsed:>8.0f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == "__main__":
+    main()
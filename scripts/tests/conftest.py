@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The generators import the infragen package from scripts/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
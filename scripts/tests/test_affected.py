@@ -0,0 +1,95 @@
+"""--changed: direct changes, untracked services and services linked through routes or events"""
+import os
+import subprocess
+
+import pytest
+
+from infragen.affected import affected_services
+
+USERS = '''name: users
+routing:
+  - {method: GET, path: /api/users}
+event_routing:
+  - event: user.created
+    targets:
+      - queue: email-queue
+'''
+
+ORDERS = '''name: orders
+routing:
+  - {method: GET, path: /api/orders}
+'''
+
+EMAIL = '''name: email
+type: worker
+'''
+
+BILLING = '''name: billing
+routing:
+  - {method: GET, path: /billing}
+'''
+
+
+def git(repo, *args):
+    subprocess.run(['git', '-C', str(repo), *args], check=True, capture_output=True)
+
+
+def write(root, relative, text):
+    path = root / relative / 'service.yaml'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """A monorepo with four committed services"""
+    git(tmp_path, 'init', '-q')
+    git(tmp_path, 'config', 'user.email', 'ci@example.com')
+    git(tmp_path, 'config', 'user.name', 'ci')
+    for relative, text in (('services/users', USERS), ('services/orders', ORDERS), ('workers/email', EMAIL),
+                           ('services/billing', BILLING)):
+        write(tmp_path, relative, text)
+    git(tmp_path, 'add', '-A')
+    git(tmp_path, 'commit', '-q', '-m', 'services')
+    return tmp_path
+
+
+def by_name(affected):
+    return {os.path.basename(item.service_path): item for item in affected}
+
+
+def test_route_under_a_shared_prefix_affects_the_other_users(repo):
+    write(repo, 'services/orders', ORDERS + '  - {method: GET, path: /api}\n')
+    affected = by_name(affected_services(str(repo), 'HEAD', ['dev', 'prod']))
+
+    assert set(affected) == {'orders', 'users'}
+    assert affected['users'].environments == {'dev', 'prod'}
+    assert affected['users'].reason == 'linked to orders'
+
+
+def test_worker_queue_rename_affects_its_publishers(repo):
+    write(repo, 'workers/email', EMAIL + 'environments:\n  prod:\n    queue: {fifo: true}\n')
+    affected = by_name(affected_services(str(repo), 'HEAD', ['dev', 'prod']))
+
+    assert affected['email'].environments == {'prod'}
+    assert affected['users'].environments == {'prod'}
+    assert 'orders' not in affected
+
+
+def test_new_event_target_affects_the_consuming_worker(repo):
+    write(repo, 'services/billing', BILLING + 'event_routing:\n  - event: invoice.paid\n    targets:\n'
+                                              '      - queue: email-queue\n')
+    assert set(by_name(affected_services(str(repo), 'HEAD', ['dev']))) == {'billing', 'email'}
+
+
+def test_untracked_service_is_affected_against_the_working_tree(repo):
+    write(repo, 'services/search', 'name: search\nrouting:\n  - {method: GET, path: /search}\n')
+    affected = by_name(affected_services(str(repo), 'HEAD', ['dev']))
+
+    assert affected['search'].reason == 'service.yaml added'
+    assert set(affected) == {'search'}
+
+
+def test_unrelated_change_stays_alone(repo):
+    write(repo, 'services/billing', BILLING.replace('/billing', '/invoices'))
+    assert set(by_name(affected_services(str(repo), 'HEAD', ['dev']))) == {'billing'}
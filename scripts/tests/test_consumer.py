@@ -0,0 +1,53 @@
+"""Worker consumer section: visibility timeout, DLQ receive count and the settings passed to the task"""
+import pytest
+
+from infragen.config import ConfigError, ServiceConfig
+from infragen.generators import load_script
+
+
+def consumer(**settings):
+    return ServiceConfig.from_yaml({'name': 'email', 'consumer': settings}, 'dev').consumer
+
+
+@pytest.mark.parametrize('settings, visibility', [
+    ({'batch_size': 10}, 30),
+    ({'batch_size': 10, 'concurrency': 5, 'processing_time': '20s'}, 80),
+    ({'batch_size': 10, 'concurrency': 10, 'processing_time': '2s'}, 30),
+    ({'batch_size': 1, 'processing_time': '8h'}, 43200),
+])
+def test_visibility_timeout_covers_one_batch_twice(settings, visibility):
+    assert consumer(**settings).visibility_timeout == visibility
+
+
+def test_batched_receives_allow_more_attempts():
+    assert consumer(batch_size=1).max_receive_count == 3
+    assert consumer(batch_size=10).max_receive_count == 5
+    assert consumer(batch_size=10, max_receives=2).max_receive_count == 2
+
+
+@pytest.mark.parametrize('settings, message', [
+    ({'wait_time': '30s'}, 'long polling allows 0-20s'),
+    ({'batch_size': 11}, 'at most 10 messages'),
+    ({'concurrency': 0}, 'consumer.concurrency'),
+])
+def test_invalid_consumers_are_rejected(settings, message):
+    with pytest.raises(ConfigError, match=message):
+        consumer(**settings)
+
+
+def test_queue_and_task_agree_on_the_consumer_settings():
+    main_tf = load_script('generate-worker-infra.py').render_worker_terraform(
+        {'name': 'email', 'consumer': {'wait_time': '10s', 'concurrency': 5, 'processing_time': '20s'}}, 'dev')
+    assert 'visibility_timeout_seconds = 80' in main_tf
+    assert 'receive_wait_time_seconds = 10' in main_tf
+    assert 'maxReceiveCount     = 5' in main_tf
+    for name, value in (('SQS_WAIT_TIME_SECONDS', 10), ('SQS_MAX_MESSAGES', 10), ('SQS_CONCURRENCY', 5),
+                        ('SQS_VISIBILITY_TIMEOUT', 80)):
+        assert f'{{ name = "{name}", value = "{value}" }}' in main_tf
+
+
+def test_workers_without_a_consumer_keep_the_old_queue():
+    main_tf = load_script('generate-worker-infra.py').render_worker_terraform({'name': 'email'}, 'dev')
+    assert 'visibility_timeout_seconds = 30' in main_tf
+    assert 'receive_wait_time_seconds' not in main_tf
+    assert 'SQS_MAX_MESSAGES' not in main_tf
@@ -0,0 +1,26 @@
+"""Dashboard widgets stay within CloudWatch's per-widget metric limit"""
+from infragen.dashboard import MAX_WIDGET_SERIES, api_widgets, lambda_widgets
+
+
+def test_routes_are_split_across_widgets():
+    routes = [('GET', f"/items/{i}") for i in range(301)]
+    widgets = [widget for widget in api_widgets(routes) if widget['type'] == 'metric']
+
+    assert all(len(widget['properties']['metrics']) <= MAX_WIDGET_SERIES for widget in widgets)
+    latency = [widget for widget in widgets if widget['properties']['title'].startswith('Latency')]
+    assert len(latency) == 7
+    assert latency[0]['properties']['title'] == 'Latency by route (ms) (1/7)'
+    assert sum(len(widget['properties']['metrics']) for widget in latency) == 2 * len(routes)
+
+
+def test_single_widget_pair_keeps_plain_titles():
+    titles = [widget['properties'].get('title') for widget in api_widgets([('GET', '/users')])[1:]]
+    assert titles == ['Latency by route (ms)', '4XX / 5XX by route']
+
+
+def test_provisioned_concurrency_series_are_scoped_to_the_alias():
+    concurrency = lambda_widgets('dev-users', provisioned_alias='v1')[3]['properties']['metrics']
+    provisioned = [row for row in concurrency if row[1].startswith('ProvisionedConcurrency')]
+    assert len(provisioned) == 2
+    assert all(row[4:6] == ['Resource', 'dev-users:v1'] for row in provisioned)
+    assert len(lambda_widgets('dev-users')[3]['properties']['metrics']) == 1
@@ -0,0 +1,87 @@
+"""EventBridge rule planning: merged fan-out rules and input transformers"""
+import io
+
+import pytest
+
+from infragen.config import ConfigError, ServiceConfig
+from infragen.events import input_transformer, plan_event_rules
+from infragen.generators import load_script
+
+
+def rules_for(event_routing, merge_rules=True):
+    raw = {'name': 'users', 'routing': [{'method': 'GET', 'path': '/users'}], 'event_routing': event_routing,
+           'event_delivery': {'merge_rules': merge_rules}}
+    return plan_event_rules(ServiceConfig.from_yaml(raw, 'dev'))
+
+
+def to_queues(event, *queues, **target):
+    return {'event': event, 'targets': [{'queue': queue, **target} for queue in queues]}
+
+
+def test_merged_rule_keeps_its_name_when_event_types_change():
+    two = rules_for([to_queues('user.created', 'email-queue'), to_queues('user.updated', 'email-queue')])
+    three = rules_for([to_queues('user.created', 'email-queue'), to_queues('user.updated', 'email-queue'),
+                       to_queues('user.deleted', 'email-queue')])
+    one = rules_for([to_queues('user.created', 'email-queue')])
+
+    assert [rule.event_types for rule in three] == [('user.created', 'user.updated', 'user.deleted')]
+    assert {rule.name for rule in one} == {rule.name for rule in two} == {rule.name for rule in three}
+    assert two[0].name.startswith('users-fanout-')
+
+
+def test_rules_with_other_targets_get_other_names():
+    rules = rules_for([to_queues('user.created', 'email-queue'), to_queues('user.updated', 'audit-queue'),
+                       to_queues('user.deleted', 'email-queue', fields=['detail.id'])])
+    assert len({rule.name for rule in rules}) == 3
+
+
+def test_event_types_with_identical_targets_share_a_rule():
+    rules = rules_for([to_queues('user.created', 'email-queue', 'audit-queue'),
+                       to_queues('user.updated', 'audit-queue', 'email-queue'),
+                       to_queues('user.deleted', 'email-queue')])
+    assert [rule.event_types for rule in rules] == [('user.created', 'user.updated'), ('user.deleted',)]
+    assert [rule.name for rule in rules_for([to_queues('user.created', 'email-queue'),
+                                             to_queues('user.updated', 'email-queue')], merge_rules=False)] == [
+        'users-user.created', 'users-user.updated']
+
+
+def test_fifo_targets_merge_only_with_an_explicit_group():
+    per_event = rules_for([to_queues('user.created', 'email-queue.fifo'),
+                           to_queues('user.updated', 'email-queue.fifo')])
+    assert [rule.name for rule in per_event] == ['users-user.created', 'users-user.updated']
+
+    grouped = rules_for([to_queues('user.created', 'email-queue.fifo', message_group_id='tenant'),
+                         to_queues('user.updated', 'email-queue.fifo', message_group_id='tenant')])
+    assert [rule.event_types for rule in grouped] == [('user.created', 'user.updated')]
+    assert grouped[0].name.startswith('users-fanout-')
+
+
+def test_input_transformer_keeps_the_fields_and_the_detail_type():
+    rule, = rules_for([to_queues('user.created', 'email-queue', fields=['detail.user.id', 'detail.email'])])
+    paths, template = input_transformer(rule.targets[0])
+    assert paths == {'id': '$.detail.user.id', 'email': '$.detail.email', 'detail_type': '$.detail-type'}
+    assert template == '{"id": <id>, "email": <email>, "detail-type": <detail_type>}'
+
+
+def test_field_names_must_be_unique():
+    with pytest.raises(ConfigError, match="two fields are named 'id'"):
+        rules_for([to_queues('user.created', 'email-queue', fields=['detail.user.id', 'detail.order.id'])])
+    rule, = rules_for([to_queues('user.created', 'email-queue',
+                                 fields={'user_id': 'detail.user.id', 'order_id': '$.detail.order.id'})])
+    assert rule.targets[0].fields == (('user_id', '$.detail.user.id'), ('order_id', '$.detail.order.id'))
+
+
+def test_merged_targets_carry_retry_and_dead_letter_settings():
+    raw = {'name': 'users', 'event_routing': [to_queues('user.created', 'email-queue'),
+                                              to_queues('user.updated', 'email-queue')],
+           'event_delivery': {'merge_rules': True, 'retry': {'max_attempts': 4, 'max_event_age': '1h'},
+                              'dead_letter_queue': True}}
+    out = io.StringIO()
+    load_script('generate-service-infra.py').write_eventbridge_tf(raw, 'dev', out)
+    main_tf = out.getvalue()
+
+    assert main_tf.count('resource "aws_cloudwatch_event_target"') == 1
+    assert 'detail-type = ["user.created", "user.updated"]' in main_tf
+    assert 'maximum_retry_attempts       = 4' in main_tf
+    assert 'maximum_event_age_in_seconds = 3600' in main_tf
+    assert 'arn = aws_sqs_queue.users_events_dlq.arn' in main_tf
@@ -0,0 +1,56 @@
+"""FIFO worker queues: .fifo naming, message-group capped scaling and EventBridge message groups"""
+import io
+
+import pytest
+
+from infragen.config import ConfigError, ServiceConfig
+from infragen.events import plan_event_rules
+from infragen.generators import load_script
+from infragen.scaling import max_tasks
+
+
+def worker(**sections):
+    return ServiceConfig.from_yaml({'name': 'email', **sections}, 'dev')
+
+
+def test_fifo_queue_and_dlq_get_the_suffix():
+    main_tf = load_script('generate-worker-infra.py').render_worker_terraform(
+        {'name': 'email', 'queue': {'fifo': True, 'high_throughput': True}}, 'dev')
+    assert 'name                      = "dev-email-queue.fifo"' in main_tf
+    assert 'name = "dev-email-queue-dlq.fifo"' in main_tf
+    assert main_tf.count('fifo_queue                  = true') == 2
+    assert 'deduplication_scope         = "messageGroup"' in main_tf
+    assert 'fifo_throughput_limit       = "perMessageGroupId"' in main_tf
+
+
+def test_standard_queue_is_unchanged():
+    main_tf = load_script('generate-worker-infra.py').render_worker_terraform({'name': 'email'}, 'dev')
+    assert '"dev-email-queue"' in main_tf and '.fifo' not in main_tf and 'fifo_queue' not in main_tf
+
+
+def test_fifo_options_need_a_fifo_queue():
+    with pytest.raises(ConfigError, match='need fifo: true'):
+        worker(queue={'message_groups': 4})
+
+
+@pytest.mark.parametrize('sections, ceiling', [
+    ({'queue': {'fifo': True, 'message_groups': 12}, 'consumer': {'concurrency': 5}}, 3),
+    ({'queue': {'fifo': True, 'message_groups': 12}}, 10),
+    ({'queue': {'fifo': True, 'message_groups': 4}, 'resources': {'max_count': 20}}, 4),
+    ({'queue': {'fifo': True, 'message_groups': 1}, 'consumer': {'concurrency': 8}}, 1),
+    ({'queue': {'fifo': True}, 'resources': {'max_count': 20}}, 20),
+])
+def test_message_groups_cap_the_task_count(sections, ceiling):
+    assert max_tasks(worker(**sections)) == ceiling
+
+
+def test_fifo_targets_default_their_group_to_the_event_type():
+    raw = {'name': 'users', 'event_routing': [{'event': 'user.created', 'targets': [
+        {'queue': 'audit-queue.fifo'}, {'queue': 'email-queue.fifo', 'message_group_id': 'tenant'},
+        {'queue': 'plain-queue'}]}]}
+    rule, = plan_event_rules(ServiceConfig.from_yaml(raw, 'dev'))
+    assert [rule.group_id(target) for target in rule.targets] == ['user.created', 'tenant', None]
+
+    out = io.StringIO()
+    load_script('generate-service-infra.py').write_eventbridge_tf(raw, 'dev', out)
+    assert out.getvalue().count('sqs_target {') == 2
@@ -0,0 +1,48 @@
+"""service.yaml parse cache: never executes what it reads, and only serves an exact match"""
+import os
+import pickle
+
+from infragen.loader import cache_path, load_service_config, read_cache
+
+
+class Planted:
+    def __reduce__(self):
+        return os.system, ('touch planted',)
+
+
+def write_service(tmp_path, text):
+    (tmp_path / 'service.yaml').write_text(text)
+    return str(tmp_path)
+
+
+def test_cached_config_round_trips(tmp_path):
+    service = write_service(tmp_path, 'name: a\nrouting:\n  - {method: GET, path: /a}\n')
+    first = load_service_config(service)
+    assert os.path.exists(cache_path(service))
+    assert load_service_config(service) == first == {'name': 'a', 'routing': [{'method': 'GET', 'path': '/a'}]}
+
+
+def test_planted_pickle_is_not_loaded(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service = write_service(tmp_path, 'name: a\n')
+    os.makedirs(os.path.dirname(cache_path(service)))
+    with open(cache_path(service), 'wb') as f:
+        pickle.dump(Planted(), f)
+
+    assert load_service_config(service) == {'name': 'a'}
+    assert not (tmp_path / 'planted').exists()
+
+
+def test_cache_for_another_digest_is_ignored(tmp_path):
+    service = write_service(tmp_path, 'name: a\n')
+    load_service_config(service)
+    (tmp_path / 'service.yaml').write_text('name: b\n')
+    assert load_service_config(service) == {'name': 'b'}
+    assert read_cache(cache_path(service), '0' * 64) is None
+
+
+def test_configs_json_cannot_represent_are_not_cached(tmp_path):
+    service = write_service(tmp_path, 'name: a\nresponses:\n  200: ok\nsince: 2026-10-17\n')
+    config = load_service_config(service)
+    assert 200 in config['responses']
+    assert not os.path.exists(cache_path(service))
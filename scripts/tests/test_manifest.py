@@ -0,0 +1,90 @@
+"""regenerate() skip levels: unchanged source, unchanged merged config, byte-identical output"""
+import os
+
+import pytest
+
+from infragen import manifest
+from infragen.manifest import SKIPPED, UNCHANGED, WRITTEN, ServiceSource, regenerate
+
+SERVICE_YAML = '''\
+name: users
+memory: 256
+environments:
+  dev: {memory: 512}
+  prod: {memory: 1024}
+'''
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """run(text=None, **kwargs) -> (status, parses, renders) for the dev environment of one service"""
+    counts = {'parses': 0, 'renders': 0}
+    load = manifest.load_service_config
+
+    def counting_load(*args):
+        counts['parses'] += 1
+        return load(*args)
+
+    def render(config, environment, out):
+        counts['renders'] += 1
+        memory = (config['environments'].get(environment) or {}).get('memory', config['memory'])
+        out.write(f"# {config['name']} {memory}\n")
+
+    def run(text=None, version='v1', **kwargs):
+        if text is not None:
+            (tmp_path / 'service.yaml').write_text(text)
+        counts.update(parses=0, renders=0)
+        status = regenerate(ServiceSource(str(tmp_path)), 'dev', str(tmp_path / '.terraform'), render, version,
+                            **kwargs)
+        return status, counts['parses'], counts['renders']
+
+    monkeypatch.setattr(manifest, 'load_service_config', counting_load)
+    run.main_tf = tmp_path / '.terraform' / 'main.tf'
+    return run
+
+
+def test_unchanged_service_is_neither_parsed_nor_rendered(service):
+    assert service(SERVICE_YAML) == (WRITTEN, 1, 1)
+    assert service.main_tf.read_text() == '# users 512\n'
+    assert service() == (SKIPPED, 0, 0)
+
+
+@pytest.mark.parametrize('text', [
+    '# owned by the identity team\n' + SERVICE_YAML,
+    SERVICE_YAML.replace('prod: {memory: 1024}', 'prod: {memory: 2048}'),
+])
+def test_edits_that_leave_the_environment_alone_skip_rendering(service, text):
+    service(SERVICE_YAML)
+    assert service(text) == (SKIPPED, 1, 0)
+    assert service() == (SKIPPED, 0, 0)
+
+
+def test_identical_output_is_not_rewritten(service):
+    service(SERVICE_YAML)
+    old = 1_000_000_000
+    os.utime(service.main_tf, (old, old))
+    assert service(SERVICE_YAML.replace('memory: 256', 'memory: 256\ntimeout: 30')) == (UNCHANGED, 1, 1)
+    assert os.stat(service.main_tf).st_mtime == old
+
+
+def test_changed_output_is_written(service):
+    service(SERVICE_YAML)
+    assert service(SERVICE_YAML.replace('dev: {memory: 512}', 'dev: {memory: 768}')) == (WRITTEN, 1, 1)
+    assert service.main_tf.read_text() == '# users 768\n'
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'version': 'v2'},
+    {'options': {'external_paths': ['api']}},
+    {'force': True},
+])
+def test_generator_options_and_force_rerender(service, kwargs):
+    service(SERVICE_YAML)
+    assert service(**kwargs) == (UNCHANGED, 1, 1)
+
+
+def test_hand_edited_output_is_regenerated(service):
+    service(SERVICE_YAML)
+    service.main_tf.write_text('# edited\n')
+    assert service() == (WRITTEN, 1, 1)
+    assert service.main_tf.read_text() == '# users 512\n'
@@ -0,0 +1,198 @@
+"""deploy ordering, skipping, plan exit codes and core snapshot refresh, driven by a stand-in terraform"""
+import json
+import os
+import sys
+import textwrap
+import threading
+
+import pytest
+
+from infragen import orchestrate
+from infragen.generators import load_script
+from infragen.manifest import generator_version
+from infragen.orchestrate import (APPLIED, CORE, FAILED, NO_CHANGES, PLANNED, SKIPPED, CycleError, Runner, Stack,
+                                  discover_stacks, providers_cached, run_environment, run_stacks,
+                                  terraform_platform, topological_order)
+from infragen.snapshot import REQUIRED_OUTPUTS, SNAPSHOT_FILE, snapshot_from_state, sync_snapshot
+
+# Appends "<stack dir name> <command>" to $FAKE_TF_LOG. plan exits with the
+# number in ./plan_exit (default 2: changes present); state pull prints the
+# file named by $FAKE_TF_STATE, or fails without one.
+FAKE_TERRAFORM = '''\
+#!{python}
+import os, sys
+with open(os.environ['FAKE_TF_LOG'], 'a') as log:
+    log.write(f"{{os.path.basename(os.getcwd())}} {{sys.argv[1]}}\\n")
+if sys.argv[1] == 'state':
+    if not os.path.exists(os.environ.get('FAKE_TF_STATE', '')):
+        sys.exit(1)
+    print(open(os.environ['FAKE_TF_STATE']).read())
+    sys.exit(0)
+print(f"fake terraform {{' '.join(sys.argv[1:])}}")
+if sys.argv[1] == 'plan':
+    sys.exit(int(open('plan_exit').read()) if os.path.exists('plan_exit') else 2)
+'''
+
+CORE_STATE = {'version': 4, 'serial': 7, 'lineage': 'core-lineage',
+              'outputs': {name: {'value': name, 'type': 'string'} for name in REQUIRED_OUTPUTS}}
+
+
+@pytest.fixture
+def fake(tmp_path):
+    """(runner, make_stack, calls) with a stand-in terraform writing to a call log"""
+    terraform = tmp_path / 'terraform'
+    terraform.write_text(FAKE_TERRAFORM.format(python=sys.executable))
+    terraform.chmod(0o755)
+    log_path = tmp_path / 'calls.log'
+    lines = []
+    runner = Runner(str(terraform), plugin_cache=str(tmp_path / 'cache'), log=lines.append,
+                    extra_env={'FAKE_TF_LOG': str(log_path)})
+
+    def make_stack(name, depends_on=(), plan_exit=None):
+        directory = tmp_path / name
+        directory.mkdir()
+        if plan_exit is not None:
+            (directory / 'plan_exit').write_text(str(plan_exit))
+        return Stack(name, str(directory), depends_on=set(depends_on))
+
+    def calls():
+        return log_path.read_text().split('\n')[:-1] if log_path.exists() else []
+
+    runner.lines = lines
+    return runner, make_stack, calls
+
+
+def test_dependencies_finish_before_dependents_start(fake):
+    runner, make_stack, calls = fake
+    stacks = {stack.name: stack for stack in (make_stack(CORE), make_stack('worker', [CORE]),
+                                              make_stack('api', [CORE, 'worker']), make_stack('other', [CORE]))}
+    results = run_stacks(stacks, runner, parallelism=4, apply=True)
+
+    assert {name: result.status for name, result in results.items()} == dict.fromkeys(stacks, APPLIED)
+    log = calls()
+    assert log.index('core apply') < min(log.index(f"{name} init") for name in ('worker', 'api', 'other'))
+    assert log.index('worker apply') < log.index('api init')
+    assert set(results['api'].timings) == {'init', 'plan', 'apply'}
+    assert any(line.startswith('[api] fake terraform plan') for line in runner.lines)
+
+
+def test_failed_plan_skips_dependents_only(fake):
+    runner, make_stack, calls = fake
+    stacks = {stack.name: stack for stack in (make_stack('worker', plan_exit=1), make_stack('api', ['worker']),
+                                              make_stack('other'))}
+    results = run_stacks(stacks, runner, parallelism=2, apply=True)
+
+    assert results['worker'].status == FAILED
+    assert results['worker'].error == 'terraform plan exited with 1'
+    assert results['api'].status == SKIPPED
+    assert results['other'].status == APPLIED
+    assert not [line for line in calls() if line.startswith('api ') or line == 'worker apply']
+
+
+def test_detailed_exitcode(fake):
+    runner, make_stack, calls = fake
+    stacks = {stack.name: stack for stack in (make_stack('same', plan_exit=0), make_stack('changed', plan_exit=2))}
+    results = run_stacks(stacks, runner, apply=True)
+
+    assert results['same'].status == NO_CHANGES
+    assert results['changed'].status == APPLIED
+    assert 'same apply' not in calls()
+    assert 'changed apply' in calls()
+
+    planned = run_stacks({'changed': stacks['changed']}, runner, apply=False)
+    assert planned['changed'].status == PLANNED
+
+
+def test_cycle_is_rejected(fake):
+    _, make_stack, _ = fake
+    stacks = {'a': make_stack('a', ['b']), 'b': make_stack('b', ['a']), 'c': make_stack('c')}
+    with pytest.raises(CycleError, match='a, b'):
+        topological_order(stacks)
+
+
+def test_init_skips_lock_when_providers_are_cached(fake, tmp_path):
+    runner, make_stack, _ = fake
+    stack = make_stack('warm')
+    (tmp_path / 'warm' / '.terraform.lock.hcl').write_text(textwrap.dedent('''\
+        provider "registry.terraform.io/hashicorp/aws" {
+          version     = "6.20.0"
+          constraints = "~> 6.0"
+        }
+        '''))
+    assert not providers_cached(stack.directory, runner.plugin_cache)
+    os.makedirs(os.path.join(runner.plugin_cache, 'registry.terraform.io/hashicorp/aws/6.20.0', terraform_platform()))
+    assert providers_cached(stack.directory, runner.plugin_cache)
+
+    # Another init holds the lock; the warm stack must not wait for it
+    finished = threading.Event()
+    with runner.init_lock:
+        worker = threading.Thread(target=lambda: (runner.deploy(stack), finished.set()))
+        worker.start()
+        assert finished.wait(timeout=30)
+    worker.join()
+
+
+def test_discover_stacks_orders_workers_before_their_publishers(tmp_path):
+    root = tmp_path / 'mono'
+    for kind, name, text in (
+            ('workers', 'email-send', 'name: email-send\ntype: worker\n'),
+            ('services', 'user-api', 'name: user-api\nrouting:\n  - {method: GET, path: /users}\n'
+                                     'event_routing:\n  - event: user.created\n    targets:\n'
+                                     '      - queue: email-send-queue\n')):
+        path = root / kind / name
+        path.mkdir(parents=True)
+        (path / 'service.yaml').write_text(text)
+    batch = load_script('generate-all-infra.py')
+    version = generator_version()
+    for path in ('workers/email-send', 'services/user-api'):
+        assert batch.generate_service(str(root / path), ['dev'], version)['error'] is None
+
+    stacks = discover_stacks(str(root), 'dev')
+    assert stacks['user-api'].depends_on == {CORE, 'email-send'}
+    assert stacks['email-send'].depends_on == {CORE}
+    assert topological_order(stacks) == [CORE, 'email-send', 'user-api']
+
+
+def snapshot_serial(stack):
+    with open(os.path.join(stack.directory, SNAPSHOT_FILE)) as f:
+        return json.load(f)['serial']
+
+
+def test_core_outputs_snapshots_are_refreshed_once_after_core(fake, tmp_path, monkeypatch):
+    runner, make_stack, calls = fake
+    stacks = {stack.name: stack for stack in (make_stack(CORE), make_stack('api', [CORE]),
+                                              make_stack('worker', [CORE]), make_stack('plain', [CORE]))}
+    monkeypatch.setattr(orchestrate, 'CORE_DIR', stacks[CORE].directory)
+    for name in ('api', 'worker'):
+        sync_snapshot(stacks[name].directory, snapshot_from_state(CORE_STATE, 'dev'))
+    (tmp_path / 'state.json').write_text(json.dumps({**CORE_STATE, 'serial': 8}))
+    runner.env['FAKE_TF_STATE'] = str(tmp_path / 'state.json')
+
+    results = run_environment(stacks, runner, 'dev', apply=True)
+    assert {name: result.status for name, result in results.items()} == dict.fromkeys(stacks, APPLIED)
+    log = calls()
+    assert log.count('core state') == 1
+    assert log.index('core apply') < log.index('core state') < min(
+        log.index(f"{name} init") for name in ('api', 'worker', 'plain'))
+    assert snapshot_serial(stacks['api']) == snapshot_serial(stacks['worker']) == 8
+    assert not os.path.exists(os.path.join(stacks['plain'].directory, SNAPSHOT_FILE))
+    assert any(line.endswith('2 of 2 snapshots refreshed') for line in runner.lines)
+
+
+def test_without_core_the_state_is_pulled_before_any_stack(fake, tmp_path, monkeypatch):
+    runner, make_stack, calls = fake
+    api = make_stack('api')
+    (tmp_path / 'core').mkdir()
+    monkeypatch.setattr(orchestrate, 'CORE_DIR', str(tmp_path / 'core'))
+    sync_snapshot(api.directory, snapshot_from_state(CORE_STATE, 'dev'))
+
+    results = run_environment({'api': api}, runner, 'dev')
+    assert results['api'].status == SKIPPED
+    assert results['api'].error == 'dev: terraform state pull exited with 1'
+    assert calls() == ['core init', 'core state']
+
+    (tmp_path / 'state.json').write_text(json.dumps(CORE_STATE))
+    runner.env['FAKE_TF_STATE'] = str(tmp_path / 'state.json')
+    assert run_environment({'api': api}, runner, 'dev')['api'].status == PLANNED
+    assert snapshot_serial(api) == 7
+    assert any(line.endswith('0 of 1 snapshots refreshed') for line in runner.lines)
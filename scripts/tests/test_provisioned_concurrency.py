@@ -0,0 +1,72 @@
+"""Provisioned concurrency from service.yaml: per-environment merging, validation and the emitted resources"""
+import io
+
+import pytest
+
+from infragen.config import ConfigError, ServiceConfig
+from infragen.generators import load_script
+
+SERVICE = {
+    'name': 'users',
+    'routing': [{'method': 'GET', 'path': '/users'}],
+    'provisioned_concurrency': {
+        'units': 2,
+        'autoscaling': {'max': 10},
+        'schedules': [{'name': 'peak', 'schedule': 'cron(0 8 ? * MON-FRI *)', 'min': 5}],
+    },
+    'environments': {
+        'dev': {'provisioned_concurrency': {'enabled': False}},
+        'prod': {'provisioned_concurrency': {'units': 4}},
+    },
+}
+
+
+def concurrency(section):
+    config = ServiceConfig.from_yaml({'name': 'users', 'provisioned_concurrency': section}, 'prod')
+    return config.provisioned_concurrency
+
+
+def lambda_tf(environment):
+    out = io.StringIO()
+    load_script('generate-service-infra.py').write_lambda_tf(SERVICE, environment, out)
+    return out.getvalue()
+
+
+def test_environment_overrides_merge_key_by_key():
+    prod = ServiceConfig.from_yaml(SERVICE, 'prod').provisioned_concurrency
+    assert (prod.units, prod.min_capacity, prod.max_capacity) == (4, 1, 10)
+    assert [(s.name, s.min_capacity, s.max_capacity) for s in prod.schedules] == [('peak', 5, 10)]
+    assert ServiceConfig.from_yaml(SERVICE, 'dev').provisioned_concurrency is None
+
+
+def test_fixed_units_without_autoscaling():
+    fixed = concurrency({'units': 3})
+    assert (fixed.units, fixed.autoscaled) == (3, False)
+
+
+@pytest.mark.parametrize('section, message', [
+    ({'units': 20, 'autoscaling': {'min': 1, 'max': 10}}, 'outside autoscaling min/max'),
+    ({'autoscaling': {'max': 10, 'target_utilization': 0.95}}, 'between 0.1 and 0.9'),
+    ({'units': 2, 'schedules': [{'name': 'peak', 'schedule': 'rate(1 hour)'}]}, 'need provisioned_concurrency'),
+    ({'autoscaling': {'max': 4}, 'schedules': [{'name': 'peak', 'schedule': '0 8 * * *'}]}, 'expected cron'),
+    ({'autoscaling': {'max': 4}, 'schedules': [{'name': 'a', 'schedule': 'rate(1 hour)'},
+                                               {'name': 'a', 'schedule': 'rate(2 hours)'}]}, 'must be unique'),
+])
+def test_invalid_sections_are_rejected(section, message):
+    with pytest.raises(ConfigError, match=message):
+        concurrency(section)
+
+
+def test_autoscaled_alias_gets_target_tracking_and_scheduled_floors():
+    main_tf = lambda_tf('prod')
+    assert 'provisioned_concurrent_executions = 4' in main_tf
+    assert 'ignore_changes = [provisioned_concurrent_executions]' in main_tf
+    assert 'predefined_metric_type = "LambdaProvisionedConcurrencyUtilization"' in main_tf
+    assert 'resource "aws_appautoscaling_scheduled_action" "users_concurrency_peak" {' in main_tf
+    assert 'schedule           = "cron(0 8 ? * MON-FRI *)"' in main_tf
+
+
+def test_disabled_environment_emits_nothing():
+    main_tf = lambda_tf('dev')
+    assert 'aws_lambda_provisioned_concurrency_config' not in main_tf
+    assert 'aws_appautoscaling' not in main_tf
@@ -0,0 +1,40 @@
+"""Reading GetMetricData JSON exports incrementally"""
+import io
+import json
+
+import pytest
+
+from infragen.rightsizing import metric_data_results, read_records
+
+PAGE = {
+    'Messages': [],
+    'MetricDataResults': [
+        {'Id': 'm0', 'Label': 'prod-user-api Duration', 'Timestamps': ['2026-10-01T00:00:00Z'] * 3,
+         'Values': [12.5, 1234567.0, 3], 'StatusCode': 'Complete'},
+        {'Id': 'm1', 'Label': 'prod-email-send CPUUtilization', 'Values': [], 'StatusCode': 'Complete'},
+        {'Id': 'm2', 'Label': 'prod-email-send MemoryUtilization', 'Values': [41.25], 'StatusCode': 'Complete'},
+    ],
+    'NextToken': 'x' * 50,
+    'Count': 123456,
+}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 4096])
+def test_results_are_decoded_across_chunk_boundaries(chunk_size):
+    text = json.dumps(PAGE, indent=2) + '\n' + json.dumps({'MetricDataResults': []}) + json.dumps(PAGE)
+    results = list(metric_data_results(io.StringIO(text), chunk_size))
+    assert results == PAGE['MetricDataResults'] * 2
+
+
+def test_read_records_streams_a_json_document(tmp_path):
+    path = tmp_path / 'export.json'
+    path.write_text(json.dumps(PAGE))
+    assert list(read_records(str(path))) == [
+        ('prod-user-api', 'Duration', 12.5), ('prod-user-api', 'Duration', 1234567.0),
+        ('prod-user-api', 'Duration', 3), ('prod-email-send', 'MemoryUtilization', 41.25)]
+
+
+@pytest.mark.parametrize('text', ['[1, 2]', '{"MetricDataResults": [{"Values": [1]}', '{"a": 1 "b": 2}'])
+def test_malformed_documents_raise_value_error(text):
+    with pytest.raises(ValueError):
+        list(metric_data_results(io.StringIO(text), 4))
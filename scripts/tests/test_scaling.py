@@ -0,0 +1,25 @@
+"""step_adjustments for simple and proportional worker scale-up policies"""
+import pytest
+
+from infragen.config import ConfigError
+from infragen.scaling import MAX_PROPORTIONAL_STEPS, step_adjustments
+
+
+def test_simple_steps_add_one_task():
+    assert step_adjustments(0, 10, proportional=False) == [(0, None, 1)]
+
+
+def test_proportional_steps_are_a_threshold_wide():
+    assert step_adjustments(100, 3, proportional=True) == [(0, 100, 1), (100, 200, 2), (200, None, 3)]
+    assert len(step_adjustments(100, 50, proportional=True)) == MAX_PROPORTIONAL_STEPS
+
+
+def test_fractional_threshold_rounds_up_to_a_whole_message():
+    assert step_adjustments(0.5, 3, proportional=True) == [(0, 1, 1), (1, 2, 2), (2, None, 3)]
+    assert step_adjustments(2.5, 2, proportional=True) == [(0, 3, 1), (3, None, 2)]
+
+
+@pytest.mark.parametrize('threshold', [0, -5, float('inf'), float('nan')])
+def test_proportional_steps_reject_thresholds_without_a_width(threshold):
+    with pytest.raises(ConfigError, match='scale_up_threshold'):
+        step_adjustments(threshold, 5, proportional=True)
@@ -0,0 +1,55 @@
+"""generate-service-infra.py for one service keeps the paths other services look up"""
+import os
+import sys
+
+import pytest
+
+from infragen.generators import load_script
+
+OWNER = '''name: a
+collapse_routes: true
+routing:
+  - {method: GET, path: /api}
+  - {method: GET, path: /api/x/one}
+  - {method: GET, path: /api/x/two}
+  - {method: GET, path: /api/z/one}
+  - {method: GET, path: /api/z/two}
+'''
+
+OTHER = '''name: b
+routing:
+  - {method: GET, path: /api/x/b}
+'''
+
+
+def write_service(root, name, text):
+    path = root / 'services' / name
+    path.mkdir(parents=True)
+    (path / 'service.yaml').write_text(text)
+    return str(path)
+
+
+def run_cli(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['generate-service-infra.py', *args])
+    load_script('generate-service-infra.py').main()
+
+
+def test_single_service_keeps_referenced_paths(tmp_path, monkeypatch, capsys):
+    owner = write_service(tmp_path, 'a', OWNER)
+    write_service(tmp_path, 'b', OTHER)
+    run_cli(monkeypatch, owner, 'dev', '--root', str(tmp_path))
+
+    with open(os.path.join(owner, '.terraform', 'dev', 'main.tf')) as f:
+        main_tf = f.read()
+    assert 'resource "aws_api_gateway_resource" "a_api_x" {' in main_tf
+    assert 'resource "aws_api_gateway_resource" "a_api_x_proxy_plus" {' not in main_tf
+    assert 'resource "aws_api_gateway_resource" "a_api_z_proxy_plus" {' in main_tf
+    assert 'Collapsed 1 route subtree(s)' in capsys.readouterr().out
+
+
+def test_collapse_without_a_known_root_is_refused(tmp_path, monkeypatch):
+    owner = write_service(tmp_path, 'a', OWNER)
+    monkeypatch.setattr(load_script('generate-service-infra.py'), 'monorepo_root', lambda path: None)
+    with pytest.raises(SystemExit):
+        run_cli(monkeypatch, owner, 'dev')
+    assert not os.path.exists(os.path.join(owner, '.terraform', 'dev', 'main.tf'))
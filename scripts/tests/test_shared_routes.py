@@ -0,0 +1,90 @@
+"""--share-route-prefixes together with collapse_routes across two services"""
+import os
+
+from infragen.generators import load_script
+from infragen.manifest import generator_version
+
+SERVICE_A = '''name: a
+collapse_routes: true
+routing:
+  - {method: GET, path: /api}
+  - {method: GET, path: /api/x}
+  - {method: GET, path: /api/x/one}
+  - {method: GET, path: /api/x/two}
+  - {method: GET, path: /api/z/one}
+  - {method: GET, path: /api/z/two}
+'''
+
+SERVICE_B = '''name: b
+routing:
+  - {method: GET, path: /api/x/b}
+'''
+
+# b only mounts under a's /api/x in prod
+SERVICE_B_PROD_ONLY = '''name: b
+routing:
+  - {method: GET, path: /b}
+environments:
+  prod:
+    routing:
+      - {method: GET, path: /api/x/b}
+'''
+
+
+def write_service(root, name, text):
+    path = os.path.join(root, 'services', name)
+    os.makedirs(path)
+    with open(os.path.join(path, 'service.yaml'), 'w') as f:
+        f.write(text)
+    return path
+
+
+def read_main(service_path, environment='dev'):
+    with open(os.path.join(service_path, '.terraform', environment, 'main.tf')) as f:
+        return f.read()
+
+
+def test_owner_keeps_paths_other_services_look_up(tmp_path):
+    batch = load_script('generate-all-infra.py')
+    root = str(tmp_path)
+    a = write_service(root, 'a', SERVICE_A)
+    b = write_service(root, 'b', SERVICE_B)
+
+    shared = batch.shared_route_prefixes(root, ['dev'])
+    assert shared == {a: {'dev': ([], ['api', 'api/x'])}, b: {'dev': (['api', 'api/x'], [])}}
+
+    version = generator_version()
+    for path in (a, b):
+        result = batch.generate_service(path, ['dev'], version, shared_paths=shared.get(path))
+        assert result['error'] is None
+
+    a_tf, b_tf = read_main(a), read_main(b)
+    assert 'data "aws_api_gateway_resource" "b_api_x"' in b_tf
+    # b looks up /api and /api/x, so a must still create both
+    assert 'resource "aws_api_gateway_resource" "a_api" {' in a_tf
+    assert 'resource "aws_api_gateway_resource" "a_api_x" {' in a_tf
+    # /api/z is a's alone and still collapses
+    assert 'resource "aws_api_gateway_resource" "a_api_z_proxy_plus" {' in a_tf
+    assert 'resource "aws_api_gateway_resource" "a_api_z_one" {' not in a_tf
+
+
+def test_shared_paths_are_planned_per_environment(tmp_path):
+    batch = load_script('generate-all-infra.py')
+    root = str(tmp_path)
+    a = write_service(root, 'a', SERVICE_A)
+    b = write_service(root, 'b', SERVICE_B_PROD_ONLY)
+
+    shared = batch.shared_route_prefixes(root, ['dev', 'prod'])
+    assert shared == {a: {'prod': ([], ['api', 'api/x'])}, b: {'prod': (['api', 'api/x'], [])}}
+
+    version = generator_version()
+    for path in (a, b):
+        assert batch.generate_service(path, ['dev', 'prod'], version, shared_paths=shared.get(path))['error'] is None
+
+    # dev: nobody else mounts under /api, so all of it collapses and b creates its own /b
+    assert 'resource "aws_api_gateway_resource" "a_api_proxy_plus" {' in read_main(a, 'dev')
+    assert '"a_api_x"' not in read_main(a, 'dev')
+    assert 'data "aws_api_gateway_resource"' not in read_main(b, 'dev')
+    # prod: b looks up /api/x, which a must keep
+    assert 'resource "aws_api_gateway_resource" "a_api_x" {' in read_main(a, 'prod')
+    assert 'data "aws_api_gateway_resource" "b_api_x"' in read_main(b, 'prod')
@@ -0,0 +1,59 @@
+"""Core outputs snapshots: export filtering, age limit and refreshing stale copies"""
+import json
+import os
+import time
+
+import pytest
+
+from infragen.snapshot import (REQUIRED_OUTPUTS, SNAPSHOT_FILE, SnapshotError, load_snapshots, snapshot_from_state,
+                               sync_snapshot)
+
+
+def core_state(serial=7, lineage='core-lineage', environment='dev'):
+    outputs = {name: {'value': f"{name}-value", 'type': 'string'} for name in REQUIRED_OUTPUTS}
+    outputs['environment'] = {'value': environment, 'type': 'string'}
+    outputs['db_password'] = {'value': 'secret', 'type': 'string', 'sensitive': True}
+    return {'version': 4, 'terraform_version': '1.9.0', 'serial': serial, 'lineage': lineage,
+            'outputs': outputs, 'resources': [{'type': 'aws_vpc'}]}
+
+
+def test_snapshot_keeps_only_non_sensitive_outputs():
+    snapshot = snapshot_from_state(core_state(), 'dev')
+    state = json.loads(snapshot.text)
+    assert (state['serial'], state['lineage'], state['resources']) == (7, 'core-lineage', [])
+    assert 'db_password' not in state['outputs'] and 'vpc_id' in state['outputs']
+
+
+@pytest.mark.parametrize('state, message', [
+    ({**core_state(), 'version': 3}, 'unsupported state format'),
+    (core_state(environment='prod'), "outputs are for 'prod'"),
+    ({**core_state(), 'outputs': {}}, 'missing core outputs'),
+])
+def test_unusable_states_are_rejected(state, message):
+    with pytest.raises(SnapshotError, match=message):
+        snapshot_from_state(state, 'dev')
+
+
+def test_exports_older_than_max_age_are_refused(tmp_path):
+    path = tmp_path / 'dev.tfstate'
+    path.write_text(json.dumps(core_state()))
+    assert load_snapshots(str(tmp_path), ['dev'], max_age=60)['dev'].serial == 7
+
+    old = time.time() - 3 * 3600
+    os.utime(path, (old, old))
+    with pytest.raises(SnapshotError, match='exported 180 minutes ago'):
+        load_snapshots(str(tmp_path), ['dev'], max_age=7200)
+    assert load_snapshots(str(tmp_path), ['dev'], max_age=0)['dev'].serial == 7
+
+
+def test_copies_are_rewritten_only_for_another_lineage_or_serial(tmp_path):
+    copy = tmp_path / SNAPSHOT_FILE
+    assert sync_snapshot(str(tmp_path), snapshot_from_state(core_state(), 'dev'))
+    assert not sync_snapshot(str(tmp_path), snapshot_from_state(core_state(), 'dev'))
+    assert sync_snapshot(str(tmp_path), snapshot_from_state(core_state(serial=8), 'dev'))
+    assert json.loads(copy.read_text())['serial'] == 8
+    assert sync_snapshot(str(tmp_path), snapshot_from_state(core_state(serial=8, lineage='new'), 'dev'))
+
+    assert sync_snapshot(str(tmp_path), None)
+    assert not copy.exists()
+    assert not sync_snapshot(str(tmp_path), None)
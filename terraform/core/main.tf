@@ -45,6 +45,10 @@ module "api_gateway" {
   quota_period          = "DAY"
   throttle_rate_limit   = 1000    # 1K requests per second
   throttle_burst_limit  = 2000    # 2K burst
+
+  # Stage cache for routes that set cache in service.yaml
+  cache_cluster_enabled = var.api_cache_cluster.enabled
+  cache_cluster_size    = var.api_cache_cluster.size
   
   # WAF for security
   enable_waf     = true
@@ -63,6 +63,16 @@ output "api_gateway_execution_arn" {
   value       = module.api_gateway.execution_arn
 }
 
+output "api_gateway_name" {
+  description = "API Gateway REST API name (CloudWatch ApiName dimension)"
+  value       = module.api_gateway.api_name
+}
+
+output "api_gateway_stage_name" {
+  description = "API Gateway stage name"
+  value       = module.api_gateway.stage_name
+}
+
 output "api_gateway_invoke_url" {
   description = "API Gateway invoke URL"
   value       = module.api_gateway.invoke_url
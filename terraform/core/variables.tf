@@ -48,6 +48,19 @@ variable "ecs_capacity_providers" {
   }
 }
 
+# API Gateway Configuration
+variable "api_cache_cluster" {
+  description = "API Gateway stage cache cluster"
+  type = object({
+    enabled = bool
+    size    = string
+  })
+  default = {
+    enabled = false
+    size    = "0.5"
+  }
+}
+
 # Tagging
 variable "common_tags" {
   description = "Common tags for all resources"
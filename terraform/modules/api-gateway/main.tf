@@ -37,11 +37,26 @@ resource "aws_api_gateway_stage" "main" {
   # Enable X-Ray tracing
   xray_tracing_enabled = true
 
+  # Response cache for methods that enable caching in their method settings
+  cache_cluster_enabled = var.cache_cluster_enabled
+  cache_cluster_size    = var.cache_cluster_enabled ? var.cache_cluster_size : null
+
   tags = merge(var.common_tags, {
     Name = "${var.api_name}-${var.stage_name}"
   })
 }
 
+# Stage-wide method defaults; detailed metrics give per-resource/method series
+resource "aws_api_gateway_method_settings" "all" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  stage_name  = aws_api_gateway_stage.main.stage_name
+  method_path = "*/*"
+
+  settings {
+    metrics_enabled = var.detailed_metrics_enabled
+  }
+}
+
 # CloudWatch Log Group for API Gateway
 resource "aws_cloudwatch_log_group" "api_gateway" {
   name              = "/aws/apigateway/${var.api_name}"
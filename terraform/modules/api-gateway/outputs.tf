@@ -23,6 +23,16 @@ output "stage_arn" {
   value       = aws_api_gateway_stage.main.arn
 }
 
+output "api_name" {
+  description = "API Gateway REST API name"
+  value       = aws_api_gateway_rest_api.main.name
+}
+
+output "stage_name" {
+  description = "API Gateway stage name"
+  value       = aws_api_gateway_stage.main.stage_name
+}
+
 output "invoke_url" {
   description = "API Gateway invoke URL"
   value       = aws_api_gateway_stage.main.invoke_url
@@ -46,6 +46,25 @@ variable "throttle_burst_limit" {
   default     = 200
 }
 
+variable "detailed_metrics_enabled" {
+  description = "Publish per-resource/method CloudWatch metrics (used by the service dashboards)"
+  type        = bool
+  default     = true
+}
+
+# Stage Cache Configuration
+variable "cache_cluster_enabled" {
+  description = "Provision the stage cache cluster used by cached methods"
+  type        = bool
+  default     = false
+}
+
+variable "cache_cluster_size" {
+  description = "Stage cache cluster size in GB (0.5, 1.6, 6.1, 13.5, 28.4, 58.2, 118, 237)"
+  type        = string
+  default     = "0.5"
+}
+
 # WAF Configuration
 variable "enable_waf" {
   description = "Enable WAF for API Gateway"
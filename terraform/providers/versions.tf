@@ -0,0 +1,13 @@
+# Generated by scripts/provider-mirror.py: the providers every generated service stack requires
+terraform {
+  required_providers {
+    aws = {
+      source  = "hashicorp/aws"
+      version = "~> 6.0"
+    }
+    random = {
+      source  = "hashicorp/random"
+      version = "~> 3.1"
+    }
+  }
+}